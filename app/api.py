@@ -1,26 +1,47 @@
 from fastapi import FastAPI, Request, Form, UploadFile, File, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from starlette.middleware.sessions import SessionMiddleware
 from dotenv import load_dotenv
+import asyncio
 import os
+import json
+import time
 import markdown
+from typing import Dict, List
 
-from src.rag.qa_engine import create_qa_chain, query_rag
-from src.rag.retriever import get_vectorstore_retriever, get_filtered_retriever
+# Load env vars before the src imports: their settings are read at import time
+load_dotenv()
+
+from src import metrics
+from src.http_pool import close_async_clients
+from src.rag.qa_engine import aretrieve_with_scores, aanswer_from_documents, astream_rag
+from src.rag.chain_registry import get_user_qa_chain, invalidate_user_qa_chain, get_qa_chain_registry
+from src.rag.embedding_cache import get_query_embedding_cache
+from src.rag.answer_cache import get_answer_cache
+from src.rag.corpus_version import get_corpus_version
 from src.rag.vector_store import (
-    build_vectorstore, delete_documents_by_file_id, 
+    delete_documents_by_file_id, 
     delete_documents_by_filename, get_user_files,
-    add_documents_to_vectorstore, load_vectorstore
+    add_documents_to_vectorstore, load_vectorstore,
+    get_vectorstore_registry, find_file_by_content_hash, get_store_metadata
 )
-from src.models.history import ChatEntry, load_user_cache, save_user_cache, clear_user_cache, get_user_cached_entry
-from src.loaders.file_loader import load_all_documents, load_single_document
-from src.web_search.search_engine import search_web, format_web_search_response, has_relevant_rag_results
+from src.rag.embedding_model import EMBEDDING_MODEL
+from src.models.history import load_user_cache, clear_user_cache
+from src.loaders.file_loader import SUPPORTED_EXTENSIONS
+from src.web_search.search_engine import (
+    asearch_web, aformat_web_search_response, has_relevant_rag_results,
+    astream_web_search_response, passes_relevance_gate, best_relevance_score,
+    relevance_band, RAG_POSTHOC_CHECK
+)
+from src.web_search.speculative import SpeculativeWebSearch
+from src.web_search.cache import get_web_search_cache
+from src.web_search.resilience import breaker_stats
 from app.auth_routes import router as auth_router
-from app.mcp_client import ask_mcp  # used as fallback if RAG is not ready
+from app.mcp_client import aask_mcp  # used as fallback if RAG is not ready
+from app.ingest_jobs import get_ingest_job_manager, JobLimitError, ACTIVE_STATUSES
+from app.uploads import stage_upload_stream, StagedUpload, UploadTooLarge
 
-# Load env vars
-load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
 
 # FastAPI app setup
@@ -29,6 +50,17 @@ app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
 app.include_router(auth_router)
 templates = Jinja2Templates(directory="templates")
 
+@app.on_event("startup")
+def resume_ingest_jobs():
+    resumed = get_ingest_job_manager().resume_interrupted()
+    if resumed:
+        print(f"Resumed {resumed} interrupted ingestion job(s)")
+
+@app.on_event("shutdown")
+async def shutdown_http_clients():
+    await close_async_clients()
+    get_ingest_job_manager().shutdown()
+
 def get_user_folder(user_id: str):
     upload_dir = os.path.join("user_uploads", user_id)
     os.makedirs(upload_dir, exist_ok=True)
@@ -40,31 +72,68 @@ def get_embedding_folder(user_id: str):
     return embed_dir
 
 @app.get("/", response_class=HTMLResponse)
-async def home(request: Request):
+def home(request: Request):
+    # Plain def: render_home reads the vector store and manifest, so FastAPI runs it in its threadpool
     return render_home(request)
 
+def _lookup_cached_answer(user_id: str, question: str):
+    """
+    Look a question up in the answer cache. Returns (cached answer or None, corpus
+    version, embedding model); the last two key the answer when it is stored.
+    Reads (and for legacy stores writes) files, so call it off the event loop.
+    """
+    persist_directory = get_embedding_folder(user_id)
+    # Cached answers are only valid for the current version of the user's documents
+    corpus_version = get_corpus_version(persist_directory)
+    # Questions are compared with the model retrieval embeds them with
+    embedding_model = get_store_metadata(persist_directory)["embedding_model"]
+    cached = get_answer_cache().lookup(user_id, question, corpus_version, embedding_model)
+    return cached, corpus_version, embedding_model
+
 @app.post("/ask-ui", response_class=HTMLResponse)
-def ask_ui(request: Request, question: str = Form(...)):
+async def ask_ui(request: Request, question: str = Form(...)):
     user = request.session.get("user")
     if not user:
         return RedirectResponse("/login", status_code=302)
 
     user_id = user["name"]
-    cached = get_user_cached_entry(user_id, question)
+    cached, corpus_version, embedding_model = await asyncio.to_thread(_lookup_cached_answer, user_id, question)
 
     if cached:
         answer = cached.answer
         sources = cached.sources
     else:
-        qa_chain = getattr(request.app.state, "qa_chain", None)
+        # Error texts and answers whose generation fell back (MCP, plain web results) are not cached
+        cacheable = False
+        # Built lazily per user from embeddings/<user_id>, so worker restarts are harmless
+        qa_chain = await asyncio.to_thread(get_user_qa_chain, user_id, get_embedding_folder(user_id))
         use_rag = qa_chain is not None
 
         if use_rag:
+            # A web search that may be started before RAG is known to be insufficient
+            web_search = SpeculativeWebSearch(question)
+            web_search.on_retrieval_start()
             try:
-                result = query_rag(qa_chain, question)
+                # Gate on retrieval scores before paying for a generation
+                scored_documents = await aretrieve_with_scores(qa_chain, question)
+                band = relevance_band(scored_documents)
+                web_search.on_relevance_band(band)
+                use_documents = band != "rejected"
+                metrics.increment("rag.gate.passed" if use_documents else "rag.gate.rejected")
                 
-                # Check if RAG results are relevant
-                if has_relevant_rag_results(result):
+                if use_documents:
+                    result = await aanswer_from_documents(
+                        qa_chain, question, [doc for doc, _ in scored_documents]
+                    )
+                    # Optional second stage: reject evasive answers after generation
+                    if RAG_POSTHOC_CHECK and not has_relevant_rag_results(result):
+                        use_documents = False
+                        metrics.increment("rag.posthoc.rejected")
+                else:
+                    print(f"[RAG GATED] Best relevance score {best_relevance_score(scored_documents)} below threshold for: {question}")
+                
+                if use_documents:
+                    web_search.cancel()
                     # Use RAG results
                     raw_answer = result["result"]
                     answer = markdown.markdown(raw_answer)
@@ -72,55 +141,183 @@ def ask_ui(request: Request, question: str = Form(...)):
                         doc.metadata.get("source", "unknown")
                         for doc in result["source_documents"]
                     })
+                    cacheable = True
                     print(f"[RAG SUCCESS] Used document results for: {question}")
                 else:
                     # RAG results not relevant, try web search
                     print(f"[RAG INSUFFICIENT] Falling back to web search for: {question}")
-                    web_results = search_web(question)
-                    formatted_response = format_web_search_response(web_results, question)
+                    web_results = await web_search.result()
+                    formatted_response = await aformat_web_search_response(web_results, question)
                     
                     answer = markdown.markdown(formatted_response["answer"])
                     sources = formatted_response["sources"]
+                    cacheable = not formatted_response.get("fallback")
                     
             except Exception as e:
                 print(f"[RAG ERROR] {e}")
                 # If RAG fails completely, try web search
                 print(f"[RAG FAILED] Falling back to web search for: {question}")
                 try:
-                    web_results = search_web(question)
-                    formatted_response = format_web_search_response(web_results, question)
+                    web_results = await web_search.result()
+                    formatted_response = await aformat_web_search_response(web_results, question)
                     
                     answer = markdown.markdown(formatted_response["answer"])
                     sources = formatted_response["sources"]
+                    cacheable = not formatted_response.get("fallback")
                 except Exception as web_error:
                     print(f"[WEB SEARCH ERROR] {web_error}")
                     answer = "❌ Both document search and web search failed. Please try again."
                     sources = []
+            finally:
+                web_search.cancel()
 
         else:
             # No RAG available, try web search first, then MCP fallback
             try:
                 print(f"[NO RAG] Using web search for: {question}")
-                web_results = search_web(question)
-                formatted_response = format_web_search_response(web_results, question)
+                web_results = await asearch_web(question)
+                formatted_response = await aformat_web_search_response(web_results, question)
                 
                 answer = markdown.markdown(formatted_response["answer"])
                 sources = formatted_response["sources"]
+                cacheable = not formatted_response.get("fallback")
             except Exception as web_error:
                 print(f"[WEB SEARCH ERROR] {web_error}")
                 # Final fallback to MCP
-                mcp_result = ask_mcp(question)
+                mcp_result = await aask_mcp(question)
                 answer = markdown.markdown(mcp_result.get("answer", "No answer available."))
                 sources = mcp_result.get("sources", [])
 
         # Save to user cache
-        new_entry = ChatEntry(question=question, answer=answer, sources=sources)
-        history = load_user_cache(user_id)
-        history.append(new_entry)
-        history[:] = history[-6:]
-        save_user_cache(user_id, new_entry)
+        if cacheable:
+            await asyncio.to_thread(
+                get_answer_cache().store, user_id, question, answer, sources, corpus_version, embedding_model
+            )
+
+    # render_home lists files from the vector store, keep that off the event loop
+    return await asyncio.to_thread(render_home, request, answer=answer, sources=sources)
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _stream_answer(user_id: str, question: str):
+    """
+    Generate SSE messages for a question: `sources` first, then one `token` per
+    generated piece, then `done` with the rendered answer (or `error`).
+    """
+    started = time.perf_counter()
+    cached, corpus_version, embedding_model = await asyncio.to_thread(_lookup_cached_answer, user_id, question)
+
+    if cached:
+        metrics.increment("ask_stream.cache_hits")
+        yield _sse_event("sources", {"sources": cached.sources})
+        yield _sse_event("done", {
+            "answer_html": cached.answer,
+            "sources": cached.sources,
+            "mode": "cache"
+        })
+        return
+
+    mode = "web"
+    sources = []
+    tokens = None
+    # Web answers whose generation fell back (no results, LLM failure) are not cached
+    fell_back = False
+
+    def on_fallback() -> None:
+        nonlocal fell_back
+        fell_back = True
+
+    web_search = SpeculativeWebSearch(question)
+    qa_chain = await asyncio.to_thread(get_user_qa_chain, user_id, get_embedding_folder(user_id))
+    if qa_chain is not None:
+        web_search.on_retrieval_start()
+        try:
+            scored_documents = await aretrieve_with_scores(qa_chain, question)
+            # The answer is streamed as it is generated, so relevance is judged on retrieval scores alone
+            if passes_relevance_gate(scored_documents):
+                web_search.cancel()
+                metrics.increment("rag.gate.passed")
+                source_documents, rag_tokens = await astream_rag(
+                    qa_chain, question, [doc for doc, _ in scored_documents]
+                )
+                mode = "rag"
+                tokens = rag_tokens
+                sources = list({
+                    doc.metadata.get("source", "unknown")
+                    for doc in source_documents
+                })
+                print(f"[RAG STREAM] Streaming document answer for: {question}")
+            else:
+                metrics.increment("rag.gate.rejected")
+        except Exception as e:
+            print(f"[RAG STREAM ERROR] {e}")
+
+    if tokens is None:
+        print(f"[WEB STREAM] Streaming web answer for: {question}")
+        web_results = await web_search.result()
+        tokens, sources = astream_web_search_response(web_results, question, on_fallback=on_fallback)
 
-    return render_home(request, answer=answer, sources=sources)
+    yield _sse_event("sources", {"sources": sources})
+
+    pieces = []
+    try:
+        async for token in tokens:
+            if not pieces:
+                ttft_ms = (time.perf_counter() - started) * 1000
+                metrics.observe(f"ask_stream.{mode}.ttft_ms", ttft_ms)
+            pieces.append(token)
+            yield _sse_event("token", {"text": token})
+    except Exception as e:
+        print(f"[STREAM ERROR] {e}")
+        yield _sse_event("error", {"error": "❌ Answer generation failed. Please try again."})
+        return
+
+    total_ms = (time.perf_counter() - started) * 1000
+    metrics.observe(f"ask_stream.{mode}.total_ms", total_ms)
+
+    answer = markdown.markdown("".join(pieces))
+    if not fell_back:
+        await asyncio.to_thread(
+            get_answer_cache().store, user_id, question, answer, sources, corpus_version, embedding_model
+        )
+
+    yield _sse_event("done", {
+        "answer_html": answer,
+        "sources": sources,
+        "mode": mode,
+        "total_ms": round(total_ms, 1)
+    })
+
+@app.get("/ask-stream")
+async def ask_stream(request: Request, question: str):
+    """Stream the answer to a question token by token over Server-Sent Events."""
+    user = request.session.get("user")
+    if not user:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+
+    return StreamingResponse(
+        _stream_answer(user["name"], question),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/metrics")
+def get_metrics(request: Request):
+    """Expose in-process performance metrics (latencies, cache counters)."""
+    user = request.session.get("user")
+    if not user:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+
+    snapshot = metrics.snapshot()
+    snapshot["web_search_cache"] = get_web_search_cache().stats()
+    snapshot["web_search_breakers"] = breaker_stats()
+    snapshot["vectorstore_registry"] = get_vectorstore_registry().stats()
+    snapshot["qa_chain_registry"] = get_qa_chain_registry().stats()
+    snapshot["query_embedding_cache"] = get_query_embedding_cache().stats()
+    snapshot["answer_cache"] = get_answer_cache().stats()
+    return JSONResponse(snapshot)
 
 @app.post("/clear-history", response_class=HTMLResponse)
 def clear_history(request: Request):
@@ -130,6 +327,7 @@ def clear_history(request: Request):
 
     user_id = user["name"]
     clear_user_cache(user_id)
+    get_answer_cache().clear(user_id)
     return render_home(request)
 
 @app.post("/upload")
@@ -140,59 +338,198 @@ async def upload_file(request: Request, file: UploadFile = File(...)):
 
     user_id = user["name"]
     upload_dir = get_user_folder(user_id)
-    file_path = os.path.join(upload_dir, file.filename)
+    embed_dir = get_embedding_folder(user_id)
+    filename = os.path.basename(file.filename)
+    file_path = os.path.join(upload_dir, filename)
 
-    # Save the uploaded file
+    # Stream the uploaded file to a .part file in chunks, hashing it as it is written
     try:
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
+        staged = await stage_upload_stream(file, file_path)
+        print(f"Saved {filename} ({staged.size} bytes, sha256 {staged.content_hash[:12]}) for user: {user_id}")
+    except UploadTooLarge as e:
+        request.session["toast"] = f"❌ {e}"
+        return RedirectResponse("/", status_code=303)
     except Exception as e:
-        request.session["toast"] = f"❌ Error saving {file.filename}: {str(e)}"
+        request.session["toast"] = f"❌ Error saving {filename}: {str(e)}"
         return RedirectResponse("/", status_code=303)
 
-    # Load the single document with enhanced metadata
+    # Identical content is already indexed, nothing to embed; the file on disk is left as it was
+    duplicate = await asyncio.to_thread(find_file_by_content_hash, embed_dir, user_id, staged.content_hash)
+    if duplicate:
+        staged.discard()
+        request.session["toast"] = f"ℹ️ {filename} is already indexed as {duplicate['filename']}."
+        return RedirectResponse("/", status_code=303)
+
+    # Load, split and embed in the background so the request returns immediately
+    job_manager = get_ingest_job_manager()
     try:
-        print(f"Loading document: {file.filename} for user: {user_id}")
-        documents = load_single_document(file_path, user_id)
-        print(f"Successfully loaded {len(documents)} document chunks")
-        
-        embed_dir = get_embedding_folder(user_id)
-        print(f"Embedding directory: {embed_dir}")
-        
-        # Check if vectorstore exists, if so add to it, otherwise create new
-        vectorstore_path = os.path.join(embed_dir, "chroma.sqlite3")
-        if os.path.exists(vectorstore_path):
-            print("Adding to existing vectorstore...")
-            vectorstore = load_vectorstore(embed_dir)
-            add_documents_to_vectorstore(vectorstore, documents)
-        else:
-            print("Creating new vectorstore...")
-            vectorstore = build_vectorstore(documents, persist_directory=embed_dir)
-
-        # Create retriever with user filtering for better performance
-        print("Creating filtered retriever...")
-        retriever = get_filtered_retriever(
-            persist_directory=embed_dir,
-            user_id=user_id
-        )
-        request.app.state.qa_chain = create_qa_chain(retriever)
-        print("QA chain created successfully")
+        job_manager.check_limit(user_id)
+    except JobLimitError as e:
+        staged.discard()
+        request.session["toast"] = f"❌ {e}"
+        return RedirectResponse("/", status_code=303)
 
-        request.session["toast"] = f"✅ Uploaded {file.filename} successfully with enhanced metadata."
-        
-    except Exception as e:
-        # Clean up file if processing failed
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        
-        print(f"Error processing {file.filename}: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        
-        request.session["toast"] = f"❌ Error processing {file.filename}: {str(e)}"
+    staged.commit()
+    try:
+        job_manager.submit(user_id, file_path, embed_dir, content_hash=staged.content_hash)
+        request.session["toast"] = f"⏳ Processing {filename} in the background..."
+    except JobLimitError as e:
+        # Another job was queued since the check
+        staged.discard()
+        request.session["toast"] = f"❌ {e}"
         
     return RedirectResponse("/", status_code=303)
 
+@app.post("/upload-batch")
+async def upload_files(request: Request, files: List[UploadFile] = File(...)):
+    user = request.session.get("user")
+    if not user:
+        return RedirectResponse("/login", status_code=302)
+
+    user_id = user["name"]
+    upload_dir = get_user_folder(user_id)
+    embed_dir = get_embedding_folder(user_id)
+
+    # Uploads to embed by destination path; nothing replaces a file on disk until the job is accepted
+    staged_uploads: Dict[str, StagedUpload] = {}
+    skipped = []
+    for file in files:
+        filename = os.path.basename(file.filename or "")
+        if not filename.lower().endswith(SUPPORTED_EXTENSIONS):
+            skipped.append(f"{filename or 'unnamed file'} (unsupported type)")
+            continue
+        file_path = os.path.join(upload_dir, filename)
+        try:
+            staged = await stage_upload_stream(file, file_path)
+        except UploadTooLarge:
+            skipped.append(f"{filename} (too large)")
+            continue
+        except Exception as e:
+            skipped.append(f"{filename} ({e})")
+            continue
+
+        # Skip content already indexed, or repeated within this batch
+        duplicate = await asyncio.to_thread(find_file_by_content_hash, embed_dir, user_id, staged.content_hash)
+        if duplicate:
+            staged.discard()
+            skipped.append(f"{filename} (already indexed)")
+            continue
+        if any(other.content_hash == staged.content_hash for other in staged_uploads.values()):
+            staged.discard()
+            skipped.append(f"{filename} (duplicate)")
+            continue
+
+        # A repeated filename replaces the earlier copy of this batch
+        previous = staged_uploads.pop(file_path, None)
+        if previous is not None:
+            previous.discard()
+        staged_uploads[file_path] = staged
+
+    message = ""
+    if staged_uploads:
+        # One job for the whole batch: parsed in parallel, QA chain rebuilt once
+        job_manager = get_ingest_job_manager()
+        try:
+            job_manager.check_limit(user_id)
+            for staged in staged_uploads.values():
+                staged.commit()
+            content_hashes = {path: staged.content_hash for path, staged in staged_uploads.items()}
+            job_manager.submit_batch(user_id, list(staged_uploads), embed_dir, content_hashes)
+            message = f"⏳ Processing {len(staged_uploads)} files in the background..."
+        except JobLimitError as e:
+            for staged in staged_uploads.values():
+                staged.discard()
+            message = f"❌ {e}"
+    if skipped:
+        message = f"{message} Skipped: {', '.join(skipped)}".strip()
+
+    request.session["toast"] = message or "❌ No files to upload."
+    return RedirectResponse("/", status_code=303)
+
+@app.get("/api/jobs")
+def list_jobs(request: Request):
+    """List the current user's ingestion jobs."""
+    user = request.session.get("user")
+    if not user:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    
+    jobs = get_ingest_job_manager().list_jobs(user["name"])
+    return JSONResponse({"jobs": [job.to_dict() for job in jobs]})
+
+@app.get("/api/jobs/{job_id}")
+def get_job(request: Request, job_id: str):
+    """Status and progress (chunks embedded / total) of an ingestion job."""
+    user = request.session.get("user")
+    if not user:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    
+    job = get_ingest_job_manager().get(job_id)
+    if job is None or job.user_id != user["name"]:
+        return JSONResponse({"error": f"Job {job_id} not found"}, status_code=404)
+    return JSONResponse(job.to_dict())
+
+@app.delete("/api/jobs/{job_id}")
+def cancel_job(request: Request, job_id: str):
+    """Cancel a queued or running ingestion job."""
+    user = request.session.get("user")
+    if not user:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    
+    manager = get_ingest_job_manager()
+    job = manager.get(job_id)
+    if job is None or job.user_id != user["name"]:
+        return JSONResponse({"error": f"Job {job_id} not found"}, status_code=404)
+    if not manager.cancel(job_id):
+        return JSONResponse({"error": f"Job {job_id} already {job.status}"}, status_code=409)
+    return JSONResponse({"message": f"Cancelling job {job_id}"})
+
+@app.post("/api/reindex")
+def reindex_files(request: Request):
+    """Re-index the user's upload folder incrementally, by content hash, in a background job."""
+    user = request.session.get("user")
+    if not user:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    
+    user_id = user["name"]
+    try:
+        job = get_ingest_job_manager().submit_reindex(
+            user_id, get_user_folder(user_id), get_embedding_folder(user_id)
+        )
+    except JobLimitError as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+    return JSONResponse(job.to_dict(), status_code=202)
+
+@app.get("/api/embedding-model")
+def get_embedding_model(request: Request):
+    """Embedding model of the user's vector store and the default for new stores."""
+    user = request.session.get("user")
+    if not user:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    
+    metadata = get_store_metadata(get_embedding_folder(user["name"]))
+    return JSONResponse({
+        "embedding_model": metadata["embedding_model"],
+        "collection": metadata["collection"],
+        "default_embedding_model": EMBEDDING_MODEL
+    })
+
+@app.post("/api/embedding-model")
+def migrate_embedding_model(request: Request, model: str = Form(EMBEDDING_MODEL)):
+    """Re-embed the user's vector store with another model in a background job; the current one keeps serving."""
+    user = request.session.get("user")
+    if not user:
+        return JSONResponse({"error": "Not authenticated"}, status_code=401)
+    
+    if not model.strip():
+        return JSONResponse({"error": "No embedding model given"}, status_code=400)
+    
+    user_id = user["name"]
+    try:
+        job = get_ingest_job_manager().submit_migration(user_id, get_embedding_folder(user_id), model.strip())
+    except JobLimitError as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+    return JSONResponse(job.to_dict(), status_code=202)
+
 @app.get("/api/files")
 def get_user_files_api(request: Request):
     """Get list of uploaded files for the current user with metadata."""
@@ -230,15 +567,8 @@ def delete_file(request: Request, filename: str):
         success = delete_documents_by_filename(embed_dir, filename, user_id)
         
         if success:
-            # Rebuild the QA chain with remaining documents
-            if os.path.exists(embed_dir):
-                retriever = get_filtered_retriever(
-                    persist_directory=embed_dir,
-                    user_id=user_id
-                )
-                request.app.state.qa_chain = create_qa_chain(retriever)
-            else:
-                request.app.state.qa_chain = None
+            # The QA chain over the remaining documents is rebuilt on the next question
+            invalidate_user_qa_chain(user_id)
             
             return JSONResponse({"message": f"Successfully deleted {filename}"})
         else:
@@ -269,12 +599,8 @@ def delete_file_by_id(request: Request, file_id: str):
                     os.remove(file_path)
                     print(f"Deleted physical file: {file_path}")
             
-            # Rebuild the QA chain
-            retriever = get_filtered_retriever(
-                persist_directory=embed_dir,
-                user_id=user_id
-            )
-            request.app.state.qa_chain = create_qa_chain(retriever)
+            # The QA chain is rebuilt on the next question
+            invalidate_user_qa_chain(user_id)
             
             return JSONResponse({"message": f"Successfully deleted file with ID {file_id}"})
         else:
@@ -304,6 +630,10 @@ def render_home(request: Request, answer=None, sources=None):
 
     toast = request.session.pop("toast", None)
     history = load_user_cache(user_id)
+    active_jobs = [
+        job.to_dict() for job in get_ingest_job_manager().list_jobs(user_id)
+        if job.status in ACTIVE_STATUSES
+    ]
 
     return templates.TemplateResponse("index.html", {
         "request": request,
@@ -313,5 +643,6 @@ def render_home(request: Request, answer=None, sources=None):
         "file_metadata": file_metadata,  # Enhanced metadata
         "answer": answer,
         "sources": sources,
-        "history": [entry.to_dict() for entry in history][-5:]
+        "history": [entry.to_dict() for entry in history][-5:],
+        "active_jobs": active_jobs
     })
\ No newline at end of file
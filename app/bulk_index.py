@@ -0,0 +1,181 @@
+"""
+Offline bulk indexer: parse a directory of documents in parallel and embed them
+into a user's vector store without going through the web server.
+
+    python -m app.bulk_index path/to/docs --user alice
+    python -m app.bulk_index --user alice --reindex
+    python -m app.bulk_index --user alice --repair-manifest
+    python -m app.bulk_index --user alice --migrate-embeddings nomic-embed-text
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Dict, Iterator, List
+
+from dotenv import load_dotenv
+from langchain.docstore.document import Document
+
+# Same .env as the server, loaded before the src imports read their settings
+load_dotenv()
+
+from app.uploads import StagedUpload, stage_file_copy
+from src.loaders.file_loader import (
+    LOADER_MAX_WORKERS, compute_file_hash, list_supported_files, load_documents_parallel
+)
+from src.rag.embedding_migration import migrate_embedding_model
+from src.rag.ingest_pipeline import INGEST_BATCH_SIZE, embed_and_write
+from src.rag.reindex import reindex_user_folder
+from src.rag.vector_store import (
+    delete_documents_by_file_id, find_file_by_content_hash, get_user_files, load_vectorstore,
+    repair_file_manifest, split_documents
+)
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Bulk-index a directory of documents for one user.")
+    parser.add_argument("directory", nargs="?", help="Directory containing .pdf, .docx, .txt or .xlsx files")
+    parser.add_argument("--user", required=True, help="User the documents belong to")
+    parser.add_argument("--workers", type=int, default=LOADER_MAX_WORKERS, help="Parser processes")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE, help="Chunks embedded and written per batch")
+    parser.add_argument(
+        "--no-copy", action="store_true",
+        help="Index files in place instead of copying them to user_uploads/<user>"
+    )
+    parser.add_argument(
+        "--reindex", action="store_true",
+        help="Reconcile the store with user_uploads/<user> by content hash instead of indexing a directory"
+    )
+    parser.add_argument(
+        "--repair-manifest", action="store_true",
+        help="Rebuild the user's file manifest from the chunks in the vector store"
+    )
+    parser.add_argument(
+        "--migrate-embeddings", metavar="MODEL",
+        help="Re-embed the user's store with another embedding model"
+    )
+    args = parser.parse_args(argv)
+    if not args.directory and not (args.reindex or args.repair_manifest or args.migrate_embeddings):
+        parser.error("a directory is required unless --reindex, --repair-manifest or --migrate-embeddings is given")
+    return args
+
+
+def main(argv: List[str] = None) -> int:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    upload_dir = os.path.join("user_uploads", args.user)
+    embed_dir = os.path.join("embeddings", args.user)
+    os.makedirs(upload_dir, exist_ok=True)
+    os.makedirs(embed_dir, exist_ok=True)
+
+    if args.repair_manifest:
+        report = repair_file_manifest(embed_dir)
+        print(
+            f"Manifest for {args.user}: {report['files']} files; added {report['added'] or 'none'}, "
+            f"removed {report['removed'] or 'none'}, recounted {report['recounted'] or 'none'}"
+        )
+        return 0
+
+    if args.migrate_embeddings:
+        stats = migrate_embedding_model(
+            embed_dir, args.migrate_embeddings, batch_size=args.batch_size,
+            progress_callback=lambda done, total: print(f"\rRe-embedded {done}/{total} chunks", end="", flush=True)
+        )
+        print(f"\nMigrated {args.user} from {stats['previous_model']!r} to {stats['model']!r}: {stats['chunks']} chunks")
+        print("If the server is running, restart it to serve the migrated store.")
+        return 0
+
+    if args.reindex:
+        stats = reindex_user_folder(upload_dir, embed_dir, args.user)
+        print(f"Re-indexed {upload_dir}: {stats}")
+        return 0
+
+    # Indexed files by path, to drop the chunks of those a copy replaces
+    previous_file_ids: Dict[str, List[str]] = {}
+    for file in get_user_files(embed_dir, args.user):
+        if file.get("file_path"):
+            previous_file_ids.setdefault(os.path.abspath(file["file_path"]), []).append(file["file_id"])
+
+    # Skip files whose content is already indexed for this user, or repeated in the directory
+    file_paths = []
+    staged_uploads: List[StagedUpload] = []
+    seen_hashes: Dict[str, str] = {}
+    try:
+        for file_path in list_supported_files(args.directory):
+            filename = os.path.basename(file_path)
+            content_hash = compute_file_hash(file_path)
+            duplicate = find_file_by_content_hash(embed_dir, args.user, content_hash)
+            if duplicate:
+                print(f"Skipping {filename}: already indexed as {duplicate['filename']}")
+                continue
+            if content_hash in seen_hashes:
+                print(f"Skipping {filename}: same content as {seen_hashes[content_hash]}")
+                continue
+            seen_hashes[content_hash] = filename
+            if not args.no_copy:
+                destination = os.path.abspath(os.path.join(upload_dir, filename))
+                if destination != file_path:
+                    staged_uploads.append(stage_file_copy(file_path, destination, content_hash))
+                file_path = destination
+            file_paths.append(file_path)
+    except BaseException:
+        for staged in staged_uploads:
+            staged.discard()
+        raise
+
+    if not file_paths:
+        print("Nothing to index.")
+        return 0
+
+    # Copies replace uploads of the same name only once every file was checked
+    for staged in staged_uploads:
+        staged.commit()
+
+    print(f"Indexing {len(file_paths)} files for {args.user} with {args.workers} parser processes...")
+    indexed: List[Document] = []
+    parsed_paths = set()
+    failed = 0
+
+    def iter_chunks() -> Iterator[Document]:
+        # Chunks of each file enter the embedding pipeline as soon as it is parsed
+        nonlocal failed
+        for file_path, docs, error in load_documents_parallel(file_paths, args.user, args.workers):
+            if error:
+                failed += 1
+                print(f"  ✗ {os.path.basename(file_path)}: {error}")
+                continue
+            parsed_paths.add(file_path)
+            if docs:
+                indexed.append(docs[0])
+                print(f"  ✓ parsed {os.path.basename(file_path)} ({len(docs)} sections)")
+            yield from split_documents(docs)
+
+    def on_progress(done: int, total) -> None:
+        print(f"  embedded {done} chunks", end="\r")
+
+    started = time.perf_counter()
+    vectorstore = load_vectorstore(embed_dir)
+    stats = embed_and_write(
+        vectorstore, iter_chunks(),
+        batch_size=args.batch_size,
+        progress_callback=on_progress
+    )
+
+    # The chunks of an upload a copy replaced go once its new content is indexed
+    # (if it failed to parse they stay, like for uploads through the server)
+    for staged in staged_uploads:
+        if staged.dest_path in parsed_paths:
+            for file_id in previous_file_ids.get(staged.dest_path, []):
+                delete_documents_by_file_id(embed_dir, file_id)
+
+    print(
+        f"\nIndexed {len(indexed)} files ({failed} failed), {stats['chunks']} chunks in "
+        f"{time.perf_counter() - started:.1f}s ({stats['chunks_per_second']} chunks/s, "
+        f"embedding cache hit ratio: {stats['cache_hit_ratio']})"
+    )
+    # A running server keeps its open store for this user until it is evicted or restarted
+    print("If the server is running, restart it to serve the newly indexed files.")
+    return 1 if failed and not indexed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,435 @@
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from src.loaders.file_loader import iter_single_document, load_documents_parallel
+from src.rag.chain_registry import invalidate_user_qa_chain
+from src.rag.embedding_migration import migrate_embedding_model
+from src.rag.reindex import reindex_user_folder
+from src.rag.vector_store import (
+    IngestCancelled, add_document_stream_to_vectorstore, add_documents_to_vectorstore,
+    delete_documents_by_file_id, get_user_files, load_vectorstore
+)
+
+INGEST_MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", "2"))
+INGEST_MAX_JOBS_PER_USER = int(os.getenv("INGEST_MAX_JOBS_PER_USER", "2"))
+# Seconds finished jobs stay queryable through /api/jobs
+INGEST_JOB_RETENTION = float(os.getenv("INGEST_JOB_RETENTION", "3600"))
+# Jobs interrupted by a shutdown, queued again on the next startup
+INGEST_RESUME_PATH = os.getenv("INGEST_RESUME_PATH", os.path.join("user_uploads", "interrupted_jobs.json"))
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class JobLimitError(Exception):
+    """Raised when a user already has the maximum number of active ingestion jobs."""
+
+
+class IngestJob:
+    def __init__(
+        self,
+        user_id: str,
+        file_paths: List[str],
+        embed_dir: str,
+        content_hashes: Optional[Dict[str, str]] = None,
+        reindex_dir: Optional[str] = None,
+        migrate_model: Optional[str] = None
+    ):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.file_paths = list(file_paths)
+        self.filenames = [os.path.basename(path) for path in self.file_paths]
+        self.filename = self.filenames[0] if len(self.filenames) == 1 else f"{len(self.filenames)} files"
+        self.embed_dir = embed_dir
+        self.content_hashes = content_hashes or {}
+        # Set for re-index jobs: the upload folder to reconcile the store with
+        self.reindex_dir = reindex_dir
+        if reindex_dir:
+            self.filename = "re-index"
+        # Set for embedding migration jobs: the model to re-embed the store with
+        self.migrate_model = migrate_model
+        if migrate_model:
+            self.filename = f"embedding migration to {migrate_model}"
+        self.failed_files: Dict[str, str] = {}
+        self.status = "queued"
+        self.chunks_total = 0
+        self.chunks_embedded = 0
+        self.error: Optional[str] = None
+        self.stats: Optional[Dict[str, Any]] = None
+        self.created_at = datetime.now().isoformat()
+        self.finished_at: Optional[float] = None
+        self._cancel_event = threading.Event()
+
+    @property
+    def exclusive(self) -> bool:
+        """Re-index and migration jobs work on the whole store and never overlap other jobs."""
+        return bool(self.reindex_dir or self.migrate_model)
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def cancel(self) -> None:
+        self._cancel_event.set()
+
+    def to_record(self) -> Dict[str, Any]:
+        """What is needed to queue the job again after a restart."""
+        return {
+            "user_id": self.user_id,
+            "file_paths": self.file_paths,
+            "embed_dir": self.embed_dir,
+            "content_hashes": self.content_hashes,
+            "reindex_dir": self.reindex_dir,
+            "migrate_model": self.migrate_model
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "filenames": self.filenames,
+            "failed_files": self.failed_files,
+            "status": self.status,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_total": self.chunks_total,
+            "progress": round(self.chunks_embedded / self.chunks_total, 3) if self.chunks_total else 0.0,
+            "error": self.error,
+            "stats": self.stats,
+            "created_at": self.created_at
+        }
+
+
+class IngestJobManager:
+    """
+    Runs document ingestion (load, split, embed, write) on a bounded worker pool
+    so uploads return immediately. Jobs report progress, can be cancelled between
+    embedding batches, and each user may only have a limited number active at once.
+
+    On shutdown, active jobs are stopped as "interrupted": their partial chunks are
+    removed but their uploaded files are kept, and they are recorded in
+    INGEST_RESUME_PATH so resume_interrupted() queues them again on startup.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = INGEST_MAX_WORKERS,
+        max_jobs_per_user: int = INGEST_MAX_JOBS_PER_USER
+    ):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="ingest")
+        self._max_jobs_per_user = max(1, max_jobs_per_user)
+        self._jobs: Dict[str, IngestJob] = {}
+        self._lock = threading.Lock()
+        self._stopping = False
+
+    def submit(
+        self,
+        user_id: str,
+        file_path: str,
+        embed_dir: str,
+        content_hash: Optional[str] = None
+    ) -> IngestJob:
+        content_hashes = {file_path: content_hash} if content_hash else None
+        return self.submit_batch(user_id, [file_path], embed_dir, content_hashes)
+
+    def submit_batch(
+        self,
+        user_id: str,
+        file_paths: List[str],
+        embed_dir: str,
+        content_hashes: Optional[Dict[str, str]] = None
+    ) -> IngestJob:
+        """
+        Queue one job for several files: they are parsed in parallel, embedded through a
+        single pipeline and the user's QA chain is rebuilt once at the end.
+        """
+        return self._enqueue(IngestJob(user_id, file_paths, embed_dir, content_hashes))
+
+    def submit_reindex(self, user_id: str, upload_dir: str, embed_dir: str) -> IngestJob:
+        """Queue an incremental re-index of the user's upload folder (see reindex_user_folder)."""
+        return self._enqueue(IngestJob(user_id, [], embed_dir, reindex_dir=upload_dir))
+
+    def submit_migration(self, user_id: str, embed_dir: str, model_name: str) -> IngestJob:
+        """Queue re-embedding the user's store with another model (see migrate_embedding_model)."""
+        return self._enqueue(IngestJob(user_id, [], embed_dir, migrate_model=model_name))
+
+    def check_limit(self, user_id: str, exclusive: bool = False) -> None:
+        """
+        Raise JobLimitError if the user could not queue another job right now, e.g.
+        before an upload replaces a file on disk.
+        """
+        with self._lock:
+            self._check_limit(user_id, exclusive)
+
+    def _check_limit(self, user_id: str, exclusive: bool) -> None:
+        # Caller must hold self._lock
+        self._prune()
+        active = [
+            other for other in self._jobs.values()
+            if other.user_id == user_id and other.status in ACTIVE_STATUSES
+        ]
+        # Re-index and migration jobs cover the whole store, so they never overlap other jobs of the user
+        if active and (exclusive or any(other.exclusive for other in active)):
+            raise JobLimitError("Please wait for your current processing, re-index or migration jobs to finish.")
+        if len(active) >= self._max_jobs_per_user:
+            raise JobLimitError(
+                f"You already have {len(active)} uploads processing, please wait for them to finish."
+            )
+
+    def _enqueue(self, job: IngestJob) -> IngestJob:
+        with self._lock:
+            self._check_limit(job.user_id, job.exclusive)
+            self._jobs[job.id] = job
+
+        self._executor.submit(self._run, job)
+        print(f"[INGEST] Queued job {job.id} for {job.filename} (user: {job.user_id})")
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self, user_id: str) -> List[IngestJob]:
+        with self._lock:
+            self._prune()
+            return [job for job in self._jobs.values() if job.user_id == user_id]
+
+    def cancel(self, job_id: str) -> bool:
+        """Request cancellation. Returns False if the job is unknown or already finished."""
+        job = self.get(job_id)
+        if job is None or job.status not in ACTIVE_STATUSES:
+            return False
+        job.cancel()
+        return True
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._stopping = True
+            active = [job for job in self._jobs.values() if job.status in ACTIVE_STATUSES]
+            for job in active:
+                job.cancel()
+        if active:
+            self._save_interrupted(active)
+        self._executor.shutdown(wait=False)
+
+    def resume_interrupted(self) -> int:
+        """Queue the jobs a previous shutdown interrupted. Returns the number queued."""
+        try:
+            with open(INGEST_RESUME_PATH, "r") as f:
+                records = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except ValueError as e:
+            print(f"[INGEST] Ignoring unreadable {INGEST_RESUME_PATH}: {e}")
+            records = []
+        os.remove(INGEST_RESUME_PATH)
+
+        resumed = 0
+        for record in records:
+            file_paths = [path for path in record["file_paths"] if os.path.exists(path)]
+            if record["file_paths"] and not file_paths:
+                continue
+            job = IngestJob(
+                record["user_id"], file_paths, record["embed_dir"],
+                content_hashes=record.get("content_hashes"),
+                reindex_dir=record.get("reindex_dir"),
+                migrate_model=record.get("migrate_model")
+            )
+            try:
+                self._enqueue(job)
+                resumed += 1
+            except JobLimitError as e:
+                print(f"[INGEST] Could not resume {job.filename} for {job.user_id}: {e}")
+        return resumed
+
+    def _save_interrupted(self, jobs: List[IngestJob]) -> None:
+        os.makedirs(os.path.dirname(INGEST_RESUME_PATH) or ".", exist_ok=True)
+        tmp_path = f"{INGEST_RESUME_PATH}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump([job.to_record() for job in jobs], f, indent=2)
+        os.replace(tmp_path, INGEST_RESUME_PATH)
+        print(f"[INGEST] Saved {len(jobs)} interrupted job(s) to resume on startup")
+
+    def _run(self, job: IngestJob) -> None:
+        if job.cancel_requested:
+            if not self._stopping:
+                self._rollback(job, [])
+            self._finish(job, "interrupted" if self._stopping else "cancelled")
+            return
+        if job.reindex_dir:
+            self._run_reindex(job)
+            return
+        if job.migrate_model:
+            self._run_migration(job)
+            return
+
+        job.status = "running"
+        file_ids: List[str] = []
+
+        def on_progress(done: int, total: Optional[int]) -> None:
+            job.chunks_embedded = done
+            if total is not None:
+                job.chunks_total = total
+
+        def track_file_ids(documents: Iterable[Any]) -> Iterator[Any]:
+            for doc in documents:
+                file_id = doc.metadata.get("file_id")
+                if file_id and file_id not in file_ids:
+                    file_ids.append(file_id)
+                yield doc
+
+        try:
+            documents = self._load(job)
+            vectorstore = load_vectorstore(job.embed_dir)
+
+            if isinstance(documents, list):
+                file_ids = list(dict.fromkeys(
+                    doc.metadata["file_id"] for doc in documents if doc.metadata.get("file_id")
+                ))
+                if job.cancel_requested:
+                    raise IngestCancelled(f"Ingest cancelled before embedding {job.filename}")
+                job.stats = add_documents_to_vectorstore(
+                    vectorstore, documents,
+                    progress_callback=on_progress,
+                    should_cancel=lambda: job.cancel_requested
+                )
+            else:
+                # Lazily loaded (PDF pages): embedding starts while the file is still being read
+                job.stats = add_document_stream_to_vectorstore(
+                    vectorstore, track_file_ids(documents),
+                    progress_callback=on_progress,
+                    should_cancel=lambda: job.cancel_requested
+                )
+            invalidate_user_qa_chain(job.user_id)
+            self._finish(job, "completed")
+
+        except IngestCancelled:
+            # Interrupted jobs run again after a restart, so their uploads are kept
+            self._rollback(job, file_ids, remove_files=not self._stopping)
+            self._finish(job, "interrupted" if self._stopping else "cancelled")
+
+        except Exception as e:
+            print(f"[INGEST] Error processing {job.filename}: {e}")
+            traceback.print_exc()
+            job.error = str(e)
+            self._rollback(job, file_ids)
+            self._finish(job, "failed")
+
+    def _run_reindex(self, job: IngestJob) -> None:
+        job.status = "running"
+
+        def on_file(filename: str) -> None:
+            job.filenames.append(filename)
+
+        try:
+            job.stats = reindex_user_folder(
+                job.reindex_dir, job.embed_dir, job.user_id,
+                progress_callback=on_file,
+                should_cancel=lambda: job.cancel_requested
+            )
+            self._finish(job, "completed")
+        except IngestCancelled:
+            self._finish(job, "interrupted" if self._stopping else "cancelled")
+        except Exception as e:
+            print(f"[INGEST] Error re-indexing for {job.user_id}: {e}")
+            traceback.print_exc()
+            job.error = str(e)
+            self._finish(job, "failed")
+        finally:
+            # Whatever was reconciled is already live; nothing is rolled back
+            invalidate_user_qa_chain(job.user_id)
+
+    def _run_migration(self, job: IngestJob) -> None:
+        job.status = "running"
+
+        def on_progress(done: int, total: Optional[int]) -> None:
+            job.chunks_embedded = done
+            if total is not None:
+                job.chunks_total = total
+
+        try:
+            job.stats = migrate_embedding_model(
+                job.embed_dir, job.migrate_model,
+                progress_callback=on_progress,
+                should_cancel=lambda: job.cancel_requested
+            )
+            invalidate_user_qa_chain(job.user_id)
+            self._finish(job, "completed")
+        except IngestCancelled:
+            # The old collection kept serving and is left as it was
+            self._finish(job, "interrupted" if self._stopping else "cancelled")
+        except Exception as e:
+            print(f"[INGEST] Error migrating embeddings for {job.user_id}: {e}")
+            traceback.print_exc()
+            job.error = str(e)
+            self._finish(job, "failed")
+
+    def _load(self, job: IngestJob) -> Iterable[Any]:
+        """
+        Parse the job's files. A single PDF is returned as a lazy page iterator; in a
+        batch, files that fail to parse are skipped and removed.
+        """
+        if len(job.file_paths) == 1:
+            file_path = job.file_paths[0]
+            return iter_single_document(file_path, job.user_id, content_hash=job.content_hashes.get(file_path))
+
+        documents = []
+        for file_path, docs, error in load_documents_parallel(job.file_paths, job.user_id):
+            if error:
+                print(f"[INGEST] Skipping {os.path.basename(file_path)}: {error}")
+                job.failed_files[os.path.basename(file_path)] = error
+                self._remove_uploads(job, [file_path])
+                continue
+            documents.extend(docs)
+
+        if not documents:
+            raise ValueError(f"None of the {len(job.file_paths)} files could be parsed")
+        return documents
+
+    def _rollback(self, job: IngestJob, file_ids: List[str], remove_files: bool = True) -> None:
+        """
+        Remove the chunks a failed or cancelled job wrote (file ids are unique per
+        ingest, so earlier uploads of the same file are untouched) and, if
+        `remove_files`, its uploaded files.
+        """
+        for file_id in file_ids:
+            delete_documents_by_file_id(job.embed_dir, file_id)
+        if file_ids:
+            invalidate_user_qa_chain(job.user_id)
+        if remove_files:
+            self._remove_uploads(job, job.file_paths)
+
+    def _remove_uploads(self, job: IngestJob, file_paths: List[str]) -> None:
+        # An upload that replaced an indexed file of the same name is kept, so the
+        # store never lists a file that is missing from disk
+        indexed = {file["filename"] for file in get_user_files(job.embed_dir, job.user_id)}
+        for file_path in file_paths:
+            if os.path.basename(file_path) not in indexed and os.path.exists(file_path):
+                os.remove(file_path)
+
+    def _finish(self, job: IngestJob, status: str) -> None:
+        job.status = status
+        job.finished_at = time.time()
+        print(f"[INGEST] Job {job.id} for {job.filename} {status}")
+
+    def _prune(self) -> None:
+        # Caller must hold self._lock
+        cutoff = time.time() - INGEST_JOB_RETENTION
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+_ingest_job_manager = IngestJobManager()
+
+
+def get_ingest_job_manager() -> IngestJobManager:
+    return _ingest_job_manager
@@ -1,4 +1,7 @@
 import requests
+import httpx
+
+from src.http_pool import get_async_client
 
 MCP_URL = "http://localhost:11434/api/chat"  # Adjust if your MCP expects a different endpoint
 
@@ -9,4 +12,14 @@ def ask_mcp(question: str) -> dict:
         return res.json()  # should return dict with "answer" and optionally "sources"
     except Exception as e:
         print(f"[MCP ERROR] {e}")
-        return {"answer": "Failed to get answer from MCP.", "sources": []}
\ No newline at end of file
+        return {"answer": "Failed to get answer from MCP.", "sources": []}
+
+async def aask_mcp(question: str) -> dict:
+    try:
+        client = get_async_client("mcp", timeout=httpx.Timeout(connect=10.0, read=None, write=30.0, pool=None))
+        res = await client.post(MCP_URL, json={"question": question})
+        res.raise_for_status()
+        return res.json()
+    except Exception as e:
+        print(f"[MCP ERROR] {e}")
+        return {"answer": "Failed to get answer from MCP.", "sources": []}
@@ -0,0 +1,101 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import uuid
+
+from fastapi import UploadFile
+
+MAX_UPLOAD_MB = float(os.getenv("MAX_UPLOAD_MB", "100"))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the configured maximum size."""
+
+
+class StagedUpload:
+    """
+    An upload saved next to its destination as a `.part` file. It only replaces
+    `dest_path` on commit(), so checks on its content (size, duplicate hash) run
+    before any existing file is touched.
+    """
+
+    def __init__(self, tmp_path: str, dest_path: str, size: int, content_hash: str):
+        self.tmp_path = tmp_path
+        self.dest_path = dest_path
+        self.size = size
+        self.content_hash = content_hash
+        self.committed = False
+        # Set by commit(): whether an existing file was overwritten
+        self.replaced = False
+
+    def commit(self) -> None:
+        self.replaced = os.path.exists(self.dest_path)
+        os.replace(self.tmp_path, self.dest_path)
+        self.committed = True
+
+    def discard(self) -> None:
+        """
+        Drop the upload: its .part file, or after commit() the file itself unless it
+        replaced an existing one (whose previous content is gone either way).
+        """
+        if not self.committed:
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+        elif not self.replaced and os.path.exists(self.dest_path):
+            os.remove(self.dest_path)
+
+
+async def stage_upload_stream(
+    upload: UploadFile,
+    dest_path: str,
+    max_bytes: int = int(MAX_UPLOAD_MB * 1024 * 1024),
+    chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> StagedUpload:
+    """
+    Copy an uploaded file to disk in fixed-size chunks, hashing it on the way.
+
+    The data is written to a uniquely named `.part` file beside `dest_path` (so
+    several uploads of one name can be staged at once); call commit() on the result
+    to move it into place or discard() to drop it. Raises UploadTooLarge as soon as
+    `max_bytes` is exceeded, leaving nothing behind.
+    """
+    tmp_path = f"{dest_path}.{uuid.uuid4().hex[:8]}.part"
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with open(tmp_path, "wb") as f:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(
+                        f"{upload.filename} exceeds the maximum upload size of {max_bytes // (1024 * 1024)} MB"
+                    )
+                digest.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return StagedUpload(tmp_path, dest_path, size, digest.hexdigest())
+
+
+def stage_file_copy(source_path: str, dest_path: str, content_hash: str) -> StagedUpload:
+    """
+    Copy a local file to a uniquely named `.part` file beside `dest_path`, like
+    stage_upload_stream does for uploads (used by the offline bulk indexer).
+    """
+    tmp_path = f"{dest_path}.{uuid.uuid4().hex[:8]}.part"
+    try:
+        shutil.copy2(source_path, tmp_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return StagedUpload(tmp_path, dest_path, os.path.getsize(tmp_path), content_hash)
@@ -0,0 +1,94 @@
+"""
+Compare the native DOCX/XLSX loaders (python-docx, openpyxl) against the
+unstructured loaders on parse time and peak memory.
+
+    python scripts/benchmark_loaders.py report.docx sales.xlsx --repeat 3
+
+Every measurement runs in a fresh process, so import cost is included in the
+first (cold) run and peak RSS is not inflated by earlier runs.
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def _unstructured_loader(file_path: str):
+    from langchain_community.document_loaders import UnstructuredExcelLoader, UnstructuredWordDocumentLoader
+    if file_path.lower().endswith(".docx"):
+        return UnstructuredWordDocumentLoader(file_path).load()
+    return UnstructuredExcelLoader(file_path).load()
+
+
+def _native_loader(file_path: str):
+    from src.loaders.file_loader import load_docx_native, load_xlsx_native
+    if file_path.lower().endswith(".docx"):
+        return load_docx_native(file_path)
+    return load_xlsx_native(file_path)
+
+
+LOADERS = {"native": _native_loader, "unstructured": _unstructured_loader}
+
+
+def _measure(loader_name: str, file_path: str, repeat: int, results) -> None:
+    loader = LOADERS[loader_name]
+    try:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            docs = loader(file_path)
+            timings.append(time.perf_counter() - started)
+        # ru_maxrss is reported in KiB on Linux
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        results.put({
+            "cold_s": timings[0],
+            "warm_s": min(timings[1:]) if len(timings) > 1 else None,
+            "peak_rss_mb": peak_mb,
+            "documents": len(docs),
+            "characters": sum(len(doc.page_content) for doc in docs)
+        })
+    except Exception as e:
+        results.put({"error": str(e)})
+
+
+def run(loader_name: str, file_path: str, repeat: int) -> dict:
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_measure, args=(loader_name, file_path, repeat, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help=".docx or .xlsx files to parse")
+    parser.add_argument("--repeat", type=int, default=3, help="Parses per loader (first one is cold)")
+    args = parser.parse_args()
+
+    print(f"{'file':<30} {'loader':<13} {'cold s':>8} {'warm s':>8} {'peak MB':>9} {'docs':>6} {'chars':>10}")
+    for file_path in args.files:
+        if not file_path.lower().endswith((".docx", ".xlsx")):
+            print(f"Skipping {file_path}: only .docx and .xlsx are benchmarked")
+            continue
+        for loader_name in LOADERS:
+            result = run(loader_name, file_path, max(1, args.repeat))
+            name = os.path.basename(file_path)[:30]
+            if "error" in result:
+                print(f"{name:<30} {loader_name:<13} error: {result['error']}")
+                continue
+            warm = f"{result['warm_s']:.3f}" if result["warm_s"] is not None else "-"
+            print(
+                f"{name:<30} {loader_name:<13} {result['cold_s']:>8.3f} {warm:>8} "
+                f"{result['peak_rss_mb']:>9.1f} {result['documents']:>6} {result['characters']:>10}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
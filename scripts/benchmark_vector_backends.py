@@ -0,0 +1,98 @@
+"""
+Compare the in-process flat index against Chroma on write time, query latency
+and disk usage, with synthetic embeddings (Ollama is not needed).
+
+    python scripts/benchmark_vector_backends.py --chunks 200 500 2000 --dim 4096 --queries 200
+
+Both backends are queried through their collection API with the same random
+vectors and the same `user_id` filter the app applies, so only the search
+itself is timed, not query embedding.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain_chroma import Chroma  # noqa: E402
+
+from src.rag.flat_index import FlatIndexVectorStore  # noqa: E402
+
+
+def _directory_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / (1024 * 1024)
+
+
+def _open(backend: str, persist_directory: str, dtype: str):
+    if backend == "chroma":
+        return Chroma(persist_directory=persist_directory)
+    return FlatIndexVectorStore(persist_directory=persist_directory, dtype=dtype)
+
+
+def run(backend: str, vectors: np.ndarray, queries: np.ndarray, k: int, dtype: str) -> dict:
+    count = len(vectors)
+    ids = [str(uuid.uuid4()) for _ in range(count)]
+    # Two users share the store, like the per-user filter in production
+    metadatas = [{"user_id": "alice" if i % 2 else "bob", "file_id": f"file-{i // 50}"} for i in range(count)]
+    documents = [f"chunk {i}" for i in range(count)]
+
+    with tempfile.TemporaryDirectory() as persist_directory:
+        store = _open(backend, persist_directory, dtype)
+        started = time.perf_counter()
+        for start in range(0, count, 32):
+            store._collection.upsert(
+                ids=ids[start:start + 32],
+                embeddings=vectors[start:start + 32].tolist(),
+                metadatas=metadatas[start:start + 32],
+                documents=documents[start:start + 32]
+            )
+        write_s = time.perf_counter() - started
+
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            store._collection.query(query_embeddings=[query.tolist()], n_results=k, where={"user_id": "alice"})
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        return {
+            "write_s": write_s,
+            "p50_ms": statistics.median(latencies),
+            "p95_ms": latencies[int(0.95 * (len(latencies) - 1))],
+            "disk_mb": _directory_mb(persist_directory)
+        }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[200, 1000, 2000], help="Store sizes to test")
+    parser.add_argument("--dim", type=int, default=4096, help="Embedding dimension (4096 for mistral)")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per backend and size")
+    parser.add_argument("--k", type=int, default=30, help="Results per query (the rerank candidate pool)")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"], help="Flat index storage type")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'chunks':>7} {'backend':<8} {'write s':>8} {'p50 ms':>8} {'p95 ms':>8} {'disk MB':>8}")
+    for count in args.chunks:
+        vectors = rng.standard_normal((count, args.dim), dtype=np.float32)
+        queries = rng.standard_normal((max(1, args.queries), args.dim), dtype=np.float32)
+        for backend in ("flat", "chroma"):
+            result = run(backend, vectors, queries, args.k, args.dtype)
+            print(
+                f"{count:>7} {backend:<8} {result['write_s']:>8.2f} {result['p50_ms']:>8.2f} "
+                f"{result['p95_ms']:>8.2f} {result['disk_mb']:>8.1f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
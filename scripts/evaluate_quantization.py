@@ -0,0 +1,114 @@
+"""
+Measure what flat index quantization costs in recall and saves in memory:
+recall@k of float16, int8 and int8 with full-precision rescoring against exact
+float32 search, plus bytes per stored vector and query latency.
+
+    python scripts/evaluate_quantization.py --store embeddings/alice --k 4 30
+    python scripts/evaluate_quantization.py --chunks 2000 --dim 4096
+
+With --store, the embeddings of an existing vector store (flat index or Chroma)
+are evaluated, using perturbed copies of stored chunks as queries; otherwise a
+synthetic clustered corpus is generated. Ollama is not needed.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.flat_index import FlatCollection, flat_index_exists  # noqa: E402
+
+MODES = [("float32", False), ("float16", False), ("int8", False), ("int8", True)]
+
+
+def _store_vectors(persist_directory: str) -> np.ndarray:
+    if flat_index_exists(persist_directory):
+        # float32 so opening the store never converts it
+        results = FlatCollection(persist_directory, dtype="float32").get(include=["embeddings"])
+    else:
+        from langchain_chroma import Chroma
+        results = Chroma(persist_directory=persist_directory)._collection.get(include=["embeddings"])
+    return np.asarray(results["embeddings"], dtype=np.float32)
+
+
+def _synthetic_vectors(count: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    # Clustered like real chunk embeddings (topics), not uniformly spread
+    centers = rng.standard_normal((max(1, count // 50), dim), dtype=np.float32)
+    assignment = rng.integers(0, len(centers), count)
+    return centers[assignment] + 0.5 * rng.standard_normal((count, dim), dtype=np.float32)
+
+
+def _exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int) -> list:
+    """Ids of the k nearest vectors to each query, nearest first."""
+    squared_norms = np.einsum("ij,ij->i", vectors, vectors)
+    neighbours = []
+    for query in queries:
+        distances = squared_norms - 2.0 * (vectors @ query)
+        neighbours.append(np.argsort(distances, kind="stable")[:k].tolist())
+    return neighbours
+
+
+def evaluate(vectors: np.ndarray, queries: np.ndarray, ks: list, dtype: str, rescore: bool) -> dict:
+    chunk_ids = [str(i) for i in range(len(vectors))]
+    with tempfile.TemporaryDirectory() as persist_directory:
+        collection = FlatCollection(persist_directory, dtype=dtype)
+        for start in range(0, len(vectors), 256):
+            collection.upsert(
+                ids=chunk_ids[start:start + 256],
+                embeddings=vectors[start:start + 256].tolist(),
+                documents=chunk_ids[start:start + 256]
+            )
+        # The app rescores with vectors from the embedding cache; the originals stand in here
+        full_vectors = (lambda texts: [vectors[int(text)] for text in texts]) if rescore else None
+
+        recalls = {k: [] for k in ks}
+        latencies = []
+        for query, exact in zip(queries, _exact_neighbours(vectors, queries, max(ks))):
+            started = time.perf_counter()
+            found = collection.query([query.tolist()], n_results=max(ks), rescore=full_vectors)["ids"][0]
+            latencies.append((time.perf_counter() - started) * 1000)
+            for k in ks:
+                recalls[k].append(len({int(chunk_id) for chunk_id in found[:k]} & set(exact[:k])) / k)
+        return {
+            "bytes_per_vector": collection.nbytes() / len(vectors),
+            "recall": {k: statistics.mean(values) for k, values in recalls.items()},
+            "p50_ms": statistics.median(latencies)
+        }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", help="Vector store directory to evaluate, e.g. embeddings/alice")
+    parser.add_argument("--chunks", type=int, default=2000, help="Synthetic corpus size (without --store)")
+    parser.add_argument("--dim", type=int, default=4096, help="Synthetic embedding dimension (without --store)")
+    parser.add_argument("--queries", type=int, default=200, help="Queries to evaluate")
+    parser.add_argument("--k", type=int, nargs="+", default=[4, 30], help="Recall cut-offs")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = _store_vectors(args.store) if args.store else _synthetic_vectors(args.chunks, args.dim, rng)
+    if len(vectors) <= max(args.k):
+        print(f"Need more than {max(args.k)} vectors, found {len(vectors)}")
+        return 1
+    # Queries near stored chunks, as questions are near the passages answering them
+    picked = vectors[rng.integers(0, len(vectors), max(1, args.queries))]
+    queries = picked + 0.3 * picked.std() * rng.standard_normal(picked.shape, dtype=np.float32)
+
+    print(f"{len(vectors)} vectors of dimension {vectors.shape[1]}, {len(queries)} queries")
+    recall_headers = " ".join(f"{f'recall@{k}':>10}" for k in args.k)
+    print(f"{'storage':<16} {'bytes/vec':>10} {recall_headers} {'p50 ms':>8}")
+    for dtype, rescore in MODES:
+        result = evaluate(vectors, queries, args.k, dtype, rescore)
+        name = f"{dtype}+rescore" if rescore else dtype
+        recalls = " ".join(f"{result['recall'][k]:>10.3f}" for k in args.k)
+        print(f"{name:<16} {result['bytes_per_vector']:>10.0f} {recalls} {result['p50_ms']:>8.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+import os
+import threading
+from typing import Dict, Optional
+
+import httpx
+
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "100"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "20"))
+HTTP_POOL_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", "60"))
+
+_lock = threading.Lock()
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def get_async_client(target: str, timeout: Optional[httpx.Timeout] = None) -> httpx.AsyncClient:
+    """
+    Return the shared keep-alive `httpx.AsyncClient` for an outbound target
+    (e.g. "ollama", "serper", "duckduckgo", "mcp"), creating it on first use.
+
+    Every caller talking to the same target reuses one connection pool; `timeout`
+    only applies when the client is created.
+    """
+    with _lock:
+        client = _clients.get(target)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=timeout or httpx.Timeout(10.0),
+                limits=httpx.Limits(
+                    max_connections=HTTP_POOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+                    keepalive_expiry=HTTP_POOL_KEEPALIVE_EXPIRY
+                )
+            )
+            _clients[target] = client
+        return client
+
+
+async def close_async_clients() -> None:
+    """Close every pooled client (called on application shutdown)."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        await client.aclose()
@@ -1,29 +1,45 @@
 import os
 import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
 from langchain_community.document_loaders import PyPDFLoader, UnstructuredWordDocumentLoader, TextLoader, UnstructuredExcelLoader
 from langchain.docstore.document import Document
 
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt", ".xlsx")
+
+# Parse DOCX/XLSX with python-docx/openpyxl instead of unstructured (which stays as the fallback)
+FAST_OFFICE_LOADERS = os.getenv("FAST_OFFICE_LOADERS", "true").lower() in ("1", "true", "yes")
+DOCX_PARAGRAPHS_PER_DOC = int(os.getenv("DOCX_PARAGRAPHS_PER_DOC", "50"))
+XLSX_ROWS_PER_DOC = int(os.getenv("XLSX_ROWS_PER_DOC", "100"))
+
+# Worker processes used to parse files in bulk
+LOADER_MAX_WORKERS = int(os.getenv("LOADER_MAX_WORKERS", str(min(4, os.cpu_count() or 1))))
+
 def generate_file_id(file_path: str, user_id: str) -> str:
     """Generate a unique file ID based on file path, user, and upload time"""
     content = f"{file_path}_{user_id}_{datetime.now().isoformat()}"
     return hashlib.md5(content.encode()).hexdigest()
 
+def _file_metadata(file_path: str, user_id: str, file_type: str) -> dict:
+    """Metadata shared by every document of one file"""
+    return {
+        "source": file_path,
+        "filename": os.path.basename(file_path),
+        "file_id": generate_file_id(file_path, user_id),
+        "user_id": user_id,
+        "file_type": file_type,
+        "upload_timestamp": datetime.now().isoformat()
+    }
+
 def add_enhanced_metadata(docs: List[Document], file_path: str, user_id: str, file_type: str) -> List[Document]:
     """Add comprehensive metadata to documents"""
-    file_id = generate_file_id(file_path, user_id)
-    filename = os.path.basename(file_path)
-    upload_timestamp = datetime.now().isoformat()
+    file_metadata = _file_metadata(file_path, user_id, file_type)
     
     for i, doc in enumerate(docs):
+        doc.metadata.update(file_metadata)
         doc.metadata.update({
-            "source": file_path,
-            "filename": filename,
-            "file_id": file_id,
-            "user_id": user_id,
-            "file_type": file_type,
-            "upload_timestamp": upload_timestamp,
             "chunk_index": i,
             "total_chunks": len(docs)
         })
@@ -34,9 +50,61 @@ def load_pdf(file_path: str, user_id: str) -> List[Document]:
     docs = loader.load()
     return add_enhanced_metadata(docs, file_path, user_id, "pdf")
 
+def iter_pdf_pages(file_path: str, user_id: str, content_hash: Optional[str] = None) -> Iterator[Document]:
+    """
+    Lazily yield a PDF one page at a time with enhanced metadata, so indexing can
+    start on the first page and the whole file is never held in memory.
+    Each page keeps its `page` number and gets its page position as `chunk_index`.
+    """
+    file_metadata = _file_metadata(file_path, user_id, "pdf")
+    if content_hash:
+        file_metadata["content_hash"] = content_hash
+    
+    for i, doc in enumerate(PyPDFLoader(file_path).lazy_load()):
+        doc.metadata.update(file_metadata)
+        doc.metadata["chunk_index"] = i
+        yield doc
+
+def load_docx_native(file_path: str) -> List[Document]:
+    """
+    Parse a DOCX with python-docx, keeping paragraphs and table rows in body order.
+    Blocks are grouped DOCX_PARAGRAPHS_PER_DOC at a time into one Document each.
+    """
+    from docx import Document as DocxDocument
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+    
+    word_doc = DocxDocument(file_path)
+    blocks = []
+    for element in word_doc.element.body.iterchildren():
+        if element.tag.endswith("}p"):
+            text = Paragraph(element, word_doc).text.strip()
+            if text:
+                blocks.append(text)
+        elif element.tag.endswith("}tbl"):
+            for row in Table(element, word_doc).rows:
+                cells = [cell.text.strip() for cell in row.cells]
+                if any(cells):
+                    blocks.append(" | ".join(cells))
+    
+    docs = []
+    for start in range(0, len(blocks), DOCX_PARAGRAPHS_PER_DOC):
+        docs.append(Document(
+            page_content="\n\n".join(blocks[start:start + DOCX_PARAGRAPHS_PER_DOC]),
+            metadata={"source": file_path, "paragraph_start": start}
+        ))
+    return docs
+
 def load_docx(file_path: str, user_id: str) -> List[Document]:
-    loader = UnstructuredWordDocumentLoader(file_path)
-    docs = loader.load()
+    docs = None
+    if FAST_OFFICE_LOADERS:
+        try:
+            docs = load_docx_native(file_path)
+        except Exception as e:
+            print(f"python-docx could not parse {os.path.basename(file_path)}, falling back to unstructured: {e}")
+    if docs is None:
+        loader = UnstructuredWordDocumentLoader(file_path)
+        docs = loader.load()
     return add_enhanced_metadata(docs, file_path, user_id, "docx")
 
 def load_txt(file_path: str, user_id: str) -> List[Document]:
@@ -44,42 +112,145 @@ def load_txt(file_path: str, user_id: str) -> List[Document]:
     docs = loader.load()
     return add_enhanced_metadata(docs, file_path, user_id, "txt")
 
+def _sheet_document(file_path: str, sheet: str, header: str, rows: List[str], row_start: int) -> Document:
+    return Document(
+        page_content="\n".join([header] + rows),
+        metadata={"source": file_path, "sheet": sheet, "row_start": row_start}
+    )
+
+def load_xlsx_native(file_path: str) -> List[Document]:
+    """
+    Parse an XLSX with openpyxl in read-only mode, streaming rows sheet by sheet.
+    Rows are grouped XLSX_ROWS_PER_DOC at a time into one Document each, with the
+    sheet's first row repeated as a header so every batch is self-describing.
+    """
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    docs = []
+    try:
+        for sheet in workbook.worksheets:
+            sheet_start = len(docs)
+            header = None
+            batch, batch_start = [], 0
+            
+            for row_number, row in enumerate(sheet.iter_rows(values_only=True), start=1):
+                values = ["" if value is None else str(value) for value in row]
+                while values and not values[-1]:
+                    values.pop()
+                if not values:
+                    continue
+                line = " | ".join(values)
+                if header is None:
+                    header = line
+                    continue
+                if not batch:
+                    batch_start = row_number
+                batch.append(line)
+                if len(batch) >= XLSX_ROWS_PER_DOC:
+                    docs.append(_sheet_document(file_path, sheet.title, header, batch, batch_start))
+                    batch = []
+            
+            # Remaining rows, or a sheet that only has its header row
+            if batch or (header is not None and len(docs) == sheet_start):
+                docs.append(_sheet_document(file_path, sheet.title, header, batch, batch_start or 1))
+    finally:
+        workbook.close()
+    return docs
+
 def load_xlsx(file_path: str, user_id: str) -> List[Document]:
-    loader = UnstructuredExcelLoader(file_path)
-    docs = loader.load()
+    docs = None
+    if FAST_OFFICE_LOADERS:
+        try:
+            docs = load_xlsx_native(file_path)
+        except Exception as e:
+            print(f"openpyxl could not parse {os.path.basename(file_path)}, falling back to unstructured: {e}")
+    if docs is None:
+        loader = UnstructuredExcelLoader(file_path)
+        docs = loader.load()
     return add_enhanced_metadata(docs, file_path, user_id, "xlsx")
 
-def load_all_documents(directory_path: str, user_id: str) -> List[Document]:
-    all_docs = []
-    for file in os.listdir(directory_path):
-        file_path = os.path.abspath(os.path.join(directory_path, file))
-        if file.lower().endswith(".pdf"):
-            docs = load_pdf(file_path, user_id)
-        elif file.lower().endswith(".docx"):
-            docs = load_docx(file_path, user_id)
-        elif file.lower().endswith(".txt"):
-            docs = load_txt(file_path, user_id)
-        elif file.lower().endswith(".xlsx"):
-            docs = load_xlsx(file_path, user_id)
-        else:
-            continue
-        all_docs.extend(docs)
-    return all_docs
+def compute_file_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file's content, read in fixed-size chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-def load_single_document(file_path: str, user_id: str) -> List[Document]:
+def load_single_document(file_path: str, user_id: str, content_hash: Optional[str] = None) -> List[Document]:
     """Load a single document with enhanced metadata"""
     filename = os.path.basename(file_path).lower()
     
     if filename.endswith(".pdf"):
-        return load_pdf(file_path, user_id)
+        docs = load_pdf(file_path, user_id)
     elif filename.endswith(".docx"):
-        return load_docx(file_path, user_id)
+        docs = load_docx(file_path, user_id)
     elif filename.endswith(".txt"):
-        return load_txt(file_path, user_id)
+        docs = load_txt(file_path, user_id)
     elif filename.endswith(".xlsx"):
-        return load_xlsx(file_path, user_id)
+        docs = load_xlsx(file_path, user_id)
     else:
         raise ValueError(f"Unsupported file type: {filename}")
+    
+    # Content hash of the whole file, used to detect duplicate uploads
+    if content_hash:
+        for doc in docs:
+            doc.metadata["content_hash"] = content_hash
+    return docs
+
+def _load_file_worker(file_path: str, user_id: str) -> Tuple[str, List[Document], Optional[str]]:
+    """Process pool entry point: hash and parse one file, returning errors instead of raising"""
+    try:
+        content_hash = compute_file_hash(file_path)
+        return file_path, load_single_document(file_path, user_id, content_hash=content_hash), None
+    except Exception as e:
+        return file_path, [], str(e)
+
+def load_documents_parallel(
+    file_paths: List[str],
+    user_id: str,
+    max_workers: int = LOADER_MAX_WORKERS
+) -> Iterator[Tuple[str, List[Document], Optional[str]]]:
+    """
+    Parse files in a process pool, yielding (file_path, documents, error) as each
+    file finishes. A file that fails to parse yields an error and no documents.
+    """
+    if max_workers <= 1 or len(file_paths) <= 1:
+        for file_path in file_paths:
+            yield _load_file_worker(file_path, user_id)
+        return
+    
+    # Spawn rather than fork: the server process runs many threads (and their locks)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(file_paths)), mp_context=context) as executor:
+        futures = [executor.submit(_load_file_worker, file_path, user_id) for file_path in file_paths]
+        for future in as_completed(futures):
+            yield future.result()
+
+def list_supported_files(directory_path: str) -> List[str]:
+    """Absolute paths of the supported documents in a directory"""
+    return sorted(
+        os.path.abspath(os.path.join(directory_path, file))
+        for file in os.listdir(directory_path)
+        if file.lower().endswith(SUPPORTED_EXTENSIONS)
+    )
+
+def load_all_documents(directory_path: str, user_id: str, max_workers: int = LOADER_MAX_WORKERS) -> List[Document]:
+    """Load every supported document in a directory, parsing files in parallel"""
+    all_docs = []
+    for file_path, docs, error in load_documents_parallel(list_supported_files(directory_path), user_id, max_workers):
+        if error:
+            print(f"Skipping {os.path.basename(file_path)}: {error}")
+            continue
+        all_docs.extend(docs)
+    return all_docs
+
+def iter_single_document(file_path: str, user_id: str, content_hash: Optional[str] = None) -> Iterable[Document]:
+    """Like load_single_document, but PDFs are returned as a lazy page iterator"""
+    if file_path.lower().endswith(".pdf"):
+        return iter_pdf_pages(file_path, user_id, content_hash)
+    return load_single_document(file_path, user_id, content_hash)
 
 def get_file_metadata(file_path: str, user_id: str) -> dict:
     """Get file metadata without loading the full document"""
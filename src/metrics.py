@@ -0,0 +1,74 @@
+import threading
+from collections import deque
+from typing import Dict, Any
+
+# Number of recent samples kept per latency metric for percentile estimates
+MAX_SAMPLES = 1000
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_samples: Dict[str, deque] = {}
+
+
+def increment(name: str, value: float = 1) -> None:
+    """Increase a named counter."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name: str, value: float) -> None:
+    """Record one sample (e.g. a latency in milliseconds) for a named metric."""
+    with _lock:
+        samples = _samples.get(name)
+        if samples is None:
+            samples = _samples[name] = deque(maxlen=MAX_SAMPLES)
+        samples.append(value)
+
+
+def get_counter(name: str) -> float:
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def sample_count(name: str) -> int:
+    with _lock:
+        return len(_samples.get(name, ()))
+
+
+def percentile(name: str, pct: float) -> float | None:
+    """Return the `pct` percentile (0-100) of the recent samples, or None without samples."""
+    with _lock:
+        samples = sorted(_samples.get(name, ()))
+    if not samples:
+        return None
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+def _summarize(values) -> Dict[str, float]:
+    ordered = sorted(values)
+    count = len(ordered)
+    return {
+        "count": count,
+        "avg": round(sum(ordered) / count, 2),
+        "p50": round(ordered[int(0.50 * (count - 1))], 2),
+        "p95": round(ordered[int(0.95 * (count - 1))], 2),
+        "max": round(ordered[-1], 2)
+    }
+
+
+def snapshot() -> Dict[str, Any]:
+    """Return all counters and latency summaries for reporting."""
+    with _lock:
+        counters = dict(_counters)
+        samples = {name: list(values) for name, values in _samples.items() if values}
+    return {
+        "counters": counters,
+        "latencies": {name: _summarize(values) for name, values in samples.items()}
+    }
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _samples.clear()
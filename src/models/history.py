@@ -1,26 +1,48 @@
+from collections import OrderedDict
 from datetime import datetime
 import json
 import os
-from typing import List
+import sqlite3
+import threading
+from typing import List, Optional
+
+from src.web_search.cache import normalize_query
 
 CHAT_CACHE_DIR = ("chat_cache")
 os.makedirs(CHAT_CACHE_DIR, exist_ok=True)
 
-MAX_CACHE_SIZE = 6
+HISTORY_DB_PATH = os.getenv("CHAT_HISTORY_DB_PATH", os.path.join(CHAT_CACHE_DIR, "history.sqlite3"))
+
+# Recent entries shown per user (and kept in the in-memory hot cache)
+MAX_CACHE_SIZE = int(os.getenv("CHAT_HISTORY_SIZE", "6"))
+# Rows kept per user in the database; older ones are pruned as new ones arrive
+HISTORY_RETENTION = int(os.getenv("CHAT_HISTORY_RETENTION", "1000"))
+# Users whose recent history is kept in memory
+HISTORY_HOT_USERS = int(os.getenv("CHAT_HISTORY_HOT_USERS", "256"))
 
 class ChatEntry:
-    def __init__(self, question: str, answer: str, sources: List[str], timestamp: str = None):
+    def __init__(
+        self,
+        question: str,
+        answer: str,
+        sources: List[str],
+        timestamp: str = None,
+        corpus_version: Optional[int] = None
+    ):
         self.question = question
         self.answer = answer
         self.sources = sources
         self.timestamp = timestamp or datetime.now().isoformat()
+        # Version of the user's documents the answer was produced against
+        self.corpus_version = corpus_version
 
     def to_dict(self):
         return {
             "question": self.question,
             "answer": self.answer,
             "sources": self.sources,
-            "timestamp": self.timestamp
+            "timestamp": self.timestamp,
+            "corpus_version": self.corpus_version
         }
 
     @staticmethod
@@ -29,51 +51,183 @@ class ChatEntry:
             question=data["question"],
             answer=data["answer"],
             sources=data.get("sources", []),
-            timestamp=data.get("timestamp")
+            timestamp=data.get("timestamp"),
+            corpus_version=data.get("corpus_version")
         )
 
-# ---------- Per-User Caching Functions ----------
-
-def get_user_cache_file(username: str) -> str:
-    return os.path.join(CHAT_CACHE_DIR, f"{username}.json")
+def normalize_question(question: str) -> str:
+    # Same key as the answer cache's in-memory tier, so both tiers match the same repeats
+    return normalize_query(question)
+
+# ---------- History Store ----------
+
+class HistoryStore:
+    """
+    Chat history in SQLite (WAL mode). Inserts are append-only, exact-question lookups
+    use an index on the normalized question, and each user's recent entries are kept
+    in an LRU hot cache so rendering the page never touches the database.
+    """
+
+    def __init__(self, path: str = HISTORY_DB_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL, "
+            "question TEXT NOT NULL, normalized_question TEXT NOT NULL, answer TEXT NOT NULL, "
+            "sources TEXT NOT NULL, timestamp TEXT NOT NULL, corpus_version INTEGER)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS history_user_question "
+            "ON history (username, normalized_question, id)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS history_user_id ON history (username, id)")
+        self._migrate_normalized_questions()
+        self._conn.commit()
+        self._hot: "OrderedDict[str, List[ChatEntry]]" = OrderedDict()
+        self._migrated = set()
+
+    def _migrate_normalized_questions(self) -> None:
+        """Re-key rows stored before questions were normalized like the answer cache does."""
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] >= 1:
+            return
+        rows = self._conn.execute("SELECT id, question FROM history").fetchall()
+        self._conn.executemany(
+            "UPDATE history SET normalized_question = ? WHERE id = ?",
+            [(normalize_question(question), row_id) for row_id, question in rows]
+        )
+        self._conn.execute("PRAGMA user_version = 1")
 
+    @staticmethod
+    def _entry(row) -> ChatEntry:
+        question, answer, sources, timestamp, corpus_version = row
+        return ChatEntry(question, answer, json.loads(sources), timestamp, corpus_version)
+
+    def _insert(self, username: str, entry: ChatEntry) -> None:
+        # Caller must hold self._lock
+        self._conn.execute(
+            "INSERT INTO history (username, question, normalized_question, answer, sources, timestamp, corpus_version) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                username, entry.question, normalize_question(entry.question), entry.answer,
+                json.dumps(entry.sources), entry.timestamp, entry.corpus_version
+            )
+        )
 
-def load_user_cache(username: str) -> List[ChatEntry]:
-    file_path = get_user_cache_file(username)
-    if os.path.exists(file_path):
-        with open(file_path, "r") as f:
-            try:
+    def _migrate_json(self, username: str) -> None:
+        """Import a user's legacy chat_cache/<user>.json file once, then set it aside."""
+        # Caller must hold self._lock
+        if username in self._migrated:
+            return
+        self._migrated.add(username)
+        legacy_file = os.path.join(CHAT_CACHE_DIR, f"{username}.json")
+        if not os.path.exists(legacy_file):
+            return
+        try:
+            with open(legacy_file, "r") as f:
                 content = f.read().strip()
-                if not content:
-                    return []
-                data = json.loads(content)
-                return [ChatEntry.from_dict(entry) for entry in data]
-            except json.JSONDecodeError:
-                return []
-    return []
-
-
-def save_user_cache(username: str, entry: ChatEntry):
-    entries = load_user_cache(username)
+            for data in (json.loads(content) if content else []):
+                self._insert(username, ChatEntry.from_dict(data))
+            self._conn.commit()
+            os.replace(legacy_file, f"{legacy_file}.migrated")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not migrate chat history for {username}: {e}")
+
+    def _recent(self, username: str) -> List[ChatEntry]:
+        # Caller must hold self._lock. Latest answer per question, oldest first.
+        entries = self._hot.get(username)
+        if entries is None:
+            self._migrate_json(username)
+            rows = self._conn.execute(
+                "SELECT question, answer, sources, timestamp, corpus_version FROM history "
+                "WHERE id IN (SELECT MAX(id) FROM history WHERE username = ? GROUP BY normalized_question) "
+                "ORDER BY id DESC LIMIT ?",
+                (username, MAX_CACHE_SIZE)
+            ).fetchall()
+            entries = [self._entry(row) for row in reversed(rows)]
+            self._hot[username] = entries
+            while len(self._hot) > HISTORY_HOT_USERS:
+                self._hot.popitem(last=False)
+        self._hot.move_to_end(username)
+        return entries
+
+    def recent(self, username: str) -> List[ChatEntry]:
+        with self._lock:
+            return list(self._recent(username))
+
+    def append(self, username: str, entry: ChatEntry) -> None:
+        normalized = normalize_question(entry.question)
+        with self._lock:
+            entries = self._recent(username)
+            self._insert(username, entry)
+            self._conn.execute(
+                "DELETE FROM history WHERE username = ? AND id <= ("
+                "SELECT id FROM history WHERE username = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (username, username, max(HISTORY_RETENTION, MAX_CACHE_SIZE))
+            )
+            self._conn.commit()
+            entries[:] = [e for e in entries if normalize_question(e.question) != normalized]
+            entries.append(entry)
+            del entries[:-MAX_CACHE_SIZE]
+
+    def find(self, username: str, question: str) -> Optional[ChatEntry]:
+        """Latest entry for the same (normalized) question."""
+        normalized = normalize_question(question)
+        with self._lock:
+            for entry in reversed(self._recent(username)):
+                if normalize_question(entry.question) == normalized:
+                    return entry
+            row = self._conn.execute(
+                "SELECT question, answer, sources, timestamp, corpus_version FROM history "
+                "WHERE username = ? AND normalized_question = ? ORDER BY id DESC LIMIT 1",
+                (username, normalized)
+            ).fetchone()
+        return self._entry(row) if row else None
+
+    def clear(self, username: str) -> None:
+        with self._lock:
+            self._migrate_json(username)
+            self._conn.execute("DELETE FROM history WHERE username = ?", (username,))
+            self._conn.commit()
+            self._hot[username] = []
+
+_store: Optional[HistoryStore] = None
+_store_lock = threading.Lock()
+
+def get_history_store() -> HistoryStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore()
+        return _store
 
-    # Avoid duplicates
-    if any(e.question.strip().lower() == entry.question.strip().lower() for e in entries):
-        return
-
-    entries.append(entry)
-    entries = entries[-MAX_CACHE_SIZE:]  # Keep only the last N entries
+# ---------- Per-User Caching Functions ----------
 
-    with open(get_user_cache_file(username), "w") as f:
-        json.dump([e.to_dict() for e in entries], f, indent=2)
+def load_user_cache(username: str) -> List[ChatEntry]:
+    return get_history_store().recent(username)
 
 
-def get_user_cached_entry(username: str, question: str) -> ChatEntry | None:
-    question_lower = question.strip().lower()
-    for entry in load_user_cache(username):
-        if entry.question.strip().lower() == question_lower:
-            return entry
-    return None
+def save_user_cache(username: str, entry: ChatEntry):
+    # A newer answer to the same question supersedes the old one in lookups and listings
+    get_history_store().append(username, entry)
+
+
+def get_user_cached_entry(username: str, question: str, corpus_version: Optional[int] = None) -> ChatEntry | None:
+    """
+    Cached answer to the same question. With `corpus_version`, only answers produced
+    against that version of the user's documents are returned.
+    """
+    entry = get_history_store().find(username, question)
+    if entry is None:
+        return None
+    if corpus_version is not None and entry.corpus_version != corpus_version:
+        return None
+    return entry
 
 def clear_user_cache(username: str):
-    with open(get_user_cache_file(username), "w") as f:
-        f.write("[]")
\ No newline at end of file
+    get_history_store().clear(username)
@@ -0,0 +1,180 @@
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from src import metrics
+from src.models.history import ChatEntry, get_user_cached_entry, save_user_cache
+from src.rag.embedding_model import get_embeddings
+from src.web_search.cache import normalize_query
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Minimum cosine similarity between question embeddings to reuse an answer
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "128"))
+
+
+class _CachedAnswer:
+    __slots__ = ("entry", "normalized")
+
+    def __init__(self, entry: ChatEntry, normalized: str):
+        self.entry = entry
+        self.normalized = normalized
+
+
+class _UserAnswers:
+    """
+    A user's cached answers and their unit-length question vectors, one row per
+    answer, so a lookup is a single matrix-vector product. Replaced, never mutated.
+    """
+    __slots__ = ("answers", "vectors")
+
+    def __init__(self, answers: List[_CachedAnswer], vectors: np.ndarray):
+        self.answers = answers
+        self.vectors = vectors
+
+
+def _unit(vector: List[float]) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+class SemanticAnswerCache:
+    """
+    Per-user answer cache that also matches paraphrased questions, by cosine
+    similarity of question embeddings above a threshold.
+
+    Every entry records the corpus version of the user's documents it was answered
+    against, and is only served while that version is current, so uploads and
+    deletions invalidate cached answers. Exact repeats are also looked up in the
+    persisted chat history, so they survive restarts.
+
+    Questions are embedded with the embedding model of the user's store, the same
+    model retrieval uses, so the process-wide query embedding LRU serves both.
+    """
+
+    def __init__(
+        self,
+        embed_query: Optional[Callable[[str], List[float]]] = None,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES
+    ):
+        self._embed_query = embed_query
+        self._embedders: Dict[str, Callable[[str], List[float]]] = {}
+        self._threshold = threshold
+        self._max_entries = max(1, max_entries)
+        self._entries: Dict[str, _UserAnswers] = {}
+        self._lock = threading.Lock()
+
+    def _embed(self, question: str, embedding_model: str) -> List[float]:
+        if self._embed_query is not None:
+            return self._embed_query(question)
+        embed_query = self._embedders.get(embedding_model)
+        if embed_query is None:
+            embed_query = self._embedders[embedding_model] = get_embeddings(embedding_model).embed_query
+        return embed_query(question)
+
+    def lookup(
+        self,
+        user_id: str,
+        question: str,
+        corpus_version: int,
+        embedding_model: str
+    ) -> Optional[ChatEntry]:
+        normalized = normalize_query(question)
+        with self._lock:
+            cached_answers = self._entries.get(user_id)
+            if cached_answers is not None:
+                # Drop answers produced against older documents
+                current = [
+                    row for row, cached in enumerate(cached_answers.answers)
+                    if cached.entry.corpus_version == corpus_version
+                ]
+                if len(current) < len(cached_answers.answers):
+                    cached_answers = _UserAnswers(
+                        [cached_answers.answers[row] for row in current], cached_answers.vectors[current]
+                    )
+                    self._entries[user_id] = cached_answers
+                for cached in cached_answers.answers:
+                    if cached.normalized == normalized:
+                        metrics.increment("answer_cache.exact_hits")
+                        return cached.entry
+
+        entry = get_user_cached_entry(user_id, question, corpus_version=corpus_version)
+        if entry is not None:
+            metrics.increment("answer_cache.exact_hits")
+            return entry
+
+        if not SEMANTIC_CACHE_ENABLED or cached_answers is None or not cached_answers.answers:
+            metrics.increment("answer_cache.misses")
+            return None
+
+        vector = _unit(self._embed(question, embedding_model))
+        if vector.shape[0] != cached_answers.vectors.shape[1]:
+            metrics.increment("answer_cache.misses")
+            return None
+        # Cosine similarity to every cached question at once
+        similarities = cached_answers.vectors @ vector
+        row = int(np.argmax(similarities))
+        best_similarity = float(similarities[row])
+        if best_similarity < self._threshold:
+            metrics.increment("answer_cache.misses")
+            return None
+        best = cached_answers.answers[row]
+        metrics.increment("answer_cache.semantic_hits")
+        print(f"[ANSWER CACHE] Reusing answer to {best.entry.question!r} (similarity {best_similarity:.3f})")
+        return best.entry
+
+    def store(
+        self,
+        user_id: str,
+        question: str,
+        answer: str,
+        sources: List[str],
+        corpus_version: int,
+        embedding_model: str
+    ) -> ChatEntry:
+        entry = ChatEntry(question=question, answer=answer, sources=sources, corpus_version=corpus_version)
+        save_user_cache(user_id, entry)
+
+        if SEMANTIC_CACHE_ENABLED:
+            try:
+                vector = _unit(self._embed(question, embedding_model))
+            except Exception as e:
+                print(f"[ANSWER CACHE] Could not embed question: {e}")
+                return entry
+            cached = _CachedAnswer(entry, normalize_query(question))
+            with self._lock:
+                previous = self._entries.get(user_id)
+                keep: List[int] = []
+                # Vectors of another dimension come from a previous embedding model
+                if previous is not None and previous.vectors.shape[1] == vector.shape[0]:
+                    keep = [
+                        row for row, other in enumerate(previous.answers)
+                        if other.normalized != cached.normalized
+                    ]
+                    keep = keep[max(0, len(keep) - self._max_entries + 1):]
+                answers = [previous.answers[row] for row in keep] + [cached]
+                vectors = np.vstack([previous.vectors[keep], vector]) if keep else vector[None, :]
+                self._entries[user_id] = _UserAnswers(answers, vectors)
+        return entry
+
+    def clear(self, user_id: str) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "users": len(self._entries),
+                "entries": sum(len(cached_answers.answers) for cached_answers in self._entries.values())
+            }
+
+
+_answer_cache = SemanticAnswerCache()
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    return _answer_cache
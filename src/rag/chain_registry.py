@@ -0,0 +1,122 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from langchain.chains import RetrievalQA
+from src.rag.qa_engine import create_qa_chain
+from src.rag.retriever import get_filtered_retriever
+from src.rag.vector_store import vectorstore_exists
+
+CHAIN_CACHE_MAX_ENTRIES = int(os.getenv("CHAIN_CACHE_MAX_ENTRIES", "64"))
+
+
+def build_user_qa_chain(user_id: str, persist_directory: str) -> Optional[RetrievalQA]:
+    """
+    Build a user-filtered QA chain over `persist_directory`.
+    Returns None when the user has no vector store on disk yet.
+    """
+    if not vectorstore_exists(persist_directory):
+        return None
+
+    retriever = get_filtered_retriever(
+        persist_directory=persist_directory,
+        user_id=user_id
+    )
+    return create_qa_chain(retriever)
+
+
+class QAChainRegistry:
+    """
+    Per-user cache of QA chains.
+
+    Chains are built lazily on first use from the user's persisted vector store, so a
+    restarted worker simply rebuilds them on demand. Entries are evicted in LRU order
+    once the entry limit is exceeded. A chain only holds a retriever over the pooled
+    vector store, so the memory of the documents is bounded by the store registry
+    (VECTORSTORE_POOL_MAX_MB), not here.
+    """
+
+    def __init__(
+        self,
+        builder: Callable[[str, str], Optional[Any]] = build_user_qa_chain,
+        max_entries: int = CHAIN_CACHE_MAX_ENTRIES
+    ):
+        self._builder = builder
+        self._max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Tuple[Any, str]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._build_locks: Dict[str, threading.Lock] = {}
+
+    def get(self, user_id: str, persist_directory: str) -> Optional[Any]:
+        """Return the user's chain, building it if needed. None if the user has no documents."""
+        chain = self._lookup(user_id, persist_directory)
+        if chain is not None:
+            return chain
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(user_id, threading.Lock())
+
+        with build_lock:
+            chain = self._lookup(user_id, persist_directory)
+            if chain is not None:
+                return chain
+
+            chain = self._builder(user_id, persist_directory)
+            if chain is None:
+                return None
+
+            with self._lock:
+                self._entries.pop(user_id, None)
+                self._entries[user_id] = (chain, persist_directory)
+                self._evict()
+            print(f"Built QA chain for user: {user_id}")
+            return chain
+
+    def invalidate(self, user_id: str) -> None:
+        """Forget a user's chain; the next `get` rebuilds it."""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self._max_entries
+            }
+
+    def _lookup(self, user_id: str, persist_directory: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            chain, directory = entry
+            if directory != persist_directory:
+                self._entries.pop(user_id, None)
+                return None
+            self._entries.move_to_end(user_id)
+            return chain
+
+    def _evict(self) -> None:
+        # Caller must hold self._lock; the newest entry is last, so it is never evicted
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+_qa_chain_registry = QAChainRegistry()
+
+
+def get_user_qa_chain(user_id: str, persist_directory: str) -> Optional[RetrievalQA]:
+    return _qa_chain_registry.get(user_id, persist_directory)
+
+
+def invalidate_user_qa_chain(user_id: str) -> None:
+    _qa_chain_registry.invalidate(user_id)
+
+
+def get_qa_chain_registry() -> QAChainRegistry:
+    return _qa_chain_registry
@@ -0,0 +1,47 @@
+import os
+import threading
+from typing import Callable, List
+
+CORPUS_VERSION_FILENAME = "corpus_version"
+
+_lock = threading.Lock()
+_listeners: List[Callable[[str], None]] = []
+
+
+def _version_path(persist_directory: str) -> str:
+    return os.path.join(persist_directory, CORPUS_VERSION_FILENAME)
+
+
+def get_corpus_version(persist_directory: str) -> int:
+    """
+    Version of the documents in a vector store; 0 for a store that was never written.
+    Kept on disk next to the collection so offline tools (bulk index, re-index)
+    invalidate the server's cached answers too.
+    """
+    try:
+        with open(_version_path(persist_directory), "r") as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def on_corpus_change(listener: Callable[[str], None]) -> None:
+    """Call `listener(persist_directory)` after every version bump in this process."""
+    _listeners.append(listener)
+
+
+def bump_corpus_version(persist_directory: str) -> int:
+    """Record that the store's documents changed. Returns the new version."""
+    with _lock:
+        version = get_corpus_version(persist_directory) + 1
+        os.makedirs(persist_directory, exist_ok=True)
+        tmp_path = f"{_version_path(persist_directory)}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(version))
+        os.replace(tmp_path, _version_path(persist_directory))
+    for listener in _listeners:
+        try:
+            listener(persist_directory)
+        except Exception as e:
+            print(f"Corpus change listener failed for {persist_directory}: {e}")
+    return version
@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from src import metrics
+from src.web_search.cache import normalize_query
+
+# Shared across users so duplicate content is embedded once per model
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join("embedding_cache", "embeddings.sqlite3"))
+
+# Recent question embeddings kept in memory, shared by every retriever in the process
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_BATCH = 500
+
+
+def embedding_cache_key(text: str, model_name: str) -> str:
+    """Content address of a chunk embedding: hash of the embedding model and the chunk text."""
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCacheStore:
+    """
+    Persistent, content-addressed store of embedding vectors (float32 blobs in SQLite).
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique_keys), _LOOKUP_BATCH):
+                batch = unique_keys[start:start + _LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, items: List[Tuple[str, str, List[float]]]) -> None:
+        """Store (key, model, vector) triples."""
+        if not items:
+            return
+        rows = [(key, model, len(vector), array("f", vector).tobytes()) for key, model, vector in items]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, dim, vector) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def count(self, model_name: Optional[str] = None) -> int:
+        with self._lock:
+            if model_name:
+                return self._conn.execute(
+                    "SELECT COUNT(*) FROM embeddings WHERE model = ?", (model_name,)
+                ).fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+_store: Optional[EmbeddingCacheStore] = None
+_store_lock = threading.Lock()
+
+
+def get_embedding_cache_store() -> EmbeddingCacheStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EmbeddingCacheStore()
+        return _store
+
+
+class QueryEmbeddingCache:
+    """
+    In-memory LRU of query embeddings keyed by (model, normalized query text), so a
+    repeated or trivially rephrased question skips the embedding call entirely.
+    """
+
+    def __init__(self, max_entries: int = QUERY_EMBEDDING_CACHE_SIZE):
+        self._max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, text: str, model_name: str) -> Optional[List[float]]:
+        key = (model_name, normalize_query(text))
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self._misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self._hits += 1
+        metrics.increment("query_embedding_cache.misses" if vector is None else "query_embedding_cache.hits")
+        return vector
+
+    def put(self, text: str, model_name: str, vector: List[float]) -> None:
+        key = (model_name, normalize_query(text))
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self._max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else None
+            }
+
+
+_query_cache = QueryEmbeddingCache()
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    return _query_cache
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that reuses stored vectors for chunk texts it has seen before
+    (re-uploads, re-indexing, the same file uploaded by several users) and only sends
+    unseen texts to the underlying model. Query embeddings are served from the
+    process-wide QueryEmbeddingCache.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, store: Optional[EmbeddingCacheStore] = None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self._store = store
+
+    @property
+    def store(self) -> EmbeddingCacheStore:
+        return self._store or get_embedding_cache_store()
+
+    def embed_documents_with_stats(self, texts: List[str]) -> Tuple[List[List[float]], int, int]:
+        """
+        Embed texts, serving cached vectors where possible.
+        Returns (vectors, cache hits, cache misses).
+        """
+        keys = [embedding_cache_key(text, self.model_name) for text in texts]
+        cached = self.store.get_many(keys)
+
+        # Embed each unseen text once, even if it repeats within the batch
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            new_items = list(zip(missing.keys(), vectors))
+            self.store.put_many([(key, self.model_name, vector) for key, vector in new_items])
+            cached.update(new_items)
+
+        hits = len(texts) - len(missing)
+        metrics.increment("embedding_cache.hits", hits)
+        metrics.increment("embedding_cache.misses", len(missing))
+        return [cached[key] for key in keys], hits, len(missing)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors, _, _ = self.embed_documents_with_stats(texts)
+        return vectors
+
+    def cached_vectors(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Stored vectors of already-embedded texts, None where missing. Never calls the model."""
+        keys = [embedding_cache_key(text, self.model_name) for text in texts]
+        cached = self.store.get_many(keys)
+        return [cached.get(key) for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        query_cache = get_query_embedding_cache()
+        vector = query_cache.get(text, self.model_name)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            query_cache.put(text, self.model_name, vector)
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.to_thread(self.embed_query, text)
@@ -0,0 +1,124 @@
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from src import metrics
+from src.rag.corpus_version import bump_corpus_version, get_corpus_version
+from src.rag.embedding_model import DEFAULT_COLLECTION, write_store_metadata
+from src.rag.flat_index import FlatIndexVectorStore
+from src.rag.ingest_pipeline import INGEST_BATCH_SIZE, IngestCancelled
+from src.rag.vector_store import (
+    get_store_metadata, invalidate_vectorstore, load_vectorstore, open_collection
+)
+
+# Copy passes before giving up on a store that keeps changing during the migration
+MIGRATION_MAX_PASSES = 3
+
+
+def _stored_ids(vectorstore) -> List[str]:
+    return vectorstore.get(include=[])["ids"]
+
+
+def _copy_chunks(
+    source,
+    target,
+    ids: List[str],
+    batch_size: int,
+    on_batch: Callable[[int], None],
+    should_cancel: Optional[Callable[[], bool]]
+) -> None:
+    """Re-embed chunks of `source` with the target's model, keeping ids, texts and metadata."""
+    for start in range(0, len(ids), batch_size):
+        if should_cancel and should_cancel():
+            raise IngestCancelled("Embedding migration cancelled")
+        batch = source.get(ids=ids[start:start + batch_size], include=["documents", "metadatas"])
+        if not batch["ids"]:
+            continue
+        # Texts embedded with the new model before (e.g. the same file of another user) come from the cache
+        vectors = target.embeddings.embed_documents(batch["documents"])
+        target._collection.upsert(
+            ids=batch["ids"],
+            embeddings=vectors,
+            metadatas=batch["metadatas"],
+            documents=batch["documents"]
+        )
+        on_batch(len(batch["ids"]))
+
+
+def migrate_embedding_model(
+    persist_directory: str,
+    model_name: str,
+    progress_callback: Optional[Callable[[int, Optional[int]], None]] = None,
+    should_cancel: Optional[Callable[[], bool]] = None,
+    batch_size: int = INGEST_BATCH_SIZE
+) -> Dict[str, Any]:
+    """
+    Re-embed a store with `model_name` while it keeps serving queries with its
+    current model.
+
+    Chunks are copied into a new collection of the same store, keeping their ids,
+    texts and metadata, so the keyword index and file manifest stay valid. If the
+    store changed during a pass (its corpus version moved), the new collection is
+    brought up to date by id and checked again. Then the store metadata is switched
+    to the new collection, pooled handles are dropped and the old collection is
+    deleted. Writes that land on the old collection after the switch are lost, so
+    no other ingest job of the user may run meanwhile (see IngestJobManager).
+
+    progress_callback(done, total) is called after each batch. If should_cancel()
+    returns True, IngestCancelled is raised and the new collection is discarded;
+    the store is left untouched.
+
+    Returns the previous and new model and the number of chunks re-embedded.
+    """
+    metadata = get_store_metadata(persist_directory)
+    previous_model = metadata["embedding_model"]
+    if previous_model == model_name:
+        return {"previous_model": previous_model, "model": model_name, "chunks": 0}
+
+    source = load_vectorstore(persist_directory)
+    backend = "flat" if isinstance(source, FlatIndexVectorStore) else "chroma"
+    collection_name = f"{DEFAULT_COLLECTION}-{uuid.uuid4().hex[:8]}"
+    target = open_collection(persist_directory, model_name, collection_name, backend=backend)
+    print(f"Migrating {persist_directory} from {previous_model!r} to {model_name!r} ({backend}: {collection_name})")
+
+    done = 0
+    total: Optional[int] = None
+
+    def on_batch(count: int) -> None:
+        nonlocal done
+        done += count
+        if progress_callback:
+            progress_callback(done, total)
+
+    try:
+        for _ in range(MIGRATION_MAX_PASSES):
+            version = get_corpus_version(persist_directory)
+            source_ids = _stored_ids(source)
+            target_ids = set(_stored_ids(target))
+            missing = [chunk_id for chunk_id in source_ids if chunk_id not in target_ids]
+            stale = list(target_ids.difference(source_ids))
+            if stale:
+                target._collection.delete(ids=stale)
+            total = done + len(missing)
+            _copy_chunks(source, target, missing, batch_size, on_batch, should_cancel)
+            if get_corpus_version(persist_directory) == version:
+                break
+        else:
+            raise RuntimeError(
+                f"{persist_directory} kept changing during the migration; retry once uploads have finished"
+            )
+    except BaseException:
+        target.delete_collection()
+        raise
+
+    write_store_metadata(persist_directory, model_name, collection_name)
+    invalidate_vectorstore(persist_directory)
+    # Answers cached against the old model's retrieval are no longer valid
+    bump_corpus_version(persist_directory)
+    try:
+        source.delete_collection()
+    except Exception as e:
+        print(f"Could not delete the previous collection of {persist_directory}: {e}")
+
+    metrics.increment("embedding_migration.chunks", done)
+    print(f"Migrated {done} chunks in {persist_directory} to {model_name!r}")
+    return {"previous_model": previous_model, "model": model_name, "chunks": done}
@@ -0,0 +1,73 @@
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from langchain_ollama import OllamaEmbeddings
+
+from src.rag.embedding_cache import CachedEmbeddings
+
+# Embedding model for new vector stores, separate from the generation model
+# (a dedicated embedding model is much faster and its vectors much smaller)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+# Model of stores created before the embedding model was recorded per store
+LEGACY_EMBEDDING_MODEL = "mistral"
+# Collection langchain_chroma uses when none is named
+DEFAULT_COLLECTION = "langchain"
+
+STORE_METADATA_FILENAME = "store_metadata.json"
+
+_lock = threading.Lock()
+# Parsed metadata by directory; load_vectorstore reads it on every call
+_cache: Dict[str, Dict[str, Any]] = {}
+
+
+class EmbeddingModelMismatch(ValueError):
+    """Raised when a store is used with a different embedding model than it was built with."""
+
+
+def _metadata_path(persist_directory: str) -> str:
+    return os.path.join(persist_directory, STORE_METADATA_FILENAME)
+
+
+def _key(persist_directory: str) -> str:
+    return os.path.normcase(os.path.abspath(persist_directory))
+
+
+def read_store_metadata(persist_directory: str) -> Optional[Dict[str, Any]]:
+    """
+    The store's embedding model and the collection holding its vectors, or None
+    if the store predates this record.
+    """
+    metadata = _cache.get(_key(persist_directory))
+    if metadata is not None:
+        return metadata
+    try:
+        with open(_metadata_path(persist_directory), "r") as f:
+            metadata = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    _cache[_key(persist_directory)] = metadata
+    return metadata
+
+
+def write_store_metadata(persist_directory: str, model: str, collection: str = DEFAULT_COLLECTION) -> Dict[str, Any]:
+    metadata = {"embedding_model": model, "collection": collection}
+    with _lock:
+        os.makedirs(persist_directory, exist_ok=True)
+        tmp_path = f"{_metadata_path(persist_directory)}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(tmp_path, _metadata_path(persist_directory))
+        _cache[_key(persist_directory)] = metadata
+    return metadata
+
+
+def forget_store_metadata(persist_directory: str) -> None:
+    """Drop the cached metadata of a directory so it is read from disk again."""
+    _cache.pop(_key(persist_directory), None)
+
+
+def get_embeddings(model: str = EMBEDDING_MODEL) -> CachedEmbeddings:
+    """Ollama embeddings for `model`, served from the content-addressed cache where possible."""
+    return CachedEmbeddings(OllamaEmbeddings(model=model), model)
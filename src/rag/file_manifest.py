@@ -0,0 +1,161 @@
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+# Evolved from the old write-only file metadata index, so existing stores keep their file
+MANIFEST_FILENAME = "file_metadata.json"
+
+# Chunk metadata fields copied into a file's manifest entry
+_FILE_FIELDS = ("filename", "file_type", "user_id", "upload_timestamp", "content_hash")
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _manifest_lock(persist_directory: str) -> threading.Lock:
+    key = os.path.normcase(os.path.abspath(persist_directory))
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def _manifest_path(persist_directory: str) -> str:
+    return os.path.join(persist_directory, MANIFEST_FILENAME)
+
+
+def _read(persist_directory: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """The manifest, or None if it is missing, unreadable or predates chunk counts."""
+    try:
+        with open(_manifest_path(persist_directory), "r") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if any("chunk_count" not in entry for entry in manifest.values()):
+        return None
+    return manifest
+
+
+def _write(persist_directory: str, manifest: Dict[str, Dict[str, Any]]) -> None:
+    # Write-then-rename, so readers see either the old or the new manifest
+    os.makedirs(persist_directory, exist_ok=True)
+    tmp_path = f"{_manifest_path(persist_directory)}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, _manifest_path(persist_directory))
+
+
+def _entry_from_chunk(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    entry = {"file_id": metadata.get("file_id"), "file_path": metadata.get("source"), "chunk_count": 0}
+    for field in _FILE_FIELDS:
+        entry[field] = metadata.get(field)
+    return entry
+
+
+def _build(chunk_metadatas: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    manifest: Dict[str, Dict[str, Any]] = {}
+    for metadata in chunk_metadatas:
+        file_id = metadata.get("file_id")
+        if not file_id:
+            continue
+        entry = manifest.setdefault(file_id, _entry_from_chunk(metadata))
+        entry["chunk_count"] += 1
+    return manifest
+
+
+def _rebuild(persist_directory: str, vectorstore) -> Dict[str, Dict[str, Any]]:
+    # Caller must hold the manifest lock
+    results = vectorstore.get(include=["metadatas"])
+    manifest = _build(results.get("metadatas") or [])
+    _write(persist_directory, manifest)
+    return manifest
+
+
+def record_chunks(persist_directory: str, chunk_metadatas: Iterable[Dict[str, Any]], vectorstore=None) -> None:
+    """
+    Count newly written chunks towards their files, creating entries for new files.
+    File fields (hash, timestamp...) are refreshed from the newest chunks.
+    Call after the chunks are in the collection: a missing or legacy manifest is
+    then rebuilt from `vectorstore`, which already includes them.
+    """
+    with _manifest_lock(persist_directory):
+        manifest = _read(persist_directory)
+        if manifest is None:
+            if vectorstore is not None:
+                _rebuild(persist_directory, vectorstore)
+                return
+            manifest = {}
+        for file_id, added in _build(chunk_metadatas).items():
+            entry = manifest.get(file_id)
+            if entry is None:
+                manifest[file_id] = added
+                continue
+            entry["chunk_count"] += added["chunk_count"]
+            entry.update({field: added[field] for field in _FILE_FIELDS if added.get(field) is not None})
+        _write(persist_directory, manifest)
+
+
+def remove_chunks(persist_directory: str, chunk_metadatas: Iterable[Dict[str, Any]], vectorstore=None) -> None:
+    """
+    Uncount deleted chunks; files left without chunks are dropped from the manifest.
+    Call after the chunks were deleted (see record_chunks for `vectorstore`).
+    """
+    with _manifest_lock(persist_directory):
+        manifest = _read(persist_directory)
+        if manifest is None:
+            if vectorstore is not None:
+                _rebuild(persist_directory, vectorstore)
+            return
+        for file_id, removed in _build(chunk_metadatas).items():
+            entry = manifest.get(file_id)
+            if entry is None:
+                continue
+            entry["chunk_count"] -= removed["chunk_count"]
+            if entry["chunk_count"] <= 0:
+                del manifest[file_id]
+        _write(persist_directory, manifest)
+
+
+def update_file(persist_directory: str, file_id: str, **fields: Any) -> None:
+    """Set file-level fields (e.g. content_hash after a re-index) without touching counts."""
+    with _manifest_lock(persist_directory):
+        manifest = _read(persist_directory)
+        if manifest is None or file_id not in manifest:
+            return
+        manifest[file_id].update(fields)
+        _write(persist_directory, manifest)
+
+
+def repair_manifest(persist_directory: str, vectorstore) -> Dict[str, Any]:
+    """
+    Rebuild the manifest from the chunk metadata in the collection (O(chunks)).
+    Returns which files were added, removed or had their chunk count corrected.
+    """
+    with _manifest_lock(persist_directory):
+        previous = _read(persist_directory) or {}
+        rebuilt = _rebuild(persist_directory, vectorstore)
+
+    return {
+        "files": len(rebuilt),
+        "added": sorted(rebuilt[file_id]["filename"] or file_id for file_id in rebuilt.keys() - previous.keys()),
+        "removed": sorted(previous[file_id].get("filename") or file_id for file_id in previous.keys() - rebuilt.keys()),
+        "recounted": sorted(
+            rebuilt[file_id]["filename"] or file_id for file_id in rebuilt.keys() & previous.keys()
+            if rebuilt[file_id]["chunk_count"] != previous[file_id].get("chunk_count")
+        )
+    }
+
+
+def list_files(persist_directory: str, vectorstore=None) -> List[Dict[str, Any]]:
+    """
+    Manifest entries (O(files)). A missing or legacy manifest is rebuilt once from
+    `vectorstore` when given.
+    """
+    manifest = _read(persist_directory)
+    if manifest is None:
+        if vectorstore is None:
+            return []
+        with _manifest_lock(persist_directory):
+            manifest = _read(persist_directory)
+            if manifest is None:
+                manifest = _rebuild(persist_directory, vectorstore)
+    return list(manifest.values())
@@ -0,0 +1,781 @@
+import json
+import os
+import shutil
+import threading
+import uuid
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from src.rag.embedding_model import DEFAULT_COLLECTION
+
+# Storage type of new flat indexes: float32, float16 (2x smaller) or int8 with one
+# scale per vector (4x smaller). Existing float32 indexes are converted when opened.
+FLAT_INDEX_DTYPE = os.getenv("FLAT_INDEX_DTYPE", "float32").lower()
+# Stores growing beyond this many chunks are moved to Chroma by the write that
+# crosses it (see vector_store._move_to_chroma)
+FLAT_INDEX_MAX_CHUNKS = int(os.getenv("FLAT_INDEX_MAX_CHUNKS", "2000"))
+# Re-rank the top candidates of quantized indexes with their full-precision vectors
+FLAT_INDEX_RESCORE = os.getenv("FLAT_INDEX_RESCORE", "true").lower() in ("1", "true", "yes")
+FLAT_INDEX_RESCORE_MULTIPLIER = int(os.getenv("FLAT_INDEX_RESCORE_MULTIPLIER", "4"))
+
+FLAT_INDEX_DIRNAME = "flat_index"
+_INDEX_FILENAME = "index.json"
+_VECTORS_FILENAME = "vectors.bin"
+_SCALES_FILENAME = "scales.bin"
+_RECORDS_FILENAME = "records.jsonl"
+# Files of indexes saved as a whole (.npy matrix, one JSON document), converted when opened
+_LEGACY_VECTORS_FILENAME = "vectors.npy"
+_LEGACY_SCALES_FILENAME = "scales.npy"
+_LEGACY_RECORDS_FILENAME = "records.json"
+
+# Rows dequantized at a time while scoring, bounding the float32 working set
+_BLOCK_ROWS = 4096
+
+
+def flat_index_directory(persist_directory: str, collection_name: str = DEFAULT_COLLECTION) -> str:
+    # The default collection keeps the original location
+    dirname = FLAT_INDEX_DIRNAME if collection_name == DEFAULT_COLLECTION else f"{FLAT_INDEX_DIRNAME}-{collection_name}"
+    return os.path.join(persist_directory, dirname)
+
+
+def flat_index_exists(persist_directory: str, collection_name: str = DEFAULT_COLLECTION) -> bool:
+    directory = flat_index_directory(persist_directory, collection_name)
+    return any(
+        os.path.exists(os.path.join(directory, filename))
+        for filename in (_INDEX_FILENAME, _LEGACY_RECORDS_FILENAME)
+    )
+
+
+def remove_flat_index(persist_directory: str, collection_name: str = DEFAULT_COLLECTION) -> None:
+    shutil.rmtree(flat_index_directory(persist_directory, collection_name), ignore_errors=True)
+
+
+def _atomic_write(path: str, write) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def _write_at(path: str, offset: int, data: bytes) -> int:
+    """
+    Write `data` at `offset` of `path` and cut the file there, dropping what an
+    interrupted append left behind. Returns the new size.
+    """
+    with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+        f.seek(offset)
+        f.write(data)
+        f.truncate()
+    return offset + len(data)
+
+
+def _record_lines(ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]) -> bytes:
+    # json.dumps escapes newlines, so each record is exactly one line
+    return b"".join(
+        json.dumps({"id": chunk_id, "document": document, "metadata": metadata}).encode("utf-8") + b"\n"
+        for chunk_id, document, metadata in zip(ids, documents, metadatas)
+    )
+
+
+def _append_rows(buffer: Optional[np.ndarray], size: int, rows: np.ndarray) -> np.ndarray:
+    """
+    Write `rows` after the first `size` entries of `buffer`, doubling its capacity
+    when full, so appends cost O(len(rows)) amortised. Entries before `size` are
+    never changed, so views of them handed out earlier stay valid.
+    """
+    needed = size + len(rows)
+    if buffer is None or needed > len(buffer):
+        grown = np.empty(max(needed, 2 * size, 64), dtype=rows.dtype)
+        if size:
+            grown[:size] = buffer[:size]
+        buffer = grown
+    buffer[size:needed] = rows
+    return buffer
+
+
+def quantize(vectors: np.ndarray, dtype: np.dtype) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Stored form of float32 vectors: unchanged, cast to float16, or int8 with a
+    per-vector scale (symmetric, max |component| maps to 127). Returns (stored, scales);
+    scales is None unless dtype is int8.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if np.dtype(dtype) == np.int8:
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    return vectors.astype(dtype), None
+
+
+def dequantize(stored: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    vectors = np.asarray(stored, dtype=np.float32)
+    return vectors * scales[:, None] if scales is not None else vectors
+
+
+def _squared_norms(stored: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    norms = np.empty(len(stored), dtype=np.float32)
+    for start in range(0, len(stored), _BLOCK_ROWS):
+        end = start + _BLOCK_ROWS
+        block = dequantize(stored[start:end], None if scales is None else scales[start:end])
+        norms[start:end] = np.einsum("ij,ij->i", block, block)
+    return norms
+
+
+def _dot(stored: np.ndarray, scales: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+    if stored.dtype == np.float32:
+        return stored @ query
+    # Score quantized rows block by block instead of dequantizing the whole matrix
+    scores = np.empty(len(stored), dtype=np.float32)
+    for start in range(0, len(stored), _BLOCK_ROWS):
+        scores[start:start + _BLOCK_ROWS] = np.asarray(stored[start:start + _BLOCK_ROWS], dtype=np.float32) @ query
+    return scores * scales if scales is not None else scores
+
+
+class FlatCollection:
+    """
+    A user's chunks as one contiguous (chunks x dim) matrix plus parallel id, text and
+    metadata arrays, searched by brute force. Implements the subset of the Chroma
+    collection API the app uses (upsert, update, get, delete, count, query), so the
+    ingest pipeline and re-index work on either backend unchanged.
+
+    Vectors are stored as float32, float16 or int8 (see quantize) in a raw file that
+    is memory-mapped read-only. Upserts of new chunks are appended to the files and
+    saved by each call, so an ingest writes every chunk once and holds no pending
+    copy of the store; index.json names how many rows are complete. Updates and
+    deletes rewrite the files. Once an upsert takes the store past `max_chunks`,
+    `on_overflow` is called from the writer's thread. After move_to(), writes go to
+    the collection the chunks were moved to.
+    """
+
+    def __init__(
+        self,
+        persist_directory: str,
+        dtype: str = FLAT_INDEX_DTYPE,
+        collection_name: str = DEFAULT_COLLECTION,
+        max_chunks: int = FLAT_INDEX_MAX_CHUNKS,
+        on_overflow: Optional[Callable[[], None]] = None
+    ):
+        self.name = collection_name
+        self.directory = flat_index_directory(persist_directory, collection_name)
+        self.max_chunks = max_chunks
+        self.on_overflow = on_overflow
+        self._dtype = np.dtype(dtype)
+        self._dimension: Optional[int] = None
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._vectors: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        # Squared norms are kept in a buffer with spare capacity; _squared_norms views its used part
+        self._norms_buffer: Optional[np.ndarray] = None
+        self._squared_norms: Optional[np.ndarray] = None
+        self._rows: Dict[str, int] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+        self._records_bytes = 0
+        self._successor = None
+        self._load()
+
+    # ---------- Persistence ----------
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    def _load(self) -> None:
+        requested_dtype = self._dtype
+        try:
+            with open(self._path(_INDEX_FILENAME), "r") as f:
+                header = json.load(f)
+        except FileNotFoundError:
+            if os.path.exists(self._path(_LEGACY_RECORDS_FILENAME)):
+                self._load_legacy(requested_dtype)
+            return
+        self._dtype, self._dimension, count = np.dtype(header["dtype"]), header["dimension"], header["count"]
+
+        # Rows past `count` belong to an append that did not complete and are overwritten by the next one
+        with open(self._path(_RECORDS_FILENAME), "rb") as f:
+            lines = list(islice(f, count))
+        row_bytes = (self._dimension or 0) * self._dtype.itemsize
+        if (
+            len(lines) != count
+            or (lines and not lines[-1].endswith(b"\n"))
+            or (count and os.path.getsize(self._path(_VECTORS_FILENAME)) < count * row_bytes)
+        ):
+            raise ValueError(f"Flat index in {self.directory} is inconsistent, rebuild the store")
+        records = [json.loads(line) for line in lines]
+        self._records_bytes = sum(len(line) for line in lines)
+        self._ids = [record["id"] for record in records]
+        self._documents = [record["document"] for record in records]
+        self._metadatas = [record["metadata"] for record in records]
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(self._ids)}
+        self._map()
+        self._norms_buffer = self._squared_norms = (
+            _squared_norms(self._vectors, self._scales) if count else None
+        )
+
+        if count and self._dtype == np.float32 and requested_dtype != np.float32:
+            # Opting into quantization applies to existing full-precision indexes too
+            vectors, scales = quantize(self._vectors, requested_dtype)
+            self._dtype = requested_dtype
+            self._rewrite(self._ids, self._documents, self._metadatas, vectors, scales)
+            print(f"Converted flat index in {self.directory} to {self._dtype.name}")
+
+    def _load_legacy(self, requested_dtype: np.dtype) -> None:
+        with open(self._path(_LEGACY_RECORDS_FILENAME), "r") as f:
+            records = json.load(f)
+        self._dtype = np.dtype(records["dtype"])
+        vectors = scales = None
+        if records["ids"]:
+            vectors = np.load(self._path(_LEGACY_VECTORS_FILENAME), mmap_mode="r")
+            if self._dtype == np.int8:
+                scales = np.load(self._path(_LEGACY_SCALES_FILENAME))
+            if len(vectors) != len(records["ids"]) or (scales is not None and len(scales) != len(vectors)):
+                raise ValueError(f"Flat index in {self.directory} is inconsistent, rebuild the store")
+            if self._dtype == np.float32 and requested_dtype != np.float32:
+                vectors, scales = quantize(vectors, requested_dtype)
+                self._dtype = requested_dtype
+        self._rewrite(records["ids"], records["documents"], records["metadatas"], vectors, scales)
+        for filename in (_LEGACY_VECTORS_FILENAME, _LEGACY_SCALES_FILENAME, _LEGACY_RECORDS_FILENAME):
+            try:
+                os.remove(self._path(filename))
+            except FileNotFoundError:
+                pass
+        print(f"Converted flat index in {self.directory} to the appendable format")
+
+    def _map(self) -> None:
+        # Caller must hold self._lock. Serve vectors from the page cache instead of
+        # keeping a private copy; maps handed out earlier keep their rows.
+        count = len(self._ids)
+        if not count:
+            self._vectors = self._scales = None
+            return
+        self._vectors = np.memmap(
+            self._path(_VECTORS_FILENAME), dtype=self._dtype, mode="r", shape=(count, self._dimension)
+        )
+        self._scales = np.memmap(
+            self._path(_SCALES_FILENAME), dtype=np.float32, mode="r", shape=(count,)
+        ) if self._dtype == np.int8 else None
+
+    def _save_header(self, count: int) -> None:
+        # Written last: rows only count once the header names them
+        header = {"dtype": self._dtype.name, "dimension": self._dimension, "count": count}
+        _atomic_write(self._path(_INDEX_FILENAME), lambda f: f.write(json.dumps(header).encode("utf-8")))
+
+    def _save_records(self) -> None:
+        records = _record_lines(self._ids, self._documents, self._metadatas)
+        _atomic_write(self._path(_RECORDS_FILENAME), lambda f: f.write(records))
+        self._records_bytes = len(records)
+
+    def _rewrite(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        vectors: Optional[np.ndarray],
+        scales: Optional[np.ndarray],
+        squared_norms: Optional[np.ndarray] = None
+    ) -> None:
+        """Replace the whole store, in memory and on disk."""
+        # Caller must hold self._lock. New files replace the old ones, whose memory
+        # maps stay valid for results handed out earlier.
+        os.makedirs(self.directory, exist_ok=True)
+        if not ids:
+            vectors = scales = squared_norms = None
+        elif squared_norms is None:
+            squared_norms = _squared_norms(vectors, scales)
+        _atomic_write(
+            self._path(_VECTORS_FILENAME),
+            lambda f: np.ascontiguousarray(vectors).tofile(f) if vectors is not None else None
+        )
+        if scales is not None:
+            _atomic_write(self._path(_SCALES_FILENAME), lambda f: np.ascontiguousarray(scales).tofile(f))
+        else:
+            try:
+                os.remove(self._path(_SCALES_FILENAME))
+            except FileNotFoundError:
+                pass
+        self._ids, self._documents, self._metadatas = ids, documents, metadatas
+        if vectors is not None:
+            self._dimension = vectors.shape[1]
+        self._save_records()
+        self._save_header(len(ids))
+        self._norms_buffer = self._squared_norms = squared_norms
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(ids)}
+        self._columns = {}
+        self._map()
+
+    def _append(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        vectors: np.ndarray,
+        scales: Optional[np.ndarray],
+        squared_norms: np.ndarray
+    ) -> None:
+        """Add new chunks after the stored ones, writing only their rows."""
+        # Caller must hold self._lock. Rows are only ever added after the ones
+        # results handed out earlier refer to, so those stay valid.
+        os.makedirs(self.directory, exist_ok=True)
+        count = len(self._ids)
+        self._dimension = vectors.shape[1]
+        _write_at(self._path(_VECTORS_FILENAME), count * self._dimension * self._dtype.itemsize, vectors.tobytes())
+        if scales is not None:
+            _write_at(self._path(_SCALES_FILENAME), count * scales.itemsize, scales.tobytes())
+        records_bytes = _write_at(self._path(_RECORDS_FILENAME), self._records_bytes, _record_lines(ids, documents, metadatas))
+        self._save_header(count + len(ids))
+
+        self._records_bytes = records_bytes
+        self._ids.extend(ids)
+        self._documents.extend(documents)
+        self._metadatas.extend(metadatas)
+        for row, chunk_id in enumerate(ids, start=count):
+            self._rows[chunk_id] = row
+        self._norms_buffer = _append_rows(self._norms_buffer, count, squared_norms)
+        self._squared_norms = self._norms_buffer[:len(self._ids)]
+        self._columns = {}
+        self._map()
+
+    # ---------- State ----------
+
+    @property
+    def quantized(self) -> bool:
+        return self._dtype != np.float32
+
+    @property
+    def moved(self) -> bool:
+        """Whether the chunks were moved to another collection, which now serves every call."""
+        return self._successor is not None
+
+    def move_to(
+        self,
+        collection,
+        embed_documents: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        batch_size: int = 256
+    ) -> int:
+        """
+        Copy every chunk with its embedding into `collection` (e.g. a Chroma collection)
+        and send later reads and writes there, so callers still holding this store
+        neither lose chunks nor read stale ones. Quantized stores copy full-precision
+        vectors from `embed_documents` (served from the embedding cache) when given.
+        Returns the number of chunks copied.
+        """
+        with self._lock:
+            for start in range(0, len(self._ids), batch_size):
+                end = start + batch_size
+                if self.quantized and embed_documents is not None:
+                    embeddings = embed_documents(self._documents[start:end])
+                else:
+                    scales = None if self._scales is None else self._scales[start:end]
+                    embeddings = dequantize(self._vectors[start:end], scales).tolist()
+                collection.upsert(
+                    ids=self._ids[start:end],
+                    embeddings=embeddings,
+                    metadatas=self._metadatas[start:end],
+                    documents=self._documents[start:end]
+                )
+            moved = len(self._ids)
+            self._successor = collection
+            # Release the rows; their files are removed once the move is complete
+            self._ids, self._documents, self._metadatas = [], [], []
+            self._vectors = self._scales = self._norms_buffer = self._squared_norms = None
+            self._rows, self._columns = {}, {}
+            return moved
+
+    def count(self) -> int:
+        with self._lock:
+            if self._successor is not None:
+                return self._successor.count()
+            return len(self._ids)
+
+    def dimension(self) -> Optional[int]:
+        with self._lock:
+            return None if self._vectors is None else self._vectors.shape[1]
+
+    def nbytes(self) -> int:
+        """Bytes taken by the stored vectors (and int8 scales); 0 once moved."""
+        with self._lock:
+            if self._vectors is None:
+                return 0
+            return self._vectors.nbytes + (self._scales.nbytes if self._scales is not None else 0)
+
+    # ---------- Filtering ----------
+
+    def _column(self, field: str) -> np.ndarray:
+        # Caller must hold self._lock
+        column = self._columns.get(field)
+        if column is None:
+            column = np.empty(len(self._metadatas), dtype=object)
+            column[:] = [metadata.get(field) for metadata in self._metadatas]
+            self._columns[field] = column
+        return column
+
+    def _field_mask(self, field: str, condition: Any) -> np.ndarray:
+        column = self._column(field)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        mask = np.ones(len(column), dtype=bool)
+        for operator, value in condition.items():
+            if operator == "$eq":
+                mask &= column == value
+            elif operator == "$ne":
+                mask &= column != value
+            elif operator in ("$in", "$nin"):
+                matches = np.zeros(len(column), dtype=bool)
+                for item in value:
+                    matches |= column == item
+                mask &= matches if operator == "$in" else ~matches
+            else:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+        return mask
+
+    def _mask(self, where: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Rows matching a Chroma-style `where` filter ($and, $or, $eq, $ne, $in, $nin)."""
+        # Caller must hold self._lock
+        mask = np.ones(len(self._ids), dtype=bool)
+        for key, condition in (where or {}).items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self._mask(clause)
+            elif key == "$or":
+                matches = np.zeros(len(self._ids), dtype=bool)
+                for clause in condition:
+                    matches |= self._mask(clause)
+                mask &= matches
+            else:
+                mask &= self._field_mask(key, condition)
+        return mask
+
+    def _select(self, ids: Optional[List[str]], where: Optional[Dict[str, Any]]) -> np.ndarray:
+        # Caller must hold self._lock
+        mask = self._mask(where)
+        if ids is not None:
+            by_id = np.zeros(len(self._ids), dtype=bool)
+            by_id[[self._rows[chunk_id] for chunk_id in ids if chunk_id in self._rows]] = True
+            mask &= by_id
+        return np.flatnonzero(mask)
+
+    # ---------- Collection API ----------
+
+    def upsert(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        documents: Optional[List[str]] = None
+    ) -> None:
+        if not ids:
+            return
+        metadatas = metadatas or [{} for _ in ids]
+        documents = documents or ["" for _ in ids]
+        with self._lock:
+            if self._successor is not None:
+                return self._successor.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+            new_vectors, new_scales = quantize(embeddings, self._dtype)
+            new_norms = _squared_norms(new_vectors, new_scales)
+            if self._vectors is not None and new_vectors.shape[1] != self._vectors.shape[1]:
+                raise ValueError(
+                    f"Embedding dimension {new_vectors.shape[1]} does not match the store's {self._vectors.shape[1]}"
+                )
+
+            if len(set(ids)) == len(ids) and not any(chunk_id in self._rows for chunk_id in ids):
+                self._append(list(ids), list(documents), list(metadatas), new_vectors, new_scales, new_norms)
+            else:
+                self._replace(ids, documents, metadatas, new_vectors, new_scales, new_norms)
+            overflowed = self._successor is None and len(self._ids) > self.max_chunks
+
+        if overflowed and self.on_overflow is not None:
+            self.on_overflow()
+
+    def _replace(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        new_vectors: np.ndarray,
+        new_scales: Optional[np.ndarray],
+        new_norms: np.ndarray
+    ) -> None:
+        # Caller must hold self._lock. Upserts that overwrite stored chunks rewrite the store.
+        if self._vectors is not None:
+            vectors, norms = np.array(self._vectors), np.array(self._squared_norms)
+            scales = np.array(self._scales) if self._scales is not None else None
+        else:
+            vectors = np.empty((0, new_vectors.shape[1]), self._dtype)
+            norms = np.empty(0, np.float32)
+            scales = np.empty(0, np.float32) if new_scales is not None else None
+        all_ids, all_documents, all_metadatas = list(self._ids), list(self._documents), list(self._metadatas)
+        rows = dict(self._rows)
+        appended = []
+        for position, chunk_id in enumerate(ids):
+            row = rows.get(chunk_id)
+            if row is None:
+                rows[chunk_id] = len(all_ids)
+                all_ids.append(chunk_id)
+                all_documents.append(documents[position])
+                all_metadatas.append(metadatas[position])
+                appended.append(position)
+            elif row < len(vectors):
+                vectors[row], norms[row] = new_vectors[position], new_norms[position]
+                if scales is not None:
+                    scales[row] = new_scales[position]
+                all_documents[row] = documents[position]
+                all_metadatas[row] = metadatas[position]
+            else:
+                # Repeated within this batch: the last occurrence wins
+                appended[row - len(vectors)] = position
+                all_documents[row] = documents[position]
+                all_metadatas[row] = metadatas[position]
+        if appended:
+            vectors = np.concatenate([vectors, new_vectors[appended]])
+            norms = np.concatenate([norms, new_norms[appended]])
+            if scales is not None:
+                scales = np.concatenate([scales, new_scales[appended]])
+        self._rewrite(all_ids, all_documents, all_metadatas, vectors, scales, norms)
+
+    def update(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """Replace chunk metadata (vectors and texts are unchanged)."""
+        with self._lock:
+            if self._successor is not None:
+                return self._successor.update(ids=ids, metadatas=metadatas)
+            all_metadatas = list(self._metadatas)
+            for chunk_id, metadata in zip(ids, metadatas):
+                row = self._rows.get(chunk_id)
+                if row is not None:
+                    all_metadatas[row] = metadata
+            self._metadatas = all_metadatas
+            self._columns = {}
+            self._save_records()
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            if self._successor is not None:
+                return self._successor.delete(ids=ids)
+            removed = {self._rows[chunk_id] for chunk_id in ids if chunk_id in self._rows}
+            if not removed:
+                return
+            keep = [row for row in range(len(self._ids)) if row not in removed]
+            self._rewrite(
+                [self._ids[row] for row in keep],
+                [self._documents[row] for row in keep],
+                [self._metadatas[row] for row in keep],
+                np.asarray(self._vectors)[keep],
+                self._scales[keep] if self._scales is not None else None,
+                self._squared_norms[keep]
+            )
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include: Iterable[str] = ("metadatas", "documents")
+    ) -> Dict[str, Any]:
+        with self._lock:
+            if self._successor is not None:
+                return self._successor.get(ids=ids, where=where, limit=limit, offset=offset, include=list(include))
+            rows = self._select(ids, where)[offset or 0:]
+            if limit is not None:
+                rows = rows[:limit]
+            result: Dict[str, Any] = {"ids": [self._ids[row] for row in rows]}
+            result["documents"] = [self._documents[row] for row in rows] if "documents" in include else None
+            result["metadatas"] = [self._metadatas[row] for row in rows] if "metadatas" in include else None
+            result["embeddings"] = None
+            if "embeddings" in include:
+                result["embeddings"] = dequantize(
+                    self._vectors[rows], None if self._scales is None else self._scales[rows]
+                ).tolist() if len(rows) else []
+            return result
+
+    def query(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int = 4,
+        where: Optional[Dict[str, Any]] = None,
+        rescore: Optional[Callable[[List[str]], List[Optional[List[float]]]]] = None,
+        rescore_multiplier: int = FLAT_INDEX_RESCORE_MULTIPLIER
+    ) -> Dict[str, List[List[Any]]]:
+        """
+        Nearest chunks by squared L2 distance, like Chroma's default collection, so
+        relevance scores are comparable across backends. One matrix-vector product
+        over the whole store; rows excluded by `where` are dropped before ranking.
+
+        With `rescore` (texts -> full-precision vectors, None where unavailable), the
+        top n_results x rescore_multiplier candidates by stored-vector distance are
+        re-ranked by their exact distance, recovering most of the recall lost to
+        quantization.
+        """
+        result: Dict[str, List[List[Any]]] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        with self._lock:
+            if self._successor is not None:
+                # Chroma ranks with full-precision vectors, there is nothing to rescore
+                return self._successor.query(query_embeddings=query_embeddings, n_results=n_results, where=where)
+            vectors, scales, squared_norms = self._vectors, self._scales, self._squared_norms
+            candidates = self._select(None, where) if vectors is not None else np.empty(0, dtype=np.int64)
+            ids, documents, metadatas = self._ids, self._documents, self._metadatas
+
+        for embedding in query_embeddings:
+            rows: List[int] = []
+            distances: List[float] = []
+            if len(candidates) and n_results > 0:
+                query = np.asarray(embedding, dtype=np.float32)
+                if query.shape[0] != vectors.shape[1]:
+                    raise ValueError(
+                        f"Query embedding dimension {query.shape[0]} does not match the store's {vectors.shape[1]}"
+                    )
+                # |x - q|^2 = |x|^2 - 2 x.q + |q|^2
+                all_distances = squared_norms - 2.0 * _dot(vectors, scales, query) + float(query @ query)
+                all_distances = all_distances[candidates]
+                pool = n_results * max(1, rescore_multiplier) if rescore else n_results
+                k = min(pool, len(candidates))
+                nearest = np.argpartition(all_distances, k - 1)[:k] if k < len(candidates) else np.arange(len(candidates))
+                top_rows, top_distances = candidates[nearest], all_distances[nearest]
+
+                if rescore:
+                    full_vectors = rescore([documents[row] for row in top_rows])
+                    for i, full in enumerate(full_vectors):
+                        if full is not None and len(full) == len(query):
+                            difference = np.asarray(full, dtype=np.float32) - query
+                            top_distances[i] = difference @ difference
+
+                order = np.argsort(top_distances, kind="stable")[:n_results]
+                rows = [int(row) for row in top_rows[order]]
+                distances = [max(0.0, float(distance)) for distance in top_distances[order]]
+            result["ids"].append([ids[row] for row in rows])
+            result["documents"].append([documents[row] for row in rows])
+            result["metadatas"].append([metadatas[row] for row in rows])
+            result["distances"].append(distances)
+        return result
+
+
+class FlatIndexVectorStore(VectorStore):
+    """
+    LangChain vector store over a FlatCollection, for small per-user corpora: no
+    client, no SQLite, one vectorised search per query. Exposes `_collection` and
+    `_persist_directory` like langchain_chroma.Chroma, which the rest of the app uses.
+    """
+
+    def __init__(
+        self,
+        persist_directory: str,
+        embedding_function: Optional[Embeddings] = None,
+        dtype: str = FLAT_INDEX_DTYPE,
+        collection_name: str = DEFAULT_COLLECTION,
+        on_overflow: Optional[Callable[["FlatIndexVectorStore"], None]] = None
+    ):
+        self._persist_directory = persist_directory
+        self._embedding_function = embedding_function
+        # See FLAT_INDEX_DTYPE for how `dtype` applies to existing stores
+        self._collection = FlatCollection(
+            persist_directory,
+            dtype=dtype,
+            collection_name=collection_name,
+            on_overflow=(lambda: on_overflow(self)) if on_overflow else None
+        )
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self._embedding_function
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        texts = list(texts)
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        embeddings = self._embedding_function.embed_documents(texts)
+        self._collection.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=texts)
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> None:
+        if ids:
+            self._collection.delete(ids=ids)
+
+    def delete_collection(self) -> None:
+        """Remove the collection from disk (handles still open keep their in-memory copy)."""
+        remove_flat_index(self._persist_directory, self._collection.name)
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        return self._collection.get(
+            ids=ids, where=where, limit=limit, offset=offset,
+            include=include or ["metadatas", "documents"]
+        )
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        rescore = None
+        if FLAT_INDEX_RESCORE and self._collection.quantized and hasattr(self._embedding_function, "cached_vectors"):
+            # Full-precision chunk vectors are kept by the embedding cache, not in the index
+            rescore = self._embedding_function.cached_vectors
+        results = self._collection.query(query_embeddings=[embedding], n_results=k, where=filter, rescore=rescore)
+        return [
+            (Document(page_content=text, metadata=metadata or {}), distance)
+            for text, metadata, distance in zip(
+                results["documents"][0], results["metadatas"][0], results["distances"][0]
+            )
+        ]
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        embedding = self._embedding_function.embed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)]
+
+    def _select_relevance_score_fn(self):
+        # Same distance and normalisation as Chroma's default (l2) collections
+        return self._euclidean_relevance_score_fn
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        persist_directory: str = "embeddings/",
+        **kwargs: Any
+    ) -> "FlatIndexVectorStore":
+        store = cls(persist_directory, embedding_function=embedding)
+        store.add_texts(texts, metadatas=metadatas)
+        return store
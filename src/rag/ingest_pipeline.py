@@ -0,0 +1,145 @@
+import os
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from src import metrics
+from src.rag.corpus_version import bump_corpus_version
+from src.rag.file_manifest import record_chunks
+from src.rag.keyword_index import get_keyword_index
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "32"))
+# Embedding batches in flight at once, shared by every ingest in the process
+INGEST_MAX_IN_FLIGHT = int(os.getenv("INGEST_MAX_IN_FLIGHT", "4"))
+
+_embedding_executor = ThreadPoolExecutor(max_workers=max(1, INGEST_MAX_IN_FLIGHT), thread_name_prefix="embed")
+
+
+class IngestCancelled(Exception):
+    """Raised when an ingest is cancelled between batches."""
+
+
+def iter_batches(items: Iterable[Document], batch_size: int) -> Iterator[List[Document]]:
+    """Group any (possibly lazy) iterable into lists of at most `batch_size` items."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, max(1, batch_size)))
+        if not batch:
+            return
+        yield batch
+
+
+def _embed_batch(embedding_function, texts: List[str]) -> Tuple[List[List[float]], int, int]:
+    if hasattr(embedding_function, "embed_documents_with_stats"):
+        return embedding_function.embed_documents_with_stats(texts)
+    return embedding_function.embed_documents(texts), 0, len(texts)
+
+
+def _write_batch(vectorstore, batch: List[Document], vectors: List[List[float]]) -> None:
+    ids = [str(uuid.uuid4()) for _ in batch]
+    metadatas = [doc.metadata for doc in batch]
+    texts = [doc.page_content for doc in batch]
+    vectorstore._collection.upsert(
+        ids=ids,
+        embeddings=vectors,
+        metadatas=metadatas,
+        documents=texts
+    )
+    # Keep the lexical index in step with the collection
+    get_keyword_index(vectorstore).add(ids, texts, metadatas)
+
+
+def embed_and_write(
+    vectorstore,
+    chunks: Iterable[Document],
+    batch_size: int = INGEST_BATCH_SIZE,
+    max_in_flight: int = INGEST_MAX_IN_FLIGHT,
+    progress_callback: Optional[Callable[[int, Optional[int]], None]] = None,
+    should_cancel: Optional[Callable[[], bool]] = None
+) -> Dict[str, Any]:
+    """
+    Streaming ingestion stage: embed chunks in batches with at most `max_in_flight`
+    batches outstanding, and write each batch to the vector store as soon as its
+    embeddings are ready.
+
+    `chunks` may be a list or a lazy iterator; only the in-flight batches are held in
+    memory, so peak memory does not grow with document size.
+
+    progress_callback(done, total) is called after each written batch (total is None
+    for iterators of unknown length). If should_cancel() returns True, no new batches
+    are started, outstanding ones are discarded and IngestCancelled is raised; batches
+    already written stay in the store.
+
+    Returns ingest stats: chunks, embedding cache hits/misses/hit ratio, elapsed
+    seconds and throughput in chunks per second.
+    """
+    total = len(chunks) if hasattr(chunks, "__len__") else None
+    embedding_function = vectorstore.embeddings
+    max_in_flight = max(1, max_in_flight)
+
+    started = time.perf_counter()
+    done = hits = misses = 0
+    pending: Dict[Future, List[Document]] = {}
+    written_metadatas: List[Dict[str, Any]] = []
+
+    def write_completed(block: bool) -> None:
+        nonlocal done, hits, misses
+        if not pending:
+            return
+        completed, _ = wait(pending.keys(), timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in completed:
+            batch = pending.pop(future)
+            vectors, batch_hits, batch_misses = future.result()
+            _write_batch(vectorstore, batch, vectors)
+            written_metadatas.extend(doc.metadata for doc in batch)
+            done += len(batch)
+            hits += batch_hits
+            misses += batch_misses
+            if progress_callback:
+                progress_callback(done, total)
+
+    try:
+        for batch in iter_batches(chunks, batch_size):
+            if should_cancel and should_cancel():
+                raise IngestCancelled(f"Ingest cancelled after {done} chunks")
+
+            # Keep the number of outstanding batches (and their vectors) bounded
+            while len(pending) >= max_in_flight:
+                write_completed(block=True)
+
+            texts = [doc.page_content for doc in batch]
+            pending[_embedding_executor.submit(_embed_batch, embedding_function, texts)] = batch
+            write_completed(block=False)
+
+        while pending:
+            if should_cancel and should_cancel():
+                raise IngestCancelled(f"Ingest cancelled after {done} chunks")
+            write_completed(block=True)
+
+    finally:
+        for future in pending:
+            future.cancel()
+        if done:
+            get_keyword_index(vectorstore).save()
+            record_chunks(vectorstore._persist_directory, written_metadatas, vectorstore)
+            # Answers cached against the previous documents are no longer valid
+            bump_corpus_version(vectorstore._persist_directory)
+
+    elapsed = time.perf_counter() - started
+    chunks_per_second = round(done / elapsed, 2) if elapsed > 0 else None
+    if done:
+        metrics.increment("ingest.chunks", done)
+        metrics.observe("ingest.chunks_per_second", chunks_per_second)
+
+    return {
+        "chunks": done,
+        "cache_hits": hits,
+        "cache_misses": misses,
+        "cache_hit_ratio": round(hits / done, 3) if done else None,
+        "elapsed_s": round(elapsed, 2),
+        "chunks_per_second": chunks_per_second
+    }
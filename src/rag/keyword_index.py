@@ -0,0 +1,240 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# BM25 parameters
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+KEYWORD_INDEX_FILENAME = "keyword_index.json"
+
+# Words, numbers and identifiers such as ERR-404, v2.1.3, user_id or foo.bar
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[._\-/:][a-z0-9]+)*")
+_PART_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase terms of a text. Compound identifiers are kept whole and also
+    indexed by their parts, so "ERR-404" matches queries for "err-404" and "404".
+    """
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        parts = _PART_PATTERN.findall(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def is_identifier(token: str) -> bool:
+    """Tokens that dense embeddings handle poorly: codes, versions, numbers, snake_case..."""
+    return any(char.isdigit() for char in token) or any(char in "._-/:" for char in token)
+
+
+def is_keyword_query(query: str, max_terms: int) -> bool:
+    """Short queries containing at least one identifier-like term"""
+    tokens = _TOKEN_PATTERN.findall(query.lower())
+    return 0 < len(tokens) <= max_terms and any(is_identifier(token) for token in tokens)
+
+
+class KeywordIndex:
+    """
+    In-memory BM25 inverted index over the chunks of one vector store, keyed by
+    Chroma chunk id. Kept next to the collection as a JSON file and updated on
+    every write and delete, so lexical lookups never touch the embedding model.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._terms: Dict[str, List[str]] = {}
+        self._metadata: Dict[str, Dict[str, Any]] = {}
+        self._total_length = 0
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for chunk_id, text, metadata in zip(ids, texts, metadatas):
+                if chunk_id in self._lengths:
+                    self._remove(chunk_id)
+                terms = Counter(tokenize(text))
+                for term, count in terms.items():
+                    self._postings.setdefault(term, {})[chunk_id] = count
+                length = sum(terms.values())
+                self._terms[chunk_id] = list(terms)
+                self._lengths[chunk_id] = length
+                self._total_length += length
+                self._metadata[chunk_id] = {
+                    "user_id": metadata.get("user_id"),
+                    "file_id": metadata.get("file_id"),
+                    "file_type": metadata.get("file_type")
+                }
+            self._dirty = True
+
+    def delete(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            for chunk_id in ids:
+                if chunk_id in self._lengths:
+                    self._remove(chunk_id)
+                    self._dirty = True
+
+    def _remove(self, chunk_id: str) -> None:
+        # Caller must hold self._lock
+        for term in self._terms.pop(chunk_id, []):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(chunk_id)
+        self._metadata.pop(chunk_id, None)
+
+    def search(
+        self,
+        query: str,
+        k: int = 4,
+        file_types: Optional[List[str]] = None,
+        user_id: Optional[str] = None,
+        file_ids: Optional[List[str]] = None
+    ) -> List[Tuple[str, float, float]]:
+        """
+        Top-k chunks by BM25. Returns (chunk id, BM25 score, coverage): a 0-1 lexical
+        relevance score, the higher of the IDF-weighted fraction of query terms the
+        chunk contains and the fraction of the query's identifiers (e.g. ERR-404,
+        v2.1.3, user_id) it contains. A chunk holding the one error code a long
+        question asks about therefore scores like a strong vector match.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        identifiers = [
+            token for token in dict.fromkeys(_TOKEN_PATTERN.findall(query.lower()))
+            if is_identifier(token) and not token.isdigit()
+        ]
+
+        with self._lock:
+            count = len(self._lengths)
+            if not count:
+                return []
+            average_length = self._total_length / count
+            # Terms missing from the index get the highest weight: no chunk covers them
+            idfs = {}
+            for term in terms:
+                frequency = len(self._postings.get(term, ()))
+                idfs[term] = math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            total_idf = sum(idfs.values())
+            scores: Dict[str, float] = {}
+            matched: Dict[str, int] = {}
+            matched_idf: Dict[str, float] = {}
+            matched_identifiers: Dict[str, int] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = idfs[term]
+                for chunk_id, frequency in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[chunk_id] / average_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                    matched[chunk_id] = matched.get(chunk_id, 0) + 1
+                    matched_idf[chunk_id] = matched_idf.get(chunk_id, 0.0) + idf
+                    if term in identifiers:
+                        matched_identifiers[chunk_id] = matched_identifiers.get(chunk_id, 0) + 1
+
+            if file_types or user_id or file_ids:
+                scores = {
+                    chunk_id: score for chunk_id, score in scores.items()
+                    if (not file_types or self._metadata[chunk_id]["file_type"] in file_types)
+                    and (not user_id or self._metadata[chunk_id]["user_id"] == user_id)
+                    and (not file_ids or self._metadata[chunk_id]["file_id"] in file_ids)
+                }
+
+        def coverage(chunk_id: str) -> float:
+            if matched[chunk_id] == len(terms):
+                return 1.0
+            identifier_coverage = matched_identifiers.get(chunk_id, 0) / len(identifiers) if identifiers else 0.0
+            return max(matched_idf[chunk_id] / total_idf, identifier_coverage)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(chunk_id, score, coverage(chunk_id)) for chunk_id, score in ranked]
+
+    def save(self) -> None:
+        """Persist the index atomically if it changed since the last save."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "lengths": self._lengths,
+                "metadata": self._metadata,
+                "postings": self._postings
+            }
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+    def load(self) -> bool:
+        """Load the persisted index. Returns False if there is none (or it is unreadable)."""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Could not read keyword index {self.path}: {e}")
+            return False
+        with self._lock:
+            # Each chunk's term list is derived from the postings rather than stored
+            self._lengths = data["lengths"]
+            self._metadata = data["metadata"]
+            self._postings = data["postings"]
+            self._terms = {}
+            for term, postings in self._postings.items():
+                for chunk_id in postings:
+                    self._terms.setdefault(chunk_id, []).append(term)
+            self._total_length = sum(self._lengths.values())
+            self._dirty = False
+        return True
+
+
+_indexes: Dict[str, KeywordIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_keyword_index(vectorstore) -> KeywordIndex:
+    """
+    Keyword index of a vector store, shared process-wide. Loaded from disk on first
+    use, or rebuilt from the collection if the store predates the index.
+    """
+    persist_directory = vectorstore._persist_directory
+    key = os.path.normcase(os.path.abspath(persist_directory))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = KeywordIndex(os.path.join(persist_directory, KEYWORD_INDEX_FILENAME))
+            # Rebuild if missing, or out of step with the collection (e.g. after a crash)
+            if not index.load() or len(index) != vectorstore._collection.count():
+                index = KeywordIndex(index.path)
+                results = vectorstore.get(include=["documents", "metadatas"])
+                if results and results["ids"]:
+                    index.add(results["ids"], results["documents"], results["metadatas"])
+                    print(f"Built keyword index for {persist_directory} ({len(index)} chunks)")
+                index.save()
+            _indexes[key] = index
+        return index
+
+
+def invalidate_keyword_index(persist_directory: str) -> None:
+    """Forget the cached index of a directory (e.g. after the directory was removed)."""
+    with _indexes_lock:
+        _indexes.pop(os.path.normcase(os.path.abspath(persist_directory)), None)
@@ -1,8 +1,17 @@
 from langchain_core.language_models.llms import LLM
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.outputs import GenerationChunk
 from pydantic import Field
-from typing import Optional, List
+from typing import AsyncIterator, Iterator, Optional, List
+import json
+import httpx
 import requests
 
+from src.http_pool import get_async_client
+
+# Generation can take minutes; only bound connecting to Ollama
+OLLAMA_TIMEOUT = httpx.Timeout(connect=10.0, read=None, write=30.0, pool=None)
+
 class McpLLM(LLM):
     model: str = Field(default="mistral")
     mcp_url: str = Field(default="http://localhost:11434/api/chat")
@@ -12,12 +21,15 @@ class McpLLM(LLM):
     def _llm_type(self) -> str:
         return "mcp-llm"
 
-    def _call(self, prompt: str, stop: Optional[List[str]] = None) -> str:
-        messages = [
+    def _build_messages(self, prompt: str) -> List[dict]:
+        return [
             {"role": "system", "content": "You are a helpful assistant. Only use the provided context. Do not hallucinate."},
             {"role": "user", "content": prompt}
         ]
 
+    def _call(self, prompt: str, stop: Optional[List[str]] = None) -> str:
+        messages = self._build_messages(prompt)
+
         try:
             response = requests.post(self.mcp_url, json={
                 "model": self.model,
@@ -30,4 +42,87 @@ class McpLLM(LLM):
         except requests.exceptions.ConnectionError:
             return f"Error: Cannot connect to MCP server at {self.mcp_url}. Please ensure the server is running."
         except requests.exceptions.RequestException as e:
-            return f"Error: {str(e)}"
\ No newline at end of file
+            return f"Error: {str(e)}"
+
+    def _stream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs
+    ) -> Iterator[GenerationChunk]:
+        """
+        Yield tokens as Ollama produces them (newline-delimited JSON with "stream": True).
+        Connection and HTTP errors are raised, so callers can report them instead of
+        sending them as answer text.
+        """
+        messages = self._build_messages(prompt)
+
+        with requests.post(self.mcp_url, json={
+            "model": self.model,
+            "messages": messages,
+            "stream": True
+        }, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                token = data.get("message", {}).get("content", "")
+                if token:
+                    chunk = GenerationChunk(text=token)
+                    if run_manager:
+                        run_manager.on_llm_new_token(token, chunk=chunk)
+                    yield chunk
+                if data.get("done"):
+                    break
+
+    async def _acall(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs
+    ) -> str:
+        """Like _call, but errors are raised for the caller's fallback instead of returned as the answer."""
+        messages = self._build_messages(prompt)
+        client = get_async_client("ollama", timeout=OLLAMA_TIMEOUT)
+
+        response = await client.post(self.mcp_url, json={
+            "model": self.model,
+            "messages": messages,
+            "stream": False
+        })
+        response.raise_for_status()
+        result = response.json()
+        return result.get("message", {}).get("content", "No response.")
+
+    async def _astream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs
+    ) -> AsyncIterator[GenerationChunk]:
+        """Async variant of _stream over the shared pooled Ollama client (errors are raised too)."""
+        messages = self._build_messages(prompt)
+        client = get_async_client("ollama", timeout=OLLAMA_TIMEOUT)
+
+        async with client.stream("POST", self.mcp_url, json={
+            "model": self.model,
+            "messages": messages,
+            "stream": True
+        }) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                token = data.get("message", {}).get("content", "")
+                if token:
+                    chunk = GenerationChunk(text=token)
+                    if run_manager:
+                        await run_manager.on_llm_new_token(token, chunk=chunk)
+                    yield chunk
+                if data.get("done"):
+                    break
@@ -3,7 +3,8 @@ from langchain.chains import RetrievalQA
 from langchain_core.vectorstores import VectorStoreRetriever
 from langchain_core.retrievers import BaseRetriever
 from langchain_core.documents import Document
-from typing import List
+from langchain_core.prompts import format_document
+from typing import AsyncIterator, List, Optional, Tuple
 
 
 class CustomRetrieverWrapper(BaseRetriever):
@@ -15,6 +16,11 @@ class CustomRetrieverWrapper(BaseRetriever):
     
     def _get_relevant_documents(self, query: str) -> List[Document]:
         return self._custom_retriever.get_relevant_documents(query)
+    
+    async def _aget_relevant_documents(self, query: str) -> List[Document]:
+        if hasattr(self._custom_retriever, "aget_relevant_documents"):
+            return await self._custom_retriever.aget_relevant_documents(query)
+        return await super()._aget_relevant_documents(query)
 
 
 def create_qa_chain(
@@ -47,4 +53,66 @@ def query_rag(chain: RetrievalQA, question: str) -> dict:
     for doc in result['source_documents']:
         print(doc.metadata.get("source", "Unknown source"))
         print(doc.page_content[:300], "\n---")  # First 300 characters
-    return result
\ No newline at end of file
+    return result
+
+
+async def aquery_rag(chain: RetrievalQA, question: str) -> dict:
+    """Async variant of query_rag: retrieval runs off the event loop, generation uses the pooled async client."""
+    result = await chain.ainvoke({"query": question})
+    print("\n--- Retrieved Chunks ---")
+    for doc in result['source_documents']:
+        print(doc.metadata.get("source", "Unknown source"))
+        print(doc.page_content[:300], "\n---")  # First 300 characters
+    return result
+
+
+def build_rag_prompt(chain: RetrievalQA, question: str, documents: List[Document]) -> str:
+    """
+    Render the exact prompt the chain's "stuff" step would send to the LLM.
+    """
+    combine_chain = chain.combine_documents_chain
+    context = combine_chain.document_separator.join(
+        format_document(doc, combine_chain.document_prompt) for doc in documents
+    )
+    return combine_chain.llm_chain.prompt.format(
+        **{combine_chain.document_variable_name: context, "question": question}
+    )
+
+
+async def aretrieve_with_scores(chain: RetrievalQA, question: str) -> List[Tuple[Document, Optional[float]]]:
+    """
+    Retrieve (document, relevance score) pairs through the chain's retriever without
+    generating an answer. Retrievers that cannot score results report None.
+    """
+    retriever = getattr(chain.retriever, "_custom_retriever", chain.retriever)
+    if hasattr(retriever, "aget_relevant_documents_with_scores"):
+        return await retriever.aget_relevant_documents_with_scores(question)
+
+    documents = await chain.retriever.ainvoke(question)
+    return [(doc, None) for doc in documents]
+
+
+async def aanswer_from_documents(chain: RetrievalQA, question: str, documents: List[Document]) -> dict:
+    """
+    Generate an answer from already-retrieved documents.
+    Returns the same shape as query_rag: {"query", "result", "source_documents"}.
+    """
+    prompt = build_rag_prompt(chain, question, documents)
+    llm = chain.combine_documents_chain.llm_chain.llm
+    answer = await llm.ainvoke(prompt)
+    return {"query": question, "result": answer, "source_documents": documents}
+
+
+async def astream_rag(
+    chain: RetrievalQA,
+    question: str,
+    documents: Optional[List[Document]] = None
+) -> Tuple[List[Document], AsyncIterator[str]]:
+    """
+    Retrieve documents for the question (unless already given) and return them
+    together with an async iterator over the answer tokens as the LLM generates them.
+    """
+    source_documents = documents if documents is not None else await chain.retriever.ainvoke(question)
+    prompt = build_rag_prompt(chain, question, source_documents)
+    llm = chain.combine_documents_chain.llm_chain.llm
+    return source_documents, llm.astream(prompt)
@@ -0,0 +1,162 @@
+import hashlib
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from src.loaders.file_loader import compute_file_hash, list_supported_files, load_single_document
+from src.rag.ingest_pipeline import IngestCancelled, embed_and_write
+from src.rag.file_manifest import update_file
+from src.rag.vector_store import (
+    delete_chunks, delete_documents_by_file_id, get_user_files, load_vectorstore, split_documents
+)
+
+
+def chunk_hash(text: str) -> str:
+    """Content address of a chunk's text, used to match chunks across versions of a file"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _in_directory(file_path: Optional[str], directory: str) -> bool:
+    if not file_path:
+        return False
+    parent = os.path.dirname(os.path.abspath(file_path))
+    return os.path.normcase(parent) == os.path.normcase(os.path.abspath(directory))
+
+
+def _indexed_files(persist_directory: str, user_id: str, upload_dir: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Files of a user currently in the store that were indexed from `upload_dir`, by
+    filename: file_id and content_hash. Files indexed in place from elsewhere (bulk
+    indexing with --no-copy) are left out, so the re-index never touches them.
+    """
+    return {
+        file["filename"]: {"file_id": file["file_id"], "content_hash": file.get("content_hash")}
+        for file in get_user_files(persist_directory, user_id)
+        if file.get("filename") and _in_directory(file.get("file_path"), upload_dir)
+    }
+
+
+def _diff_file_chunks(vectorstore, file_id: str, chunks: List[Document]) -> Dict[str, Any]:
+    """
+    Match the new chunks of a file against its stored chunks by text hash.
+    Returns the stored ids to keep (with the new chunk metadata to update them with),
+    the chunks that must be embedded, and the stored ids that are now stale.
+    """
+    stored = vectorstore.get(where={"file_id": file_id}, include=["documents"])
+    available: Dict[str, List[str]] = {}
+    for chunk_id, text in zip(stored.get("ids") or [], stored.get("documents") or []):
+        available.setdefault(chunk_hash(text or ""), []).append(chunk_id)
+
+    keep_ids, keep_metadatas, to_embed = [], [], []
+    for chunk in chunks:
+        matches = available.get(chunk_hash(chunk.page_content))
+        if matches:
+            keep_ids.append(matches.pop())
+            keep_metadatas.append(chunk.metadata)
+        else:
+            to_embed.append(chunk)
+
+    stale_ids = [chunk_id for ids in available.values() for chunk_id in ids]
+    return {"keep_ids": keep_ids, "keep_metadatas": keep_metadatas, "to_embed": to_embed, "stale_ids": stale_ids}
+
+
+def reindex_user_folder(
+    upload_dir: str,
+    persist_directory: str,
+    user_id: str,
+    progress_callback: Optional[Callable[[str], None]] = None,
+    should_cancel: Optional[Callable[[], bool]] = None
+) -> Dict[str, Any]:
+    """
+    Bring a user's vector store in line with their upload folder, by content hash:
+    new files are indexed, deleted files are removed, unchanged files are skipped.
+    Only files indexed from `upload_dir` are compared and removed.
+
+    Changed files are diffed at chunk granularity: chunks whose text is already
+    stored keep their embeddings (only their metadata is updated), new chunks are
+    embedded and inserted, and chunks that no longer exist are deleted.
+
+    progress_callback(filename) is called before each file is processed. If
+    should_cancel() returns True, IngestCancelled is raised between files or
+    embedding batches; re-running the re-index repairs a partially processed file.
+
+    Returns counts of added/changed/unchanged/removed files and of chunks
+    embedded, reused and deleted.
+    """
+    vectorstore = load_vectorstore(persist_directory)
+    indexed = _indexed_files(persist_directory, user_id, upload_dir)
+    stats = {
+        "added": 0, "changed": 0, "unchanged": 0, "removed": 0, "failed": 0,
+        "chunks_embedded": 0, "chunks_reused": 0, "chunks_deleted": 0
+    }
+    on_disk = set()
+
+    for file_path in list_supported_files(upload_dir):
+        if should_cancel and should_cancel():
+            raise IngestCancelled("Re-index cancelled")
+        filename = os.path.basename(file_path)
+        on_disk.add(filename)
+        if progress_callback:
+            progress_callback(filename)
+
+        content_hash = compute_file_hash(file_path)
+        previous = indexed.get(filename)
+        if previous and previous["content_hash"] == content_hash:
+            stats["unchanged"] += 1
+            continue
+
+        try:
+            documents = load_single_document(file_path, user_id, content_hash=content_hash)
+        except Exception as e:
+            print(f"Re-index: could not load {filename}: {e}")
+            stats["failed"] += 1
+            continue
+
+        if previous and previous["file_id"]:
+            # Keep the file's identity so links to its file_id stay valid
+            upload_timestamp = datetime.now().isoformat()
+            for doc in documents:
+                doc.metadata["file_id"] = previous["file_id"]
+                doc.metadata["upload_timestamp"] = upload_timestamp
+            chunks = split_documents(documents)
+            diff = _diff_file_chunks(vectorstore, previous["file_id"], chunks)
+
+            # Insert first, then update and delete, so the file stays searchable throughout
+            written = embed_and_write(vectorstore, diff["to_embed"], should_cancel=should_cancel)
+            if diff["keep_ids"]:
+                vectorstore._collection.update(ids=diff["keep_ids"], metadatas=diff["keep_metadatas"])
+            if diff["stale_ids"]:
+                delete_chunks(vectorstore, diff["stale_ids"])
+            update_file(
+                persist_directory, previous["file_id"],
+                content_hash=content_hash, upload_timestamp=upload_timestamp
+            )
+
+            stats["changed"] += 1
+            stats["chunks_embedded"] += written["chunks"]
+            stats["chunks_reused"] += len(diff["keep_ids"])
+            stats["chunks_deleted"] += len(diff["stale_ids"])
+            print(
+                f"Re-index: {filename} changed, {written['chunks']} chunks embedded, "
+                f"{len(diff['keep_ids'])} reused, {len(diff['stale_ids'])} deleted"
+            )
+        else:
+            written = embed_and_write(vectorstore, split_documents(documents), should_cancel=should_cancel)
+            stats["added"] += 1
+            stats["chunks_embedded"] += written["chunks"]
+            print(f"Re-index: {filename} added, {written['chunks']} chunks embedded")
+
+    # Files that were indexed but are no longer in the upload folder
+    for filename, previous in indexed.items():
+        if filename in on_disk or not previous["file_id"]:
+            continue
+        if should_cancel and should_cancel():
+            raise IngestCancelled("Re-index cancelled")
+        deleted, _ = delete_documents_by_file_id(persist_directory, previous["file_id"])
+        if deleted:
+            stats["removed"] += 1
+            print(f"Re-index: {filename} removed")
+
+    return stats
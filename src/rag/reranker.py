@@ -0,0 +1,96 @@
+import math
+import os
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from src import metrics
+from src.rag.keyword_index import tokenize
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "true").lower() in ("1", "true", "yes")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "30"))
+# Approximate prompt tokens the selected chunks may use together
+RERANK_TOKEN_BUDGET = int(os.getenv("RERANK_TOKEN_BUDGET", "1200"))
+# Weight of lexical overlap vs. the retrieval rank in the final score
+RERANK_OVERLAP_WEIGHT = float(os.getenv("RERANK_OVERLAP_WEIGHT", "0.7"))
+# Candidates sharing more than this fraction of terms with a selected chunk are skipped
+RERANK_MAX_REDUNDANCY = float(os.getenv("RERANK_MAX_REDUNDANCY", "0.8"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English text)"""
+    return max(1, len(text) // 4)
+
+
+def _overlap_scores(query: str, documents: List[Document]) -> List[float]:
+    """
+    Fraction of the query's terms found in each document, weighted by how rare each
+    term is within the candidate pool (a term every candidate contains says little).
+    """
+    query_terms = set(tokenize(query))
+    if not query_terms:
+        return [0.0] * len(documents)
+
+    document_terms = [set(tokenize(doc.page_content)) for doc in documents]
+    frequency = Counter(term for terms in document_terms for term in terms if term in query_terms)
+    weights = {term: math.log(1 + len(documents) / (1 + frequency[term])) for term in query_terms}
+    total = sum(weights.values()) or 1.0
+    return [sum(weights[term] for term in query_terms & terms) / total for terms in document_terms]
+
+
+def _redundant(terms: set, selected_terms: List[set]) -> bool:
+    for other in selected_terms:
+        smaller = min(len(terms), len(other)) or 1
+        if len(terms & other) / smaller > RERANK_MAX_REDUNDANCY:
+            return True
+    return False
+
+
+def rerank(
+    query: str,
+    candidates: List[Tuple[Document, Optional[float]]],
+    top_n: int = 4,
+    token_budget: int = RERANK_TOKEN_BUDGET
+) -> List[Tuple[Document, Optional[float]]]:
+    """
+    Rerank a retrieval candidate pool with a cheap lexical scorer and keep only what
+    fits the prompt: at most `top_n` chunks within `token_budget` estimated tokens.
+
+    Each candidate is scored by weighted query-term overlap blended with its original
+    retrieval rank; near-duplicate chunks (overlapping splits of the same passage) are
+    skipped. The best chunk is always kept, even if it alone exceeds the budget.
+    Retrieval relevance scores are passed through unchanged for the RAG/web gate.
+    """
+    if not candidates:
+        return []
+
+    documents = [doc for doc, _ in candidates]
+    overlaps = _overlap_scores(query, documents)
+    count = len(candidates)
+    scored = [
+        (RERANK_OVERLAP_WEIGHT * overlap + (1 - RERANK_OVERLAP_WEIGHT) * (1 - rank / count), rank)
+        for rank, overlap in enumerate(overlaps)
+    ]
+    scored.sort(key=lambda item: item[0], reverse=True)
+
+    selected: List[Tuple[Document, Optional[float]]] = []
+    selected_terms: List[set] = []
+    used_tokens = 0
+    for _, rank in scored:
+        if len(selected) >= top_n:
+            break
+        doc = documents[rank]
+        tokens = estimate_tokens(doc.page_content)
+        if selected and used_tokens + tokens > token_budget:
+            continue
+        terms = set(tokenize(doc.page_content))
+        if _redundant(terms, selected_terms):
+            continue
+        selected.append(candidates[rank])
+        selected_terms.append(terms)
+        used_tokens += tokens
+
+    metrics.observe("rerank.prompt_tokens", used_tokens)
+    metrics.increment("rerank.candidates", count)
+    return selected
@@ -1,8 +1,11 @@
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from langchain_chroma import Chroma
 from langchain_core.vectorstores import VectorStoreRetriever
 from langchain_core.documents import Document
-from src.rag.vector_store import load_vectorstore, search_with_metadata_filter
+from src.rag.reranker import RERANK_CANDIDATES, RERANK_ENABLED, rerank
+from src.rag.vector_store import (
+    load_vectorstore, retrieval_search_with_scores, aretrieval_search_with_scores
+)
 
 def get_retriever(
     vectorstore: Chroma,
@@ -32,30 +35,70 @@ def get_filtered_retriever(
     user_id: Optional[str] = None,
     file_types: Optional[List[str]] = None,
     file_ids: Optional[List[str]] = None,
-    k: int = 4
+    k: int = 4,
+    mode: Optional[str] = None,
+    candidate_pool: Optional[int] = None
 ) -> VectorStoreRetriever:
     """
     Create a retriever with metadata filtering for faster, targeted search.
+    `mode` is "hybrid" (BM25 + vector, fused) or "dense"; defaults to RETRIEVAL_MODE.
+    
+    With reranking (RERANK_ENABLED), `candidate_pool` chunks (RERANK_CANDIDATES by
+    default) are retrieved and reranked down to at most `k` that fit the prompt
+    token budget. Pass candidate_pool=0 to return the top `k` directly.
     """
+    if candidate_pool is None:
+        candidate_pool = RERANK_CANDIDATES if RERANK_ENABLED else 0
+    
     class FilteredRetriever:
-        def __init__(self, persist_directory, user_id, file_types, file_ids, k):
+        def __init__(self, persist_directory, user_id, file_types, file_ids, k, mode, candidate_pool):
             self.persist_directory = persist_directory
             self.user_id = user_id
             self.file_types = file_types
             self.file_ids = file_ids
             self.k = k
+            self.mode = mode
+            self.candidate_pool = max(k, candidate_pool) if candidate_pool else 0
+        
+        def _select(self, query: str, candidates: List[Tuple[Document, Optional[float]]]) -> List[Tuple[Document, Optional[float]]]:
+            if not self.candidate_pool:
+                return candidates
+            return rerank(query, candidates, top_n=self.k)
         
         def get_relevant_documents(self, query: str) -> List[Document]:
-            return search_with_metadata_filter(
+            return [doc for doc, _ in self.get_relevant_documents_with_scores(query)]
+        
+        async def aget_relevant_documents(self, query: str) -> List[Document]:
+            return [doc for doc, _ in await self.aget_relevant_documents_with_scores(query)]
+        
+        def get_relevant_documents_with_scores(self, query: str) -> List[Tuple[Document, Optional[float]]]:
+            candidates = retrieval_search_with_scores(
                 persist_directory=self.persist_directory,
                 query=query,
                 user_id=self.user_id,
                 file_types=self.file_types,
                 file_ids=self.file_ids,
-                k=self.k
+                k=self.candidate_pool or self.k,
+                mode=self.mode
             )
+            return self._select(query, candidates)
+        
+        async def aget_relevant_documents_with_scores(self, query: str) -> List[Tuple[Document, Optional[float]]]:
+            candidates = await aretrieval_search_with_scores(
+                persist_directory=self.persist_directory,
+                query=query,
+                user_id=self.user_id,
+                file_types=self.file_types,
+                file_ids=self.file_ids,
+                k=self.candidate_pool or self.k,
+                mode=self.mode
+            )
+            return self._select(query, candidates)
         
         def invoke(self, query: str) -> List[Document]:
             return self.get_relevant_documents(query)
+        
+        async def ainvoke(self, query: str) -> List[Document]:
+            return await self.aget_relevant_documents(query)
     
-    return FilteredRetriever(persist_directory, user_id, file_types, file_ids, k)
+    return FilteredRetriever(persist_directory, user_id, file_types, file_ids, k, mode, candidate_pool)
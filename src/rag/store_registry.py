@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+VECTORSTORE_POOL_SIZE = int(os.getenv("VECTORSTORE_POOL_SIZE", "32"))
+VECTORSTORE_IDLE_TIMEOUT = float(os.getenv("VECTORSTORE_IDLE_TIMEOUT", "900"))
+# Approximate memory cap for the vectors, texts and metadata held by pooled stores
+VECTORSTORE_POOL_MAX_MB = float(os.getenv("VECTORSTORE_POOL_MAX_MB", "1024"))
+
+
+class _PooledStore:
+    def __init__(self, store: Any, weight: int = 0):
+        self.store = store
+        self.weight = weight
+        self.last_used = time.monotonic()
+
+
+class VectorStoreRegistry:
+    """
+    Process-wide pool of long-lived vector store handles keyed by persist directory.
+
+    Handles are created lazily through `factory`, kept in LRU order, evicted when the
+    pool grows beyond `max_size` entries or, as weighed by `weigher`, `max_bytes`, and
+    when they have been idle longer than `idle_timeout` seconds. Evicted handles are
+    only dropped from the pool, never closed, so callers that still hold a reference
+    can finish their query safely.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str, str], Any],
+        max_size: int = VECTORSTORE_POOL_SIZE,
+        idle_timeout: float = VECTORSTORE_IDLE_TIMEOUT,
+        weigher: Optional[Callable[[Any], int]] = None,
+        max_bytes: int = int(VECTORSTORE_POOL_MAX_MB * 1024 * 1024)
+    ):
+        self._factory = factory
+        self._max_size = max(1, max_size)
+        self._idle_timeout = idle_timeout
+        self._weigher = weigher
+        self._max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], _PooledStore]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        self._creation_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+    @staticmethod
+    def _key(persist_directory: str, model_name: str) -> Tuple[str, str]:
+        return os.path.normcase(os.path.abspath(persist_directory)), model_name
+
+    def get(self, persist_directory: str, model_name: str) -> Any:
+        """Return the pooled handle for a directory, opening it on first use."""
+        key = self._key(persist_directory, model_name)
+
+        store = self._lookup(key)
+        if store is not None:
+            return store
+
+        # Serialise construction per key so concurrent first requests share one client
+        with self._lock:
+            creation_lock = self._creation_locks.setdefault(key, threading.Lock())
+
+        with creation_lock:
+            store = self._lookup(key)
+            if store is not None:
+                return store
+
+            store = self._factory(persist_directory, model_name)
+            self.put(persist_directory, model_name, store)
+            return store
+
+    def peek(self, persist_directory: str, model_name: str) -> Optional[Any]:
+        """Return the pooled handle for a directory, or None; never opens one."""
+        return self._lookup(self._key(persist_directory, model_name))
+
+    def put(self, persist_directory: str, model_name: str, store: Any) -> None:
+        """Register (or replace) the handle for a directory."""
+        key = self._key(persist_directory, model_name)
+        weight = self._weigh(store)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = _PooledStore(store, weight)
+            self._total_bytes += weight
+            self._evict(keep=key)
+
+    def reweigh(self, persist_directory: str) -> None:
+        """Re-estimate the memory of a directory's handles after its store was written."""
+        directory = self._key(persist_directory, "")[0]
+        with self._lock:
+            entries = [(key, entry.store) for key, entry in self._entries.items() if key[0] == directory]
+        for key, store in entries:
+            weight = self._weigh(store)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry.store is store:
+                    self._total_bytes += weight - entry.weight
+                    entry.weight = weight
+        with self._lock:
+            self._evict()
+
+    def invalidate(self, persist_directory: str) -> int:
+        """
+        Drop every pooled handle for a directory, e.g. after it was rebuilt or removed
+        on disk. The next `get` opens a fresh handle. Returns the number of handles dropped.
+        """
+        directory = self._key(persist_directory, "")[0]
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == directory]
+            for key in stale:
+                self._remove(key)
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._creation_locks.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self._max_size,
+                "idle_timeout": self._idle_timeout,
+                "approx_bytes": self._total_bytes,
+                "max_bytes": self._max_bytes,
+                "directories": [key[0] for key in self._entries]
+            }
+
+    def _lookup(self, key: Tuple[str, str]) -> Optional[Any]:
+        with self._lock:
+            self._evict()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            # The directory was removed underneath us (e.g. `rm -rf embeddings/`)
+            if not os.path.isdir(key[0]):
+                self._remove(key)
+                return None
+
+            entry.last_used = time.monotonic()
+            self._entries.move_to_end(key)
+            return entry.store
+
+    def _weigh(self, store: Any) -> int:
+        if self._weigher is None:
+            return 0
+        try:
+            return max(0, int(self._weigher(store)))
+        except Exception as e:
+            print(f"Could not estimate the size of a vector store: {e}")
+            return 0
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        # Caller must hold self._lock
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry.weight
+        self._creation_locks.pop(key, None)
+
+    def _evict(self, keep: Optional[Tuple[str, str]] = None) -> None:
+        # Caller must hold self._lock; never evicts `keep`, the entry just inserted
+        if self._idle_timeout > 0:
+            cutoff = time.monotonic() - self._idle_timeout
+            idle = [key for key, entry in self._entries.items() if entry.last_used < cutoff and key != keep]
+            for key in idle:
+                self._remove(key)
+
+        while len(self._entries) > 1 and (
+            len(self._entries) > self._max_size or self._total_bytes > self._max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+            self._remove(oldest)
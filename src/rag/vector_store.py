@@ -1,10 +1,35 @@
-from typing import List, Optional, Dict, Any
+from typing import Callable, Iterable, Iterator, List, Optional, Dict, Any, Tuple
 from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
-from langchain_ollama import OllamaEmbeddings
+from src.rag.store_registry import VectorStoreRegistry
+from src.rag.embedding_model import (
+    DEFAULT_COLLECTION, EMBEDDING_MODEL, LEGACY_EMBEDDING_MODEL, EmbeddingModelMismatch,
+    forget_store_metadata, get_embeddings, read_store_metadata, write_store_metadata
+)
+from src.rag.corpus_version import bump_corpus_version, on_corpus_change
+from src.rag.file_manifest import list_files, remove_chunks, repair_manifest
+from src.rag.flat_index import FlatIndexVectorStore, flat_index_exists, remove_flat_index
+from src.rag.ingest_pipeline import IngestCancelled, embed_and_write
+from src.rag.keyword_index import get_keyword_index, invalidate_keyword_index, is_keyword_query
+from src import metrics
+import asyncio
 import os
 import json
+import threading
+
+# Vector store backend: "chroma", "flat" (in-process NumPy index) or "auto", which
+# keeps small new stores in a flat index and moves them to Chroma once they grow
+VECTORSTORE_BACKEND = os.getenv("VECTORSTORE_BACKEND", "auto").lower()
+
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()  # "hybrid" (BM25 + vector) or "dense"
+HYBRID_CANDIDATE_MULTIPLIER = int(os.getenv("HYBRID_CANDIDATE_MULTIPLIER", "4"))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+# Keyword queries of at most this many terms may skip the dense search
+LEXICAL_FAST_PATH_MAX_TERMS = int(os.getenv("LEXICAL_FAST_PATH_MAX_TERMS", "3"))
+# Rough resident cost of one chunk's text and metadata, on top of its vector
+VECTORSTORE_CHUNK_OVERHEAD_BYTES = 2048
 
 def split_documents(
     documents: List[Document],
@@ -21,13 +46,40 @@ def split_documents(
     )
     split_docs = splitter.split_documents(documents)
     
-    # Update chunk indices after splitting
-    for i, doc in enumerate(split_docs):
-        doc.metadata["chunk_index"] = i
-        doc.metadata["total_chunks"] = len(split_docs)
+    # Update chunk indices after splitting, numbered per file when several are split together
+    totals: Dict[Any, int] = {}
+    for doc in split_docs:
+        file_id = doc.metadata.get("file_id")
+        doc.metadata["chunk_index"] = totals.get(file_id, 0)
+        totals[file_id] = doc.metadata["chunk_index"] + 1
+    for doc in split_docs:
+        doc.metadata["total_chunks"] = totals[doc.metadata.get("file_id")]
     
     return split_docs
 
+def iter_split_documents(
+    documents: Iterable[Document],
+    chunk_size: int = 1500,
+    chunk_overlap: int = 500
+) -> Iterator[Document]:
+    """
+    Streaming variant of split_documents: splits each document (e.g. PDF page) as it
+    arrives and yields its chunks, numbering `chunk_index` per file. `total_chunks`
+    is not set since it is only known once the whole file has been read.
+    """
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
+    )
+    counts: Dict[Any, int] = {}
+    for document in documents:
+        for doc in splitter.split_documents([document]):
+            file_id = doc.metadata.get("file_id")
+            doc.metadata.pop("total_chunks", None)
+            doc.metadata["chunk_index"] = counts.get(file_id, 0)
+            counts[file_id] = doc.metadata["chunk_index"] + 1
+            yield doc
+
 def build_vectorstore(documents: List[Document], persist_directory: str) -> Chroma:
     """
     Build vector store with enhanced metadata tracking.
@@ -38,45 +90,115 @@ def build_vectorstore(documents: List[Document], persist_directory: str) -> Chro
     # Split documents while preserving metadata
     split_docs = split_documents(documents)
     
-    # Create embeddings
-    embedding_model = OllamaEmbeddings(model="mistral")
-    
-    # Create vector store
+    # Create vector store through the shared registry so later queries reuse the handle
     try:
-        vectorstore = Chroma.from_documents(
-            documents=split_docs,
-            embedding=embedding_model,
-            persist_directory=persist_directory
-        )
-        
-        # Save file metadata for easier management
-        save_file_metadata(persist_directory, documents)
-        
+        vectorstore = load_vectorstore(persist_directory)
+        write_chunks(vectorstore, split_docs)
         return vectorstore
         
     except Exception as e:
         print(f"Error building vectorstore: {e}")
         raise e
 
+def write_chunks(
+    vectorstore: Chroma,
+    chunks: Iterable[Document],
+    progress_callback: Optional[Callable[[int, Optional[int]], None]] = None,
+    should_cancel: Optional[Callable[[], bool]] = None
+) -> Dict[str, Any]:
+    """
+    Embed already-split chunks and write them to the vector store through the
+    batched, concurrent ingest pipeline (see ingest_pipeline.embed_and_write).
+    Embeddings are served from the content-addressed cache where possible.
+    
+    Returns ingest stats: chunk count, embedding cache hits/misses/hit ratio and throughput.
+    """
+    return embed_and_write(
+        vectorstore, chunks,
+        progress_callback=progress_callback,
+        should_cancel=should_cancel
+    )
+
 def add_documents_to_vectorstore(
     vectorstore: Chroma, 
-    documents: List[Document]
-) -> None:
+    documents: List[Document],
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    should_cancel: Optional[Callable[[], bool]] = None
+) -> Dict[str, Any]:
     """
     Add new documents to existing vector store.
+    Returns ingest stats (see write_chunks for the callbacks).
     """
     try:
         split_docs = split_documents(documents)
-        vectorstore.add_documents(split_docs)
+        stats = write_chunks(
+            vectorstore, split_docs,
+            progress_callback=progress_callback,
+            should_cancel=should_cancel
+        )
+        print(
+            f"Embedded {stats['chunks']} chunks at {stats['chunks_per_second']} chunks/s, "
+            f"embedding cache hit ratio: {stats['cache_hit_ratio']}"
+        )
+        return stats
         
-        # Update metadata file
-        persist_directory = vectorstore._persist_directory
-        save_file_metadata(persist_directory, documents, append=True)
+    except IngestCancelled:
+        raise
+    except Exception as e:
+        print(f"Error adding documents to vectorstore: {e}")
+        raise e
+
+def add_document_stream_to_vectorstore(
+    vectorstore: Chroma,
+    documents: Iterable[Document],
+    progress_callback: Optional[Callable[[int, Optional[int]], None]] = None,
+    should_cancel: Optional[Callable[[], bool]] = None
+) -> Dict[str, Any]:
+    """
+    Add documents from a lazy iterator (e.g. iter_pdf_pages) to the vector store:
+    pages are split and embedded batch by batch as they are read, so large files
+    start indexing immediately and are never fully held in memory.
+    Returns ingest stats (see write_chunks for the callbacks; total is None).
+    """
+    try:
+        stats = write_chunks(
+            vectorstore, iter_split_documents(documents),
+            progress_callback=progress_callback,
+            should_cancel=should_cancel
+        )
+        print(
+            f"Embedded {stats['chunks']} chunks at {stats['chunks_per_second']} chunks/s, "
+            f"embedding cache hit ratio: {stats['cache_hit_ratio']}"
+        )
+        return stats
         
+    except IngestCancelled:
+        raise
     except Exception as e:
         print(f"Error adding documents to vectorstore: {e}")
         raise e
 
+def delete_chunks(
+    vectorstore: Chroma,
+    ids: List[str],
+    metadatas: Optional[List[Dict[str, Any]]] = None
+) -> None:
+    """
+    Delete chunks by id from the collection, the keyword index and the file manifest,
+    and bump the corpus version. All chunk deletions go through here so these stay
+    in step. Pass the chunks' `metadatas` if already fetched to save a lookup.
+    """
+    if not ids:
+        return
+    if metadatas is None:
+        metadatas = vectorstore.get(ids=ids, include=["metadatas"])["metadatas"]
+    vectorstore.delete(ids=ids)
+    keyword_index = get_keyword_index(vectorstore)
+    keyword_index.delete(ids)
+    keyword_index.save()
+    remove_chunks(vectorstore._persist_directory, metadatas, vectorstore)
+    bump_corpus_version(vectorstore._persist_directory)
+
 def delete_documents_by_file_id(
     persist_directory: str, 
     file_id: str
@@ -97,11 +219,8 @@ def delete_documents_by_file_id(
             if results['metadatas'] and len(results['metadatas']) > 0:
                 filename = results['metadatas'][0].get('filename')
             
-            # Delete documents by their IDs
-            vectorstore.delete(ids=results['ids'])
-            
-            # Update metadata file
-            remove_file_from_metadata(persist_directory, file_id)
+            # Delete documents by their IDs (also updates the file manifest)
+            delete_chunks(vectorstore, results['ids'], results['metadatas'])
             
             print(f"Deleted {len(results['ids'])} chunks for file_id: {file_id}")
             return True, filename
@@ -133,7 +252,7 @@ def delete_documents_by_filename(
         })
         
         if results and results['ids']:
-            vectorstore.delete(ids=results['ids'])
+            delete_chunks(vectorstore, results['ids'], results['metadatas'])
             print(f"Deleted {len(results['ids'])} chunks for file: {filename}")
             return True
         else:
@@ -144,121 +263,197 @@ def delete_documents_by_filename(
         print(f"Error deleting documents for file {filename}: {e}")
         return False
 
+def find_file_by_content_hash(
+    persist_directory: str,
+    user_id: str,
+    content_hash: str
+) -> Optional[Dict[str, Any]]:
+    """
+    Return metadata of an already-indexed file of this user with identical content, if any.
+    """
+    for file in get_user_files(persist_directory, user_id):
+        if file.get('content_hash') == content_hash:
+            return {
+                'file_id': file['file_id'],
+                'filename': file['filename']
+            }
+    return None
+
 def get_user_files(persist_directory: str, user_id: str) -> List[Dict[str, Any]]:
     """
-    Get list of all files uploaded by a specific user.
+    Get list of all files uploaded by a specific user, from the file manifest (O(files)).
     """
     try:
         vectorstore = load_vectorstore(persist_directory)
-        
-        # Get all documents for this user
-        results = vectorstore.get(where={"user_id": user_id})
-        
-        if not results or not results['metadatas']:
-            return []
-        
-        # Group by file_id to get unique files
-        files_dict = {}
-        for metadata in results['metadatas']:
-            file_id = metadata.get('file_id')
-            if file_id and file_id not in files_dict:
-                files_dict[file_id] = {
-                    'file_id': file_id,
-                    'filename': metadata.get('filename'),
-                    'file_type': metadata.get('file_type'),
-                    'upload_timestamp': metadata.get('upload_timestamp'),
-                    'chunk_count': 0
-                }
-            if file_id:
-                files_dict[file_id]['chunk_count'] += 1
-        
-        return list(files_dict.values())
+        return [
+            file for file in list_files(persist_directory, vectorstore)
+            if file.get('user_id') == user_id
+        ]
         
     except Exception as e:
         print(f"Error getting user files: {e}")
         return []
 
-def save_file_metadata(persist_directory: str, documents: List[Document], append: bool = False):
+def repair_file_manifest(persist_directory: str) -> Dict[str, Any]:
     """
-    Save file metadata to a JSON file for easier management.
+    Reconcile the file manifest with the chunks actually stored in the vector store.
     """
-    metadata_file = os.path.join(persist_directory, "file_metadata.json")
-    
-    # Extract unique file metadata
-    files_metadata = {}
-    for doc in documents:
-        file_id = doc.metadata.get('file_id')
-        if file_id and file_id not in files_metadata:
-            files_metadata[file_id] = {
-                'file_id': file_id,
-                'filename': doc.metadata.get('filename'),
-                'file_path': doc.metadata.get('source'),
-                'file_type': doc.metadata.get('file_type'),
-                'user_id': doc.metadata.get('user_id'),
-                'upload_timestamp': doc.metadata.get('upload_timestamp')
-            }
-    
-    if append and os.path.exists(metadata_file):
-        with open(metadata_file, 'r') as f:
-            existing_data = json.load(f)
-        existing_data.update(files_metadata)
-        files_metadata = existing_data
-    
-    with open(metadata_file, 'w') as f:
-        json.dump(files_metadata, f, indent=2)
+    return repair_manifest(persist_directory, load_vectorstore(persist_directory))
+
+def vectorstore_exists(persist_directory: str) -> bool:
+    """Whether a vector store (of either backend) has been created in the directory."""
+    metadata = read_store_metadata(persist_directory) or {}
+    return (
+        os.path.exists(os.path.join(persist_directory, "chroma.sqlite3"))
+        or flat_index_exists(persist_directory, metadata.get("collection", DEFAULT_COLLECTION))
+    )
 
-def remove_file_from_metadata(persist_directory: str, file_id: str):
+def get_store_metadata(persist_directory: str) -> Dict[str, Any]:
     """
-    Remove file metadata from the JSON file.
+    Embedding model and active collection of a store, recorded on first use: new
+    stores are embedded with EMBEDDING_MODEL, stores that predate the record were
+    built with LEGACY_EMBEDDING_MODEL.
     """
-    metadata_file = os.path.join(persist_directory, "file_metadata.json")
-    
-    if os.path.exists(metadata_file):
-        try:
-            with open(metadata_file, 'r') as f:
-                data = json.load(f)
-            
-            if file_id in data:
-                filename = data[file_id].get('filename', 'Unknown')
-                del data[file_id]
-                
-                with open(metadata_file, 'w') as f:
-                    json.dump(data, f, indent=2)
-                    
-                print(f"✅ Removed {filename} from metadata file")
-            else:
-                print(f"⚠️ File ID {file_id} not found in metadata")
-                
-        except Exception as e:
-            print(f"❌ Error updating metadata file: {e}")
+    metadata = read_store_metadata(persist_directory)
+    if metadata is None:
+        model = LEGACY_EMBEDDING_MODEL if vectorstore_exists(persist_directory) else EMBEDDING_MODEL
+        metadata = write_store_metadata(persist_directory, model)
+    return metadata
 
-def load_vectorstore(
-    persist_directory: str = "embeddings/",
-    model_name: str = "mistral"
-) -> Chroma:
+def _vectorstore_backend(persist_directory: str, collection_name: str) -> str:
+    if VECTORSTORE_BACKEND != "auto":
+        return VECTORSTORE_BACKEND
+    # The flat index is only removed once a move to Chroma completed, so an
+    # interrupted move resumes from it; otherwise existing Chroma stores stay in Chroma
+    if flat_index_exists(persist_directory, collection_name):
+        return "flat"
+    if os.path.exists(os.path.join(persist_directory, "chroma.sqlite3")):
+        return "chroma"
+    return "flat"
+
+def open_collection(
+    persist_directory: str,
+    model_name: str,
+    collection_name: str,
+    backend: Optional[str] = None
+) -> VectorStore:
     """
-    Loads an existing Chroma vector store from disk.
+    Open one collection of a store, embedding with `model_name`. Bypasses the registry
+    and the store metadata: use load_vectorstore() unless you are migrating a store.
     """
-    embedding_model = OllamaEmbeddings(model=model_name)
+    # Chunk embeddings are looked up by content hash before calling Ollama
+    embedding_model = get_embeddings(model_name)
+    if (backend or _vectorstore_backend(persist_directory, collection_name)) == "flat":
+        return FlatIndexVectorStore(
+            persist_directory=persist_directory,
+            embedding_function=embedding_model,
+            collection_name=collection_name,
+            # The write that takes the store past FLAT_INDEX_MAX_CHUNKS moves it
+            on_overflow=(
+                lambda store: _move_to_chroma(persist_directory, model_name, store)
+            ) if VECTORSTORE_BACKEND == "auto" else None
+        )
     return Chroma(
         persist_directory=persist_directory,
-        embedding_function=embedding_model
+        embedding_function=embedding_model,
+        collection_name=collection_name
     )
 
-def search_with_metadata_filter(
-    persist_directory: str,
-    query: str,
-    file_types: Optional[List[str]] = None,
-    user_id: Optional[str] = None,
-    file_ids: Optional[List[str]] = None,
-    k: int = 4
-) -> List[Document]:
+def _open_vectorstore(persist_directory: str, model_name: str) -> VectorStore:
     """
-    Search vector store with metadata filtering for faster, targeted retrieval.
+    Opens the store's active collection with the configured backend.
+    Only the registry should call this; everything else goes through load_vectorstore().
     """
-    vectorstore = load_vectorstore(persist_directory)
+    return open_collection(persist_directory, model_name, get_store_metadata(persist_directory)["collection"])
+
+_move_lock = threading.Lock()
+
+def _move_to_chroma(persist_directory: str, model_name: str, flat_store: FlatIndexVectorStore) -> None:
+    """
+    Copy a flat index that outgrew FLAT_INDEX_MAX_CHUNKS into a Chroma collection
+    (stored embeddings are reused, nothing is re-embedded) and pool the Chroma store
+    in its place. Writers still holding the flat store are forwarded to Chroma.
+
+    Called by the write that crossed the threshold (an ingest job or the bulk
+    indexer), so requests never wait for the copy; stores already past it move on
+    their next write.
+    """
+    with _move_lock:
+        if flat_store._collection.moved:
+            return
+        collection_name = flat_store._collection.name
+        chroma = Chroma(
+            persist_directory=persist_directory,
+            embedding_function=flat_store.embeddings,
+            collection_name=collection_name
+        )
+        moved = flat_store._collection.move_to(chroma._collection, embed_documents=flat_store.embeddings.embed_documents)
+        # Collections being migrated to are not pooled until the migration switches to them
+        if _vectorstore_registry.peek(persist_directory, model_name) is flat_store:
+            _vectorstore_registry.put(persist_directory, model_name, chroma)
+        remove_flat_index(persist_directory, collection_name)
+        metrics.increment("vectorstore.moved_to_chroma")
+        print(f"Moved {moved} chunks in {persist_directory} from the flat index to Chroma")
+
+def estimate_store_bytes(vectorstore: VectorStore) -> int:
+    """Approximate memory a pooled store pins: its vectors plus chunk texts and metadata."""
+    collection = vectorstore._collection
+    count = collection.count()
+    if isinstance(vectorstore, FlatIndexVectorStore) and not collection.moved:
+        vector_bytes = collection.nbytes()
+    else:
+        sample = collection.get(limit=1, include=["embeddings"])["embeddings"]
+        dimension = len(sample[0]) if sample is not None and len(sample) else 0
+        vector_bytes = count * dimension * 4
+    return vector_bytes + count * VECTORSTORE_CHUNK_OVERHEAD_BYTES
+
+# Process-wide pool of open vector stores, keyed by persist directory
+_vectorstore_registry = VectorStoreRegistry(factory=_open_vectorstore, weigher=estimate_store_bytes)
+# Stores grow and shrink with every write; keep the pool's memory estimate current
+on_corpus_change(_vectorstore_registry.reweigh)
+
+def get_vectorstore_registry() -> VectorStoreRegistry:
+    return _vectorstore_registry
+
+def invalidate_vectorstore(persist_directory: str) -> None:
+    """
+    Drop pooled handles for a directory so the next access reopens it from disk.
+    Call this after the directory has been rebuilt or removed outside the pooled handle.
+    """
+    dropped = _vectorstore_registry.invalidate(persist_directory)
+    invalidate_keyword_index(persist_directory)
+    forget_store_metadata(persist_directory)
+    if dropped:
+        print(f"Invalidated {dropped} pooled vectorstore handle(s) for: {persist_directory}")
+
+def load_vectorstore(
+    persist_directory: str = "embeddings/",
+    model_name: Optional[str] = None
+) -> VectorStore:
+    """
+    Returns the long-lived vector store for a directory from the shared registry,
+    opening it on first use (see VECTORSTORE_BACKEND for which backend).
     
-    # Build filter conditions
+    Queries and writes are embedded with the store's recorded embedding model
+    (see get_store_metadata). Asking for a different `model_name` raises
+    EmbeddingModelMismatch: vectors of different models cannot be compared, the
+    store has to be migrated (see embedding_migration) instead.
+    """
+    store_model = get_store_metadata(persist_directory)["embedding_model"]
+    if model_name and model_name != store_model:
+        raise EmbeddingModelMismatch(
+            f"{persist_directory} is embedded with {store_model!r}, not {model_name!r}; migrate it first"
+        )
+    return _vectorstore_registry.get(persist_directory, store_model)
+
+def _build_where_filter(
+    user_id: Optional[str] = None,
+    file_types: Optional[List[str]] = None,
+    file_ids: Optional[List[str]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Build a Chroma `where` filter from the optional metadata constraints.
+    """
     filter_conditions = []
     
     if user_id:
@@ -271,16 +466,212 @@ def search_with_metadata_filter(
         filter_conditions.append({"file_id": {"$in": file_ids}})
     
     # Combine filters with AND
-    where_filter = None
-    if filter_conditions:
-        if len(filter_conditions) == 1:
-            where_filter = filter_conditions[0]
-        else:
-            where_filter = {"$and": filter_conditions}
+    if not filter_conditions:
+        return None
+    if len(filter_conditions) == 1:
+        return filter_conditions[0]
+    return {"$and": filter_conditions}
+
+def search_with_metadata_filter(
+    persist_directory: str,
+    query: str,
+    file_types: Optional[List[str]] = None,
+    user_id: Optional[str] = None,
+    file_ids: Optional[List[str]] = None,
+    k: int = 4
+) -> List[Document]:
+    """
+    Search vector store with metadata filtering for faster, targeted retrieval.
+    """
+    vectorstore = load_vectorstore(persist_directory)
     
     # Perform similarity search with filter
     return vectorstore.similarity_search(
         query=query,
         k=k,
-        filter=where_filter
-    )
\ No newline at end of file
+        filter=_build_where_filter(user_id, file_types, file_ids)
+    )
+
+def search_with_metadata_filter_and_scores(
+    persist_directory: str,
+    query: str,
+    file_types: Optional[List[str]] = None,
+    user_id: Optional[str] = None,
+    file_ids: Optional[List[str]] = None,
+    k: int = 4
+) -> List[Tuple[Document, float]]:
+    """
+    Same as search_with_metadata_filter, but returns (document, relevance score) pairs.
+    Scores are normalised by Chroma to roughly [0, 1], higher meaning more relevant.
+    """
+    vectorstore = load_vectorstore(persist_directory)
+    
+    return vectorstore.similarity_search_with_relevance_scores(
+        query=query,
+        k=k,
+        filter=_build_where_filter(user_id, file_types, file_ids)
+    )
+
+def _lexical_documents(vectorstore: Chroma, chunk_ids: List[str]) -> Dict[str, Document]:
+    """Fetch chunks found by the keyword index from the collection (no embedding needed)."""
+    if not chunk_ids:
+        return {}
+    results = vectorstore.get(ids=chunk_ids, include=["documents", "metadatas"])
+    return {
+        chunk_id: Document(page_content=text, metadata=metadata or {})
+        for chunk_id, text, metadata in zip(results["ids"], results["documents"], results["metadatas"])
+    }
+
+def _fusion_key(doc: Document) -> Tuple[Any, str]:
+    return doc.metadata.get("file_id"), doc.page_content
+
+def hybrid_search_with_scores(
+    persist_directory: str,
+    query: str,
+    file_types: Optional[List[str]] = None,
+    user_id: Optional[str] = None,
+    file_ids: Optional[List[str]] = None,
+    k: int = 4
+) -> List[Tuple[Document, Optional[float]]]:
+    """
+    Hybrid retrieval: fuses the BM25 keyword ranking and the vector ranking with
+    reciprocal rank fusion, so exact identifiers, error codes and names are found
+    even when the embedding misses them.
+    
+    Short keyword queries (e.g. "ERR-404") whose best keyword hit matches every
+    query term skip the dense search entirely. Scores are 0-1 relevance scores, so
+    the relevance gate counts keyword hits too: a document's score is the higher of
+    its vector relevance score and its keyword coverage (the IDF-weighted fraction
+    of query terms it contains, see KeywordIndex.search).
+    """
+    vectorstore = load_vectorstore(persist_directory)
+    fetch_k = max(k, k * HYBRID_CANDIDATE_MULTIPLIER)
+    lexical_hits = get_keyword_index(vectorstore).search(
+        query, k=fetch_k, file_types=file_types, user_id=user_id, file_ids=file_ids
+    )
+    
+    if (
+        lexical_hits
+        and lexical_hits[0][2] == 1.0
+        and is_keyword_query(query, LEXICAL_FAST_PATH_MAX_TERMS)
+    ):
+        metrics.increment("retrieval.lexical_fast_path")
+        top_hits = lexical_hits[:k]
+        documents = _lexical_documents(vectorstore, [chunk_id for chunk_id, _, _ in top_hits])
+        return [
+            (documents[chunk_id], coverage)
+            for chunk_id, _, coverage in top_hits if chunk_id in documents
+        ]
+    
+    metrics.increment("retrieval.hybrid")
+    dense = vectorstore.similarity_search_with_relevance_scores(
+        query=query,
+        k=fetch_k,
+        filter=_build_where_filter(user_id, file_types, file_ids)
+    )
+    
+    # Reciprocal rank fusion: sum of 1 / (HYBRID_RRF_K + rank) over both rankings
+    fused: Dict[Tuple[Any, str], Dict[str, Any]] = {}
+    for rank, (doc, score) in enumerate(dense):
+        entry = fused.setdefault(_fusion_key(doc), {"doc": doc, "score": score, "rrf": 0.0})
+        entry["rrf"] += 1.0 / (HYBRID_RRF_K + rank + 1)
+    
+    lexical_documents = _lexical_documents(vectorstore, [chunk_id for chunk_id, _, _ in lexical_hits])
+    for rank, (chunk_id, _, coverage) in enumerate(lexical_hits):
+        doc = lexical_documents.get(chunk_id)
+        if doc is None:
+            continue
+        entry = fused.setdefault(_fusion_key(doc), {"doc": doc, "score": None, "rrf": 0.0})
+        entry["rrf"] += 1.0 / (HYBRID_RRF_K + rank + 1)
+        entry["score"] = coverage if entry["score"] is None else max(entry["score"], coverage)
+    
+    ranked = sorted(fused.values(), key=lambda entry: entry["rrf"], reverse=True)[:k]
+    return [(entry["doc"], entry["score"]) for entry in ranked]
+
+def retrieval_search_with_scores(
+    persist_directory: str,
+    query: str,
+    file_types: Optional[List[str]] = None,
+    user_id: Optional[str] = None,
+    file_ids: Optional[List[str]] = None,
+    k: int = 4,
+    mode: Optional[str] = None
+) -> List[Tuple[Document, Optional[float]]]:
+    """
+    Search with the configured retrieval mode (RETRIEVAL_MODE unless `mode` is given).
+    """
+    search = hybrid_search_with_scores if (mode or RETRIEVAL_MODE) == "hybrid" else search_with_metadata_filter_and_scores
+    return search(
+        persist_directory=persist_directory,
+        query=query,
+        file_types=file_types,
+        user_id=user_id,
+        file_ids=file_ids,
+        k=k
+    )
+
+async def aretrieval_search_with_scores(
+    persist_directory: str,
+    query: str,
+    file_types: Optional[List[str]] = None,
+    user_id: Optional[str] = None,
+    file_ids: Optional[List[str]] = None,
+    k: int = 4,
+    mode: Optional[str] = None
+) -> List[Tuple[Document, Optional[float]]]:
+    """
+    Async wrapper around retrieval_search_with_scores.
+    """
+    return await asyncio.to_thread(
+        retrieval_search_with_scores,
+        persist_directory=persist_directory,
+        query=query,
+        file_types=file_types,
+        user_id=user_id,
+        file_ids=file_ids,
+        k=k,
+        mode=mode
+    )
+
+async def asearch_with_metadata_filter(
+    persist_directory: str,
+    query: str,
+    file_types: Optional[List[str]] = None,
+    user_id: Optional[str] = None,
+    file_ids: Optional[List[str]] = None,
+    k: int = 4
+) -> List[Document]:
+    """
+    Async wrapper around search_with_metadata_filter. Chroma's client is synchronous,
+    so the search runs in a worker thread instead of blocking the event loop.
+    """
+    return await asyncio.to_thread(
+        search_with_metadata_filter,
+        persist_directory=persist_directory,
+        query=query,
+        file_types=file_types,
+        user_id=user_id,
+        file_ids=file_ids,
+        k=k
+    )
+
+async def asearch_with_metadata_filter_and_scores(
+    persist_directory: str,
+    query: str,
+    file_types: Optional[List[str]] = None,
+    user_id: Optional[str] = None,
+    file_ids: Optional[List[str]] = None,
+    k: int = 4
+) -> List[Tuple[Document, float]]:
+    """
+    Async wrapper around search_with_metadata_filter_and_scores.
+    """
+    return await asyncio.to_thread(
+        search_with_metadata_filter_and_scores,
+        persist_directory=persist_directory,
+        query=query,
+        file_types=file_types,
+        user_id=user_id,
+        file_ids=file_ids,
+        k=k
+    )
@@ -0,0 +1,210 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from src import metrics
+
+WEB_SEARCH_CACHE_TTL = float(os.getenv("WEB_SEARCH_CACHE_TTL", "3600"))
+WEB_SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("WEB_SEARCH_CACHE_MAX_ENTRIES", "1024"))
+# Optional JSON file to persist the cache across restarts (empty = memory only)
+WEB_SEARCH_CACHE_PATH = os.getenv("WEB_SEARCH_CACHE_PATH", "")
+
+CacheKey = Tuple[str, str, int]
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query so trivially different phrasings share a cache entry:
+    lower-cased, whitespace collapsed, surrounding punctuation removed.
+    """
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.strip(" ?!.,;:\"'")
+
+
+def make_cache_key(query: str, engine: str, num_results: int) -> CacheKey:
+    return (engine, normalize_query(query), num_results)
+
+
+class WebSearchCache:
+    """
+    TTL + LRU cache for web search results with single-flight coalescing:
+    concurrent lookups of the same key share one upstream call.
+
+    Only successful results are cached, so a transient outage is never remembered.
+    """
+
+    def __init__(
+        self,
+        ttl: float = WEB_SEARCH_CACHE_TTL,
+        max_entries: int = WEB_SEARCH_CACHE_MAX_ENTRIES,
+        persist_path: str = WEB_SEARCH_CACHE_PATH
+    ):
+        self._ttl = ttl
+        self._max_entries = max(1, max_entries)
+        self._persist_path = persist_path
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._persist_lock = threading.Lock()
+        self._inflight: Dict[CacheKey, threading.Event] = {}
+        self._ainflight: Dict[CacheKey, asyncio.Future] = {}
+        self._load()
+
+    def get(self, key: CacheKey) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: CacheKey, value: Dict) -> None:
+        if not value.get("success", False):
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + self._ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        self._persist()
+
+    def get_or_fetch(self, key: CacheKey, fetch: Callable[[], Dict]) -> Dict:
+        """Return the cached value, or call `fetch` once for all concurrent callers of `key`."""
+        while True:
+            cached = self.get(key)
+            if cached is not None:
+                metrics.increment("web_cache.hits")
+                return cached
+
+            with self._lock:
+                event = self._inflight.get(key)
+                leader = event is None
+                if leader:
+                    event = self._inflight[key] = threading.Event()
+
+            if not leader:
+                metrics.increment("web_cache.coalesced")
+                event.wait()
+                cached = self.get(key)
+                if cached is not None:
+                    return cached
+                # The leader's call failed (not cached); try again ourselves
+                continue
+
+            metrics.increment("web_cache.misses")
+            try:
+                value = fetch()
+                self.put(key, value)
+                return value
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                event.set()
+
+    async def aget_or_fetch(self, key: CacheKey, fetch: Callable[[], Awaitable[Dict]]) -> Dict:
+        """
+        Async variant of get_or_fetch. The upstream call runs in its own task, so a
+        cancelled caller (e.g. a discarded speculative search) does not cancel it for
+        the others, and its result is still cached.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            metrics.increment("web_cache.hits")
+            return cached
+
+        future = self._ainflight.get(key)
+        if future is not None and not future.done():
+            metrics.increment("web_cache.coalesced")
+            return await asyncio.shield(future)
+
+        metrics.increment("web_cache.misses")
+
+        async def run() -> Dict:
+            try:
+                value = await fetch()
+                # put() may write the persisted cache file, keep that off the event loop
+                await asyncio.to_thread(self.put, key, value)
+                return value
+            finally:
+                self._ainflight.pop(key, None)
+
+        future = self._ainflight[key] = asyncio.ensure_future(run())
+        return await asyncio.shield(future)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        self._persist()
+
+    def stats(self) -> Dict[str, Any]:
+        hits = metrics.get_counter("web_cache.hits")
+        misses = metrics.get_counter("web_cache.misses")
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "size": size,
+            "max_entries": self._max_entries,
+            "ttl": self._ttl,
+            "hits": hits,
+            "misses": misses,
+            "coalesced": metrics.get_counter("web_cache.coalesced"),
+            "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else None,
+            "persist_path": self._persist_path or None
+        }
+
+    def _load(self) -> None:
+        if not self._persist_path or not os.path.exists(self._persist_path):
+            return
+        try:
+            with open(self._persist_path, "r") as f:
+                data = json.load(f)
+            now = time.time()
+            for item in data:
+                key = (item["engine"], item["query"], item["num_results"])
+                if item["expires_at"] > now:
+                    self._entries[key] = (item["expires_at"], item["value"])
+            print(f"Loaded {len(self._entries)} cached web searches from {self._persist_path}")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading web search cache: {e}")
+
+    def _persist(self) -> None:
+        if not self._persist_path:
+            return
+        with self._lock:
+            data = [
+                {
+                    "engine": key[0],
+                    "query": key[1],
+                    "num_results": key[2],
+                    "expires_at": expires_at,
+                    "value": value
+                }
+                for key, (expires_at, value) in self._entries.items()
+            ]
+        with self._persist_lock:
+            try:
+                directory = os.path.dirname(self._persist_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                # Write to a temp file first so a crash never leaves a truncated cache
+                tmp_path = f"{self._persist_path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self._persist_path)
+            except OSError as e:
+                print(f"Error persisting web search cache: {e}")
+
+
+_web_search_cache = WebSearchCache()
+
+
+def get_web_search_cache() -> WebSearchCache:
+    return _web_search_cache
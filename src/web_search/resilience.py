@@ -0,0 +1,285 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src import metrics
+
+WEB_BREAKER_FAILURE_THRESHOLD = int(os.getenv("WEB_BREAKER_FAILURE_THRESHOLD", "5"))
+WEB_BREAKER_RESET_TIMEOUT = float(os.getenv("WEB_BREAKER_RESET_TIMEOUT", "30"))
+# Calls slower than this count as failures, so a backend that never errors but is
+# always too slow still opens its circuit
+WEB_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("WEB_BREAKER_SLOW_CALL_SECONDS", "5"))
+
+# Hedging configuration: start the next backend once the current one is slower than
+# this percentile of its recent latencies, instead of waiting for its full timeout
+WEB_HEDGE_PERCENTILE = float(os.getenv("WEB_HEDGE_PERCENTILE", "95"))
+WEB_HEDGE_DEFAULT_DELAY = float(os.getenv("WEB_HEDGE_DEFAULT_DELAY", "2.0"))
+WEB_HEDGE_MIN_DELAY = float(os.getenv("WEB_HEDGE_MIN_DELAY", "0.25"))
+WEB_HEDGE_MIN_SAMPLES = int(os.getenv("WEB_HEDGE_MIN_SAMPLES", "20"))
+# Overall time budget for one web search across all backends
+WEB_SEARCH_BUDGET = float(os.getenv("WEB_SEARCH_BUDGET", os.getenv("WEB_SEARCH_TIMEOUT", "10")))
+# Threads running backend calls of the synchronous search path
+WEB_HEDGE_MAX_WORKERS = int(os.getenv("WEB_HEDGE_MAX_WORKERS", "8"))
+
+Attempt = Tuple[str, Callable[[], Any]]
+
+
+class HedgePoolFull(RuntimeError):
+    """Raised when every worker of the synchronous search path is busy."""
+
+
+class CircuitBreaker:
+    """
+    Per-backend circuit breaker.
+
+    closed    -> requests flow; `failure_threshold` consecutive failures open the circuit
+    open      -> requests are refused until `reset_timeout` seconds have passed
+    half_open -> a single probe request is let through; success closes, failure re-opens
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = WEB_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = WEB_BREAKER_RESET_TIMEOUT
+    ):
+        self.name = name
+        self._failure_threshold = max(1, failure_threshold)
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self._reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            metrics.increment(f"web.{self.name}.breaker_rejected")
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                print(f"[CIRCUIT] {self.name} recovered, closing circuit")
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            was_probe = self._probe_in_flight
+            self._probe_in_flight = False
+            if was_probe or self._failures >= self._failure_threshold:
+                if self._opened_at is None or was_probe:
+                    print(f"[CIRCUIT] {self.name} failing, opening circuit for {self._reset_timeout}s")
+                    metrics.increment(f"web.{self.name}.breaker_opened")
+                self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Give back a half-open probe slot whose request was abandoned (e.g. lost a hedge race)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self._state(), "consecutive_failures": self._failures}
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
+
+
+def hedge_delay(name: str) -> float:
+    """Seconds to wait on backend `name` before also starting the next backend."""
+    if metrics.sample_count(f"web.{name}.latency_ms") < WEB_HEDGE_MIN_SAMPLES:
+        return WEB_HEDGE_DEFAULT_DELAY
+    latency_ms = metrics.percentile(f"web.{name}.latency_ms", WEB_HEDGE_PERCENTILE)
+    return min(WEB_SEARCH_BUDGET, max(WEB_HEDGE_MIN_DELAY, latency_ms / 1000))
+
+
+def _record(name: str, started: float, error: Optional[BaseException]) -> None:
+    breaker = get_breaker(name)
+    elapsed = time.perf_counter() - started
+    if error is None:
+        metrics.observe(f"web.{name}.latency_ms", elapsed * 1000)
+        if elapsed > WEB_BREAKER_SLOW_CALL_SECONDS:
+            metrics.increment(f"web.{name}.slow_calls")
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+    else:
+        metrics.increment(f"web.{name}.failures")
+        breaker.record_failure()
+
+
+def _record_abandoned(name: str, started: float) -> None:
+    """A call given up on (lost the hedge race or ran out of budget) before it finished."""
+    if time.perf_counter() - started > WEB_BREAKER_SLOW_CALL_SECONDS:
+        _record(name, started, TimeoutError(f"{name} exceeded {WEB_BREAKER_SLOW_CALL_SECONDS}s"))
+    else:
+        get_breaker(name).release()
+
+
+async def ahedged_call(attempts: List[Attempt], budget: float = WEB_SEARCH_BUDGET) -> Dict:
+    """
+    Run backends in order, hedging: the next backend starts when the current one fails
+    or exceeds its hedge delay. The first successful result wins and the rest are
+    cancelled. Backends with an open circuit are skipped.
+
+    Raises the last error (or TimeoutError) if no backend succeeds within `budget`.
+    """
+    deadline = time.monotonic() + budget
+    pending: Dict[asyncio.Task, str] = {}
+    last_error: Optional[BaseException] = None
+    remaining = list(attempts)
+
+    async def run(name: str, call: Callable[[], Awaitable[Dict]]) -> Dict:
+        started = time.perf_counter()
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            _record_abandoned(name, started)
+            raise
+        except Exception as e:
+            _record(name, started, e)
+            raise
+        _record(name, started, None)
+        return result
+
+    try:
+        while remaining or pending:
+            # Launch the next allowed backend if nothing is running or the current one is slow
+            launched = None
+            while remaining and launched is None:
+                name, call = remaining.pop(0)
+                if get_breaker(name).allow_request():
+                    launched = name
+                    pending[asyncio.ensure_future(run(name, call))] = name
+                    if len(pending) > 1:
+                        metrics.increment(f"web.{name}.hedged")
+
+            if not pending:
+                break
+
+            time_left = deadline - time.monotonic()
+            if time_left <= 0:
+                break
+            wait_for = min(time_left, hedge_delay(launched)) if launched and remaining else time_left
+
+            done, _ = await asyncio.wait(pending.keys(), timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = pending.pop(task)
+                if task.exception() is None:
+                    return task.result()
+                last_error = task.exception()
+                print(f"[WEB SEARCH] {name} failed: {last_error}")
+    finally:
+        for task in pending:
+            task.cancel()
+
+    raise last_error or TimeoutError("Web search budget exhausted")
+
+
+_hedge_executor = ThreadPoolExecutor(max_workers=max(1, WEB_HEDGE_MAX_WORKERS), thread_name_prefix="web-hedge")
+# Idle workers; calls are refused instead of queueing behind busy ones
+_hedge_slots = threading.BoundedSemaphore(max(1, WEB_HEDGE_MAX_WORKERS))
+
+
+def hedged_call(attempts: List[Attempt], budget: float = WEB_SEARCH_BUDGET) -> Dict:
+    """
+    Threaded variant of ahedged_call for the synchronous search path. Losing
+    requests cannot be interrupted; they finish in the background within their own
+    timeout. A backend that cannot get a worker at once is skipped; if none can,
+    HedgePoolFull is raised instead of waiting.
+    """
+    deadline = time.monotonic() + budget
+    pending: Dict[Future, str] = {}
+    last_error: Optional[BaseException] = None
+    remaining = list(attempts)
+
+    def run(name: str, call: Callable[[], Dict]) -> Dict:
+        started = time.perf_counter()
+        try:
+            result = call()
+        except Exception as e:
+            _record(name, started, e)
+            raise
+        finally:
+            _hedge_slots.release()
+        _record(name, started, None)
+        return result
+
+    while remaining or pending:
+        launched = None
+        while remaining and launched is None:
+            name, call = remaining.pop(0)
+            if not get_breaker(name).allow_request():
+                continue
+            if not _hedge_slots.acquire(blocking=False):
+                get_breaker(name).release()
+                metrics.increment("web.hedge_pool_full")
+                last_error = last_error or HedgePoolFull(f"All {WEB_HEDGE_MAX_WORKERS} web search workers are busy")
+                continue
+            launched = name
+            pending[_hedge_executor.submit(run, name, call)] = name
+            if len(pending) > 1:
+                metrics.increment(f"web.{name}.hedged")
+
+        if not pending:
+            break
+
+        time_left = deadline - time.monotonic()
+        if time_left <= 0:
+            break
+        wait_for = min(time_left, hedge_delay(launched)) if launched and remaining else time_left
+
+        done, _ = wait(pending.keys(), timeout=wait_for, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = pending.pop(future)
+            if future.exception() is None:
+                return future.result()
+            last_error = future.exception()
+            print(f"[WEB SEARCH] {name} failed: {last_error}")
+
+    raise last_error or TimeoutError("Web search budget exhausted")
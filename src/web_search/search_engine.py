@@ -1,15 +1,45 @@
 import requests
 import os
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
 import logging
 from langchain_ollama import OllamaLLM
 
+from src.http_pool import get_async_client
+from src.rag.mcp_llm import McpLLM
+from src.web_search.cache import get_web_search_cache, make_cache_key
+from src.web_search.resilience import ahedged_call, hedged_call
+
 logger = logging.getLogger(__name__)
 
+SERPER_URL = os.getenv("SERPER_URL", "https://google.serper.dev/search")
+DUCKDUCKGO_URL = os.getenv("DUCKDUCKGO_URL", "https://api.duckduckgo.com/")
+WEB_SEARCH_TIMEOUT = float(os.getenv("WEB_SEARCH_TIMEOUT", "10"))
+
+# Minimum retrieval relevance score (0-1) for answering from documents instead of the web
+RAG_RELEVANCE_THRESHOLD = float(os.getenv("RAG_RELEVANCE_THRESHOLD", "0.3"))
+# Also run the post-generation answer check (has_relevant_rag_results) after the score gate
+RAG_POSTHOC_CHECK = os.getenv("RAG_POSTHOC_CHECK", "true").lower() in ("1", "true", "yes")
+# Scores in [threshold, threshold + margin) are "borderline": RAG is tried but may still fall back
+RAG_BORDERLINE_MARGIN = float(os.getenv("RAG_BORDERLINE_MARGIN", "0.15"))
+
+# Shared LLM for async synthesis; it talks to Ollama through the pooled "ollama" client
+_synthesis_llm: Optional[McpLLM] = None
+
+def _get_synthesis_llm() -> McpLLM:
+    global _synthesis_llm
+    if _synthesis_llm is None:
+        _synthesis_llm = McpLLM(model="mistral")
+    return _synthesis_llm
+
+def _search_engine_name() -> str:
+    """Which backend a search would start with, used to separate cache entries"""
+    return "serper" if os.getenv("SERPER_API_KEY") else "duckduckgo"
+
 def search_web(query: str, num_results: int = 5) -> Dict:
     """
     Perform web search using DuckDuckGo Instant Answer API (free) as fallback,
-    or Serper API if available.
+    or Serper API if available. Results are served from the TTL cache when possible,
+    and concurrent identical queries share one upstream call.
     
     Args:
         query: Search query
@@ -18,18 +48,56 @@ def search_web(query: str, num_results: int = 5) -> Dict:
     Returns:
         Dictionary with search results and metadata
     """
+    key = make_cache_key(query, _search_engine_name(), num_results)
+    return get_web_search_cache().get_or_fetch(key, lambda: _search_web_uncached(query, num_results))
+
+def _search_web_uncached(query: str, num_results: int) -> Dict:
+    """
+    Query the search backends directly, bypassing the cache. Serper is tried first
+    (if an API key is available) and DuckDuckGo is hedged in once Serper is slow or
+    failing; backends with an open circuit breaker are skipped.
+    """
+    attempts = []
+    serper_key = os.getenv("SERPER_API_KEY")
+    if serper_key:
+        attempts.append(("serper", lambda: _search_with_serper(query, num_results, serper_key)))
+    # Fallback to DuckDuckGo (free but limited)
+    attempts.append(("duckduckgo", lambda: _search_with_duckduckgo(query)))
     
-    # Try Serper API first (if API key is available)
+    try:
+        return hedged_call(attempts)
+    except Exception as e:
+        logger.error(f"All web search methods failed: {e}")
+        return {
+            "success": False,
+            "error": "Web search temporarily unavailable",
+            "results": []
+        }
+
+async def asearch_web(query: str, num_results: int = 5) -> Dict:
+    """
+    Async variant of search_web using the pooled httpx clients and the same cache.
+    
+    Args:
+        query: Search query
+        num_results: Number of results to return
+        
+    Returns:
+        Dictionary with search results and metadata
+    """
+    key = make_cache_key(query, _search_engine_name(), num_results)
+    return await get_web_search_cache().aget_or_fetch(key, lambda: _asearch_web_uncached(query, num_results))
+
+async def _asearch_web_uncached(query: str, num_results: int) -> Dict:
+    """Async variant of _search_web_uncached over the pooled clients"""
+    attempts = []
     serper_key = os.getenv("SERPER_API_KEY")
     if serper_key:
-        try:
-            return _search_with_serper(query, num_results, serper_key)
-        except Exception as e:
-            logger.warning(f"Serper API failed: {e}, falling back to DuckDuckGo")
+        attempts.append(("serper", lambda: _asearch_with_serper(query, num_results, serper_key)))
+    attempts.append(("duckduckgo", lambda: _asearch_with_duckduckgo(query)))
     
-    # Fallback to DuckDuckGo (free but limited)
     try:
-        return _search_with_duckduckgo(query)
+        return await ahedged_call(attempts)
     except Exception as e:
         logger.error(f"All web search methods failed: {e}")
         return {
@@ -40,8 +108,6 @@ def search_web(query: str, num_results: int = 5) -> Dict:
 
 def _search_with_serper(query: str, num_results: int, api_key: str) -> Dict:
     """Search using Serper API (paid but comprehensive)"""
-    url = "https://google.serper.dev/search"
-    
     headers = {
         "X-API-KEY": api_key,
         "Content-Type": "application/json"
@@ -52,11 +118,26 @@ def _search_with_serper(query: str, num_results: int, api_key: str) -> Dict:
         "num": num_results
     }
     
-    response = requests.post(url, headers=headers, json=payload, timeout=10)
+    response = requests.post(SERPER_URL, headers=headers, json=payload, timeout=WEB_SEARCH_TIMEOUT)
     response.raise_for_status()
     
-    data = response.json()
+    return _parse_serper_response(response.json())
+
+async def _asearch_with_serper(query: str, num_results: int, api_key: str) -> Dict:
+    """Async Serper search over the pooled "serper" client"""
+    client = get_async_client("serper")
+    response = await client.post(
+        SERPER_URL,
+        headers={"X-API-KEY": api_key, "Content-Type": "application/json"},
+        json={"q": query, "num": num_results},
+        timeout=WEB_SEARCH_TIMEOUT
+    )
+    response.raise_for_status()
     
+    return _parse_serper_response(response.json())
+
+def _parse_serper_response(data: Dict) -> Dict:
+    """Convert a Serper API payload into our search result format"""
     results = []
     if "organic" in data:
         for item in data["organic"]:
@@ -76,20 +157,29 @@ def _search_with_serper(query: str, num_results: int, api_key: str) -> Dict:
 
 def _search_with_duckduckgo(query: str) -> Dict:
     """Search using DuckDuckGo Instant Answer API (free but limited)"""
-    url = "https://api.duckduckgo.com/"
+    response = requests.get(DUCKDUCKGO_URL, params=_duckduckgo_params(query), timeout=WEB_SEARCH_TIMEOUT)
+    response.raise_for_status()
     
-    params = {
+    return _parse_duckduckgo_response(response.json())
+
+async def _asearch_with_duckduckgo(query: str) -> Dict:
+    """Async DuckDuckGo search over the pooled "duckduckgo" client"""
+    client = get_async_client("duckduckgo")
+    response = await client.get(DUCKDUCKGO_URL, params=_duckduckgo_params(query), timeout=WEB_SEARCH_TIMEOUT)
+    response.raise_for_status()
+    
+    return _parse_duckduckgo_response(response.json())
+
+def _duckduckgo_params(query: str) -> Dict:
+    return {
         "q": query,
         "format": "json",
         "no_html": "1",
         "skip_disambig": "1"
     }
-    
-    response = requests.get(url, params=params, timeout=10)
-    response.raise_for_status()
-    
-    data = response.json()
-    
+
+def _parse_duckduckgo_response(data: Dict) -> Dict:
+    """Convert a DuckDuckGo Instant Answer payload into our search result format"""
     results = []
     
     # Get instant answer if available
@@ -135,22 +225,88 @@ def synthesize_web_results_with_llm(search_results: Dict, query: str) -> str:
         # Initialize Ollama LLM (same as your existing setup)
         llm = OllamaLLM(model="mistral")
         
-        # Prepare context from web results
-        results = search_results.get("results", [])
-        search_engine = search_results.get("search_engine", "Web Search")
+        # Get LLM response
+        synthesized_answer = llm.invoke(_build_synthesis_prompt(search_results, query))
+        
+        return synthesized_answer
+        
+    except Exception as e:
+        logger.error(f"LLM synthesis failed: {e}")
+        # Fallback to basic formatting
+        return _format_basic_web_results(search_results, query)
+
+async def asynthesize_web_results_with_llm(search_results: Dict, query: str) -> str:
+    """
+    Async variant of synthesize_web_results_with_llm using the pooled Ollama client.
+    
+    Args:
+        search_results: Raw search results from web search
+        query: Original search query
         
-        context_pieces = []
-        for i, result in enumerate(results[:5], 1):
-            context_pieces.append(
-                f"Source {i}: {result['title']}\n"
-                f"Content: {result['snippet']}\n"
-                f"URL: {result['link']}\n"
-            )
+    Returns:
+        LLM-synthesized answer from web results
         
-        context = "\n".join(context_pieces)
+    Raises:
+        Exception: If the LLM fails; aformat_web_search_response falls back to the
+        plain results and marks the response as a fallback
+    """
+    if not search_results.get("success", False) or not search_results.get("results"):
+        return "No relevant web information found for your query."
+    
+    return await _get_synthesis_llm().ainvoke(_build_synthesis_prompt(search_results, query))
+
+async def astream_web_results_with_llm(
+    search_results: Dict,
+    query: str,
+    on_fallback: Optional[Callable[[], None]] = None
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of synthesize_web_results_with_llm: yields answer tokens
+    as Ollama generates them.
+    
+    Args:
+        search_results: Raw search results from web search
+        query: Original search query
+        on_fallback: Called when no synthesized answer could be produced (no
+            results, or the LLM failed before or during the stream)
         
-        # Create synthesis prompt
-        synthesis_prompt = f"""Based on the following web search results, provide a comprehensive and well-structured answer to the user's question: "{query}"
+    Yields:
+        Pieces of the LLM-synthesized answer
+    """
+    if not search_results.get("success", False) or not search_results.get("results"):
+        if on_fallback:
+            on_fallback()
+        yield "No relevant web information found for your query."
+        return
+    
+    produced_output = False
+    try:
+        async for token in _get_synthesis_llm().astream(_build_synthesis_prompt(search_results, query)):
+            produced_output = True
+            yield token
+    except Exception as e:
+        logger.error(f"LLM synthesis stream failed: {e}")
+        if on_fallback:
+            on_fallback()
+        # Only fall back if nothing has been sent yet, otherwise the answer would be duplicated
+        if not produced_output:
+            yield _format_basic_web_results(search_results, query)
+
+def _build_synthesis_prompt(search_results: Dict, query: str) -> str:
+    """Build the prompt used to synthesize web results into an answer"""
+    results = search_results.get("results", [])
+    
+    context_pieces = []
+    for i, result in enumerate(results[:5], 1):
+        context_pieces.append(
+            f"Source {i}: {result['title']}\n"
+            f"Content: {result['snippet']}\n"
+            f"URL: {result['link']}\n"
+        )
+    
+    context = "\n".join(context_pieces)
+    
+    return f"""Based on the following web search results, provide a comprehensive and well-structured answer to the user's question: "{query}"
 
 Web Search Results:
 {context}
@@ -165,16 +321,6 @@ Instructions:
 
 Please provide a well-structured answer based on the web search results above:"""
 
-        # Get LLM response
-        synthesized_answer = llm.invoke(synthesis_prompt)
-        
-        return synthesized_answer
-        
-    except Exception as e:
-        logger.error(f"LLM synthesis failed: {e}")
-        # Fallback to basic formatting
-        return _format_basic_web_results(search_results, query)
-
 def _format_basic_web_results(search_results: Dict, query: str) -> str:
     """Fallback formatting if LLM synthesis fails"""
     results = search_results.get("results", [])
@@ -203,49 +349,177 @@ def format_web_search_response(search_results: Dict, query: str) -> Dict:
     Returns:
         Formatted response for display with LLM-synthesized answer
     """
+    unavailable = _web_search_unavailable_response(search_results, query)
+    if unavailable:
+        return unavailable
+    
+    # Use LLM to synthesize the results
+    try:
+        synthesized_content = synthesize_web_results_with_llm(search_results, query)
+    except Exception as e:
+        logger.error(f"Error in synthesis: {e}")
+        synthesized_content = None
+    
+    return _build_web_search_response(search_results, query, synthesized_content)
+
+async def aformat_web_search_response(search_results: Dict, query: str) -> Dict:
+    """
+    Async variant of format_web_search_response.
+    
+    Args:
+        search_results: Raw search results from web search
+        query: Original search query
+        
+    Returns:
+        Formatted response for display with LLM-synthesized answer
+    """
+    unavailable = _web_search_unavailable_response(search_results, query)
+    if unavailable:
+        return unavailable
+    
+    try:
+        synthesized_content = await asynthesize_web_results_with_llm(search_results, query)
+    except Exception as e:
+        logger.error(f"Error in synthesis: {e}")
+        synthesized_content = None
+    
+    return _build_web_search_response(search_results, query, synthesized_content)
+
+def _web_search_unavailable_response(search_results: Dict, query: str) -> Optional[Dict]:
+    """Response for failed or empty searches, or None if there are results to synthesize"""
     if not search_results.get("success", False):
         return {
             "answer": f"❌ Web search failed: {search_results.get('error', 'Unknown error')}",
             "sources": [],
-            "search_info": "Web search unavailable"
+            "search_info": "Web search unavailable",
+            "fallback": True
         }
     
-    results = search_results.get("results", [])
-    search_engine = search_results.get("search_engine", "Web Search")
-    
-    if not results:
+    if not search_results.get("results", []):
+        search_engine = search_results.get("search_engine", "Web Search")
         return {
             "answer": f"🌐 No web results found for: '{query}'",
             "sources": [],
-            "search_info": f"Searched via {search_engine}"
+            "search_info": f"Searched via {search_engine}",
+            "fallback": True
         }
     
-    # Use LLM to synthesize the results
-    try:
-        synthesized_content = synthesize_web_results_with_llm(search_results, query)
-        
+    return None
+
+def _build_web_search_response(search_results: Dict, query: str, synthesized_content: Optional[str]) -> Dict:
+    """Wrap synthesized content (or the basic fallback when None) with header, footer and sources"""
+    search_engine = search_results.get("search_engine", "Web Search")
+    
+    if synthesized_content is not None:
         # Format the final response
         formatted_answer = f"**Answer not found in provided documents, searching the web:**\n\n{synthesized_content}\n\n*Information synthesized from web search via {search_engine}*"
-        
-    except Exception as e:
-        logger.error(f"Error in synthesis: {e}")
+    else:
         # Fallback to basic formatting
         formatted_answer = f"**Answer not found in provided documents, searching the web:**\n\n"
         formatted_answer += _format_basic_web_results(search_results, query)
         formatted_answer += f"\n\n*Source: {search_engine}*"
     
-    # Prepare sources for display
-    sources = []
-    for result in results:
-        if result.get("link"):
-            sources.append(f"🌐 {result['link']}")
-    
     return {
         "answer": formatted_answer,
-        "sources": sources,
-        "search_info": f"Web search via {search_engine} + LLM synthesis"
+        "sources": _web_sources(search_results),
+        "search_info": f"Web search via {search_engine} + LLM synthesis",
+        "fallback": synthesized_content is None
     }
 
+def _web_sources(search_results: Dict) -> List[str]:
+    """Prepare sources for display"""
+    return [f"🌐 {result['link']}" for result in search_results.get("results", []) if result.get("link")]
+
+def astream_web_search_response(
+    search_results: Dict,
+    query: str,
+    on_fallback: Optional[Callable[[], None]] = None
+) -> Tuple[AsyncIterator[str], List[str]]:
+    """
+    Streaming counterpart of format_web_search_response.
+    
+    Args:
+        search_results: Raw search results from web search
+        query: Original search query
+        on_fallback: Called while streaming if the answer is not a synthesized one
+            (the search failed or found nothing, or the LLM failed)
+        
+    Returns:
+        (async iterator over answer pieces, list of sources for display)
+    """
+    unavailable = _web_search_unavailable_response(search_results, query)
+    
+    async def pieces() -> AsyncIterator[str]:
+        if unavailable:
+            if on_fallback:
+                on_fallback()
+            yield unavailable["answer"]
+            return
+        search_engine = search_results.get("search_engine", "Web Search")
+        yield "**Answer not found in provided documents, searching the web:**\n\n"
+        async for token in astream_web_results_with_llm(search_results, query, on_fallback):
+            yield token
+        yield f"\n\n*Information synthesized from web search via {search_engine}*"
+    
+    return pieces(), [] if unavailable else _web_sources(search_results)
+
+def best_relevance_score(scored_documents: List[Tuple[object, Optional[float]]]) -> Optional[float]:
+    """Highest relevance score among retrieved documents, or None if none are scored"""
+    scores = [score for _, score in scored_documents if score is not None]
+    return max(scores) if scores else None
+
+def relevance_band(
+    scored_documents: List[Tuple[object, Optional[float]]],
+    threshold: Optional[float] = None,
+    margin: Optional[float] = None
+) -> str:
+    """
+    Classify retrieval confidence before any generation.
+    
+    Args:
+        scored_documents: (document, relevance score) pairs from retrieval
+        threshold: Minimum best score, defaults to RAG_RELEVANCE_THRESHOLD
+        margin: Width of the borderline band above the threshold, defaults to RAG_BORDERLINE_MARGIN
+        
+    Returns:
+        "rejected" (go to the web), "borderline" (try RAG, web may still be needed)
+        or "confident" (RAG only)
+    """
+    if not scored_documents:
+        return "rejected"
+    
+    best_score = best_relevance_score(scored_documents)
+    
+    # Unscored retrievers cannot be gated, let the post-hoc check decide
+    if best_score is None:
+        return "borderline"
+    
+    threshold = RAG_RELEVANCE_THRESHOLD if threshold is None else threshold
+    margin = RAG_BORDERLINE_MARGIN if margin is None else margin
+    
+    if best_score < threshold:
+        return "rejected"
+    if best_score < threshold + margin:
+        return "borderline"
+    return "confident"
+
+def passes_relevance_gate(
+    scored_documents: List[Tuple[object, Optional[float]]],
+    threshold: Optional[float] = None
+) -> bool:
+    """
+    Decide before any generation whether retrieved documents are relevant enough
+    to answer from, or whether to go straight to web search.
+    
+    Args:
+        scored_documents: (document, relevance score) pairs from retrieval
+        threshold: Minimum best score, defaults to RAG_RELEVANCE_THRESHOLD
+        
+    Returns:
+        True if RAG should be used, False if web search is needed
+    """
+    return relevance_band(scored_documents, threshold) != "rejected"
+
 def has_relevant_rag_results(rag_result: Dict, min_score_threshold: float = 0.3) -> bool:
     """
     Determine if RAG results are relevant enough to avoid web search
@@ -0,0 +1,67 @@
+import asyncio
+import os
+from typing import Dict, Optional
+
+from src import metrics
+from src.web_search.search_engine import asearch_web
+
+# When to start a web search before knowing whether RAG is sufficient:
+#   "off"        - only search after RAG has been rejected
+#   "borderline" - search in parallel with generation when retrieval confidence is borderline
+#   "eager"      - search in parallel with retrieval, cancel once RAG is known to be sufficient
+SPECULATIVE_WEB_SEARCH = os.getenv("SPECULATIVE_WEB_SEARCH", "off").lower()
+
+
+class SpeculativeWebSearch:
+    """
+    A web search for one question that can be started early and cancelled or
+    discarded if the answer ends up coming from the documents.
+    """
+
+    def __init__(self, query: str, num_results: int = 5):
+        self.query = query
+        self.num_results = num_results
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def started(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        """Start the search in the background (no-op if already running)."""
+        if self._task is None:
+            self._task = asyncio.create_task(asearch_web(self.query, self.num_results))
+            metrics.increment("web.speculative.started")
+
+    async def result(self) -> Dict:
+        """
+        Return the search results, searching now if the search was never speculated
+        or was cancelled (e.g. RAG looked confident but its answer was then rejected).
+        """
+        if self._task is None or self._task.cancelled():
+            self._task = None
+            return await asearch_web(self.query, self.num_results)
+
+        if self._task.done():
+            metrics.increment("web.speculative.ready")
+        metrics.increment("web.speculative.used")
+        return await self._task
+
+    def cancel(self) -> None:
+        """Discard a speculative search that is no longer needed."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            # A later result() must not await the cancelled task
+            self._task = None
+            metrics.increment("web.speculative.cancelled")
+
+    def on_retrieval_start(self) -> None:
+        if SPECULATIVE_WEB_SEARCH == "eager":
+            self.start()
+
+    def on_relevance_band(self, band: str) -> None:
+        """React to the retrieval confidence band from relevance_band()."""
+        if band == "confident":
+            self.cancel()
+        elif band == "borderline" and SPECULATIVE_WEB_SEARCH in ("borderline", "eager"):
+            self.start()
@@ -0,0 +1,38 @@
+from src.rag import answer_cache
+from src.rag.answer_cache import SemanticAnswerCache
+
+VECTORS = {
+    "how do i reset my password": [1.0, 0.0, 0.0],
+    "how can i reset my password": [0.99, 0.1, 0.0],
+    "what is the refund policy": [0.0, 1.0, 0.0],
+    "where is the office": [0.0, 0.0, 1.0],
+}
+
+
+def _cache(monkeypatch, max_entries=128):
+    monkeypatch.setattr(answer_cache, "save_user_cache", lambda user_id, entry: None)
+    monkeypatch.setattr(answer_cache, "get_user_cached_entry", lambda user_id, question, corpus_version: None)
+    return SemanticAnswerCache(embed_query=VECTORS.__getitem__, threshold=0.95, max_entries=max_entries)
+
+
+def test_paraphrase_is_served_from_the_matching_answer(monkeypatch):
+    cache = _cache(monkeypatch)
+    cache.store("alice", "what is the refund policy", "30 days", [], 1, "nomic-embed-text")
+    cache.store("alice", "how do i reset my password", "Use the login page", [], 1, "nomic-embed-text")
+
+    hit = cache.lookup("alice", "how can i reset my password", 1, "nomic-embed-text")
+
+    assert hit.answer == "Use the login page"
+    assert cache.lookup("alice", "where is the office", 1, "nomic-embed-text") is None
+    assert cache.lookup("alice", "how can i reset my password", 2, "nomic-embed-text") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_oldest_answers_are_dropped_beyond_max_entries(monkeypatch):
+    cache = _cache(monkeypatch, max_entries=2)
+    for question in ("how do i reset my password", "what is the refund policy", "where is the office"):
+        cache.store("alice", question, question.upper(), [], 1, "nomic-embed-text")
+
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup("alice", "how can i reset my password", 1, "nomic-embed-text") is None
+    assert cache.lookup("alice", "where is the office", 1, "nomic-embed-text").answer == "WHERE IS THE OFFICE"
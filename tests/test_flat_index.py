@@ -0,0 +1,63 @@
+import os
+
+import numpy as np
+
+from src.rag.flat_index import FlatCollection, remove_flat_index
+
+
+def _vectors(count, dimension=8):
+    return np.random.default_rng(0).normal(size=(count, dimension)).astype(np.float32)
+
+
+def _upsert(collection, vectors, start, end):
+    ids = [f"chunk-{i}" for i in range(start, end)]
+    collection.upsert(ids=ids, embeddings=vectors[start:end].tolist(), documents=ids)
+
+
+def test_upserts_are_saved_per_batch_and_survive_an_interrupted_append(tmp_path):
+    vectors = _vectors(30)
+    collection = FlatCollection(str(tmp_path), dtype="int8")
+    for start in range(0, 20, 5):
+        _upsert(collection, vectors, start, start + 5)
+    # A crash mid-append leaves partial rows past the saved count
+    with open(os.path.join(collection.directory, "records.jsonl"), "ab") as f:
+        f.write(b'{"id": "partial"')
+
+    reopened = FlatCollection(str(tmp_path))
+    _upsert(reopened, vectors, 20, 30)
+
+    final = FlatCollection(str(tmp_path))
+    assert final.count() == 30
+    assert final.get(include=[])["ids"] == [f"chunk-{i}" for i in range(30)]
+    assert final.query([vectors[25].tolist()], n_results=1)["ids"][0] == ["chunk-25"]
+
+
+def test_overflow_is_reported_by_the_write_that_crosses_the_limit(tmp_path):
+    vectors = _vectors(30)
+    overflows = []
+    collection = FlatCollection(str(tmp_path), max_chunks=12, on_overflow=lambda: overflows.append(collection.count()))
+
+    for start in range(0, 30, 5):
+        _upsert(collection, vectors, start, start + 5)
+
+    assert overflows == [15, 20, 25, 30]
+
+
+def test_old_handle_reads_from_the_collection_it_moved_to(tmp_path):
+    vectors = _vectors(30)
+    target = FlatCollection(str(tmp_path / "target"))
+
+    def move():
+        collection.move_to(target)
+        remove_flat_index(str(tmp_path / "source"))
+
+    collection = FlatCollection(str(tmp_path / "source"), max_chunks=12, on_overflow=move)
+    for start in range(0, 30, 5):
+        _upsert(collection, vectors, start, start + 5)
+
+    assert collection.moved
+    assert collection.count() == 30
+    assert collection.get(include=[])["ids"] == [f"chunk-{i}" for i in range(30)]
+    assert collection.get(ids=["chunk-3"])["documents"] == ["chunk-3"]
+    assert collection.query([vectors[27].tolist()], n_results=1)["ids"][0] == ["chunk-27"]
+    assert collection.nbytes() == 0
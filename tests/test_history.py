@@ -0,0 +1,29 @@
+import sqlite3
+
+from src.models.history import ChatEntry, HistoryStore
+
+
+def test_find_matches_questions_like_the_answer_cache(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    store.append("alice", ChatEntry("What is X?", "X is a letter.", []))
+
+    assert store.find("alice", "  what is   x ").answer == "X is a letter."
+
+
+def test_rows_keyed_the_old_way_are_migrated(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    HistoryStore(path)
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "INSERT INTO history (username, question, normalized_question, answer, sources, timestamp) "
+        "VALUES ('alice', 'What is X?', 'what is x?', 'X is a letter.', '[]', '2025-01-01T00:00:00')"
+    )
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.close()
+
+    HistoryStore(path)
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT normalized_question FROM history").fetchall() == [("what is x",)]
+    conn.close()
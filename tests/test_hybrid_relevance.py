@@ -0,0 +1,54 @@
+from langchain_core.documents import Document
+
+from src.rag import vector_store
+from src.rag.keyword_index import KeywordIndex
+from src.web_search.search_engine import relevance_band
+
+CHUNKS = {
+    "guide-1": "The gateway forwards requests to the backend services and retries on failure.",
+    "guide-2": "The deployment guide explains how services are configured and monitored.",
+    "errors": "Troubleshooting: ERR-404 is raised when the upstream route is missing from the routing table.",
+}
+QUESTION = "what does the error ERR-404 mean when the gateway restarts"
+
+
+class FakeVectorStore:
+    """Dense search that misses the identifier: only weak, unrelated matches."""
+
+    def similarity_search_with_relevance_scores(self, query, k=4, filter=None):
+        return [(Document(page_content=CHUNKS["guide-1"], metadata={"file_id": "guide"}), 0.12)]
+
+    def get(self, ids, include=None):
+        return {
+            "ids": ids,
+            "documents": [CHUNKS[chunk_id] for chunk_id in ids],
+            "metadatas": [{"file_id": chunk_id.split("-")[0]} for chunk_id in ids],
+        }
+
+
+def _keyword_index(tmp_path):
+    index = KeywordIndex(str(tmp_path / "keyword_index.json"))
+    index.add(list(CHUNKS), list(CHUNKS.values()), [{"user_id": "alice"} for _ in CHUNKS])
+    return index
+
+
+def test_identifier_only_hit_passes_relevance_gate(tmp_path, monkeypatch):
+    index = _keyword_index(tmp_path)
+    monkeypatch.setattr(vector_store, "load_vectorstore", lambda persist_directory: FakeVectorStore())
+    monkeypatch.setattr(vector_store, "get_keyword_index", lambda vectorstore: index)
+
+    results = vector_store.hybrid_search_with_scores(str(tmp_path), QUESTION, user_id="alice")
+
+    scores = {doc.page_content: score for doc, score in results}
+    assert scores[CHUNKS["errors"]] is not None
+    assert relevance_band(results) != "rejected"
+    assert relevance_band([(None, 0.12)]) == "rejected"
+
+
+def test_keyword_coverage_of_unrelated_terms_stays_low(tmp_path):
+    index = _keyword_index(tmp_path)
+
+    hits = index.search("what does the gateway do when it restarts", k=3)
+
+    assert hits
+    assert all(coverage < 0.3 for _, _, coverage in hits)
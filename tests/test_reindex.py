@@ -0,0 +1,31 @@
+from src.loaders.file_loader import compute_file_hash
+from src.rag import reindex
+
+
+def test_reindex_keeps_files_indexed_in_place_from_elsewhere(tmp_path, monkeypatch):
+    upload_dir = tmp_path / "user_uploads" / "alice"
+    upload_dir.mkdir(parents=True)
+    kept = upload_dir / "kept.txt"
+    kept.write_text("still uploaded")
+    elsewhere = tmp_path / "docs" / "handbook.txt"
+    elsewhere.parent.mkdir()
+    elsewhere.write_text("bulk-indexed with --no-copy")
+
+    files = [
+        {"file_id": "kept", "filename": "kept.txt", "file_path": str(kept), "content_hash": compute_file_hash(str(kept))},
+        {"file_id": "deleted", "filename": "deleted.txt", "file_path": str(upload_dir / "deleted.txt")},
+        {"file_id": "in-place", "filename": "handbook.txt", "file_path": str(elsewhere)},
+    ]
+    removed = []
+    monkeypatch.setattr(reindex, "load_vectorstore", lambda persist_directory: object())
+    monkeypatch.setattr(reindex, "get_user_files", lambda persist_directory, user_id: files)
+    monkeypatch.setattr(
+        reindex, "delete_documents_by_file_id",
+        lambda persist_directory, file_id: (removed.append(file_id) or True, None)
+    )
+
+    stats = reindex.reindex_user_folder(str(upload_dir), str(tmp_path / "embeddings"), "alice")
+
+    assert removed == ["deleted"]
+    assert stats["removed"] == 1
+    assert stats["unchanged"] == 1
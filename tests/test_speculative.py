@@ -0,0 +1,45 @@
+import asyncio
+
+from src.web_search import speculative
+from src.web_search.speculative import SpeculativeWebSearch
+
+
+def _fake_search(calls):
+    async def asearch_web(query, num_results=5):
+        calls.append(query)
+        await asyncio.sleep(0.01)
+        return {"query": query, "results": [{"title": "result"}]}
+    return asearch_web
+
+
+def test_result_after_cancel_searches_again(monkeypatch):
+    calls = []
+    monkeypatch.setattr(speculative, "asearch_web", _fake_search(calls))
+
+    async def scenario():
+        web_search = SpeculativeWebSearch("what is new in python")
+        web_search.start()
+        await asyncio.sleep(0)
+        # Confident band cancels, then the RAG answer is rejected after generation
+        web_search.cancel()
+        return await web_search.result()
+
+    results = asyncio.run(scenario())
+
+    assert results["results"]
+    assert calls == ["what is new in python", "what is new in python"]
+
+
+def test_result_reuses_speculated_search(monkeypatch):
+    calls = []
+    monkeypatch.setattr(speculative, "asearch_web", _fake_search(calls))
+
+    async def scenario():
+        web_search = SpeculativeWebSearch("what is new in python")
+        web_search.start()
+        return await web_search.result()
+
+    results = asyncio.run(scenario())
+
+    assert results["results"]
+    assert calls == ["what is new in python"]
@@ -0,0 +1,43 @@
+import asyncio
+
+from src.web_search import search_engine
+
+SEARCH_RESULTS = {
+    "success": True,
+    "search_engine": "DuckDuckGo",
+    "results": [{"title": "Python", "snippet": "Python 3.13 was released.", "link": "https://python.org"}],
+}
+
+
+class UnreachableLLM:
+    async def ainvoke(self, prompt):
+        raise ConnectionError("Ollama is down")
+
+    async def astream(self, prompt):
+        raise ConnectionError("Ollama is down")
+        yield
+
+
+def test_formatted_web_answer_is_marked_as_fallback_when_synthesis_fails(monkeypatch):
+    monkeypatch.setattr(search_engine, "_get_synthesis_llm", lambda: UnreachableLLM())
+
+    response = asyncio.run(search_engine.aformat_web_search_response(SEARCH_RESULTS, "what is new in python"))
+
+    assert response["fallback"]
+    assert response["sources"] == ["🌐 https://python.org"]
+
+
+def test_streamed_web_answer_reports_fallback(monkeypatch):
+    monkeypatch.setattr(search_engine, "_get_synthesis_llm", lambda: UnreachableLLM())
+    fallbacks = []
+
+    async def collect():
+        tokens, _ = search_engine.astream_web_search_response(
+            SEARCH_RESULTS, "what is new in python", on_fallback=lambda: fallbacks.append(True)
+        )
+        return [token async for token in tokens]
+
+    pieces = asyncio.run(collect())
+
+    assert fallbacks == [True]
+    assert any("Python 3.13 was released." in piece for piece in pieces)